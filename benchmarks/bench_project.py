@@ -0,0 +1,265 @@
+"""
+Scaling benchmarks of Project.run on synthetic maps
+
+For each scale a synthetic map is written (see synthetic_map.py) and
+Project.run is run on it with the "profile" run flag, so every stage and the
+profiled helpers (dtm sampling, interpolator fit and evaluation, geology grid
+lookups, point in polygon joins) are timed. The fastest of the repeats is
+kept, in the manner of asv. The results are printed as a table of wall time
+against scale with the fitted scaling exponent of each stage and helper, i.e.
+the slope of log(time) against log(size), and can be saved as json and as a
+log-log plot of the scaling curves.
+
+Run from the repository root, no network access is needed:
+
+    python -m benchmarks.bench_project --scales tiny small medium --repeat 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy
+
+from map2loop.m2l_enums import VerboseLevel
+from map2loop.project import Project
+
+from .synthetic_map import get_scale, make_synthetic_map
+
+
+def run_project(synthetic_map: dict, project_path: str, run_flags: dict = None) -> dict:
+    """
+    Run Project.run on a synthetic map with profiling on
+
+    Args:
+        synthetic_map (dict): As returned by make_synthetic_map
+        project_path (str): The project directory, replaced if it exists
+        run_flags (dict, optional): Extra run flags. Defaults to None.
+
+    Returns:
+        dict: The profiler summary by name plus the "total" wall time of the run
+    """
+    flags = {} if run_flags is None else dict(run_flags)
+    flags["profile"] = True
+    proj = Project(
+        verbose_level=VerboseLevel.NONE,
+        project_path=project_path,
+        overwrite="true",
+        working_projection=synthetic_map["working_projection"],
+        **synthetic_map["files"],
+    )
+    proj.update_config(
+        bbox_3d=synthetic_map["bbox_3d"],
+        dtm_crs=synthetic_map["working_projection"],
+        step_out=0.0,
+        run_flags=flags,
+    )
+    start = time.perf_counter()
+    proj.run()
+    total = time.perf_counter() - start
+    # the profiler is shared, take its summary before anything else runs
+    summary = proj.profile.summary()
+    summary["total"] = {
+        "category": "run",
+        "calls": 1,
+        "wall": total,
+        "cpu": summary.get("run", {}).get("cpu", 0.0),
+        "peak_rss_delta": summary.get("run", {}).get("peak_rss_delta", 0),
+        "counts": {},
+    }
+    summary.pop("run", None)
+    return summary
+
+
+def scaling_exponent(sizes, times):
+    """
+    Slope of log(time) against log(size), None if it can't be fitted
+    """
+    points = [
+        (size, wall)
+        for size, wall in zip(sizes, times)
+        if wall is not None and size > 0 and wall > 0
+    ]
+    if len(set(size for size, _ in points)) < 2:
+        return None
+    sizes, times = zip(*points)
+    return float(numpy.polyfit(numpy.log(sizes), numpy.log(times), 1)[0])
+
+
+def run_benchmarks(
+    scales,
+    repeat: int = 1,
+    size_by: str = "points",
+    workdir: str = None,
+    run_flags: dict = None,
+    seed: int = 0,
+    verbose: bool = True,
+) -> dict:
+    """
+    Time Project.run at several scales
+
+    Args:
+        scales (list): Keys of SCALES or multiples of the small map
+        repeat (int, optional): Runs per scale, the fastest is kept. Defaults to 1.
+        size_by (str, optional): The map parameter the scaling is fitted against. Defaults to "points".
+        workdir (str, optional): Where the maps and projects are written. Defaults to a temporary directory.
+        run_flags (dict, optional): Extra run flags for every run. Defaults to None.
+        seed (int, optional): Seed of the synthetic maps. Defaults to 0.
+        verbose (bool, optional): Print progress. Defaults to True.
+
+    Returns:
+        dict: The parameters of each scale, the sizes, and per stage or helper
+            name its category, wall and cpu times, peak rss growth, item counts
+            and scaling exponent
+    """
+    cleanup = None
+    if workdir is None:
+        cleanup = tempfile.TemporaryDirectory(prefix="m2l_bench_")
+        workdir = cleanup.name
+    try:
+        params = [get_scale(scale) for scale in scales]
+        if size_by not in params[0]:
+            raise NameError(
+                f"map2loop error: Unknown size {size_by}, use one of {list(params[0])}"
+            )
+        runs = []
+        for scale, scale_params in zip(scales, params):
+            map_dir = os.path.join(workdir, f"map_{scale}")
+            synthetic_map = make_synthetic_map(map_dir, seed=seed, **scale_params)
+            best = {}
+            for i in range(repeat):
+                if verbose:
+                    print(f"Scale {scale} run {i + 1} of {repeat}")
+                summary = run_project(
+                    synthetic_map, os.path.join(workdir, f"project_{scale}"), run_flags
+                )
+                for name, total in summary.items():
+                    if name not in best or total["wall"] < best[name]["wall"]:
+                        best[name] = total
+            runs.append(best)
+
+        names = []
+        for best in runs:
+            names += [name for name in best if name not in names]
+        sizes = [scale_params[size_by] for scale_params in params]
+        results = {}
+        for name in names:
+            totals = [best.get(name) for best in runs]
+            known = [total for total in totals if total is not None]
+            # None where the stage or helper did not run at that scale
+            wall = [None if total is None else total["wall"] for total in totals]
+            results[name] = {
+                "category": known[0]["category"],
+                "wall": wall,
+                "cpu": [None if total is None else total["cpu"] for total in totals],
+                "peak_rss_delta": [
+                    None if total is None else total["peak_rss_delta"] for total in totals
+                ],
+                "counts": [None if total is None else total["counts"] for total in totals],
+                "exponent": scaling_exponent(sizes, wall),
+            }
+        return {
+            "scales": [str(scale) for scale in scales],
+            "params": params,
+            "size_by": size_by,
+            "sizes": sizes,
+            "repeat": repeat,
+            "results": results,
+        }
+    finally:
+        if cleanup is not None:
+            cleanup.cleanup()
+
+
+def print_report(report: dict):
+    """
+    Print the wall times and scaling exponents as a table
+    """
+    header = "{:40s} {:9s}".format("name", "category")
+    for scale in report["scales"]:
+        header += " {:>10s}".format(scale)
+    header += " {:>9s}".format("exponent")
+    print(header)
+    print(
+        "{:40s} {:9s}".format(report["size_by"], "")
+        + "".join(" {:>10}".format(size) for size in report["sizes"])
+    )
+    order = {"run": 0, "stage": 1, "function": 2}
+    for name, result in sorted(
+        report["results"].items(),
+        key=lambda item: (order.get(item[1]["category"], 3), item[0]),
+    ):
+        line = "{:40s} {:9s}".format(name[:40], result["category"])
+        for wall in result["wall"]:
+            line += " {:>10s}".format("-" if wall is None else f"{wall:.3f}")
+        exponent = result["exponent"]
+        line += " {:>9s}".format("-" if exponent is None else f"{exponent:.2f}")
+        print(line)
+
+
+def plot_report(report: dict, filename: str):
+    """
+    Save the scaling curves of the stages and helpers as a log-log plot
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6), sharex=True)
+    for ax, categories, title in (
+        (axes[0], ("run", "stage"), "Project.run stages"),
+        (axes[1], ("function",), "Profiled helpers"),
+    ):
+        for name, result in report["results"].items():
+            if result["category"] in categories:
+                points = [
+                    (size, wall)
+                    for size, wall in zip(report["sizes"], result["wall"])
+                    if wall is not None
+                ]
+                if len(points) > 0:
+                    ax.loglog(*zip(*points), marker="o", label=name)
+        ax.set_title(title)
+        ax.set_xlabel(report["size_by"])
+        ax.set_ylabel("wall time (s)")
+        ax.legend(fontsize="x-small")
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Project.run scaling")
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        default=["tiny", "small", "medium"],
+        help="Names from synthetic_map.SCALES or multiples of the small map",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--size-by", default="points")
+    parser.add_argument("--workdir", default=None, help="Keep the maps and projects here")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--run-flags", default="{}", help="json dictionary of extra run flags"
+    )
+    parser.add_argument("--output", default=None, help="Save the results as json")
+    parser.add_argument("--plot", default=None, help="Save the scaling curves as an image")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.scales,
+        repeat=args.repeat,
+        size_by=args.size_by,
+        workdir=args.workdir,
+        run_flags=json.loads(args.run_flags),
+        seed=args.seed,
+    )
+    print_report(report)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.plot is not None:
+        plot_report(report, args.plot)
@@ -0,0 +1,117 @@
+"""
+Benchmarks of the tiled WCS DTM fetch against a local stand-in server
+
+A synthetic map's DTM is served by LocalWcsServer and fetched with
+m2l_utils.load_and_reproject_dtm for each combination of tile size
+(dtm_wcs_tile_px) and number of download threads (dtm_wcs_workers). The
+server's latency and failure rate mimic a remote service, failed tiles are
+retried on their own by fetch_wcs_dtm. No network access is needed:
+
+    python -m benchmarks.bench_wcs --tile-px 256 512 2048 --workers 1 4 8 --latency 0.2
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import geopandas
+from shapely.geometry import box
+
+from map2loop import m2l_utils
+
+from .synthetic_map import get_scale, make_synthetic_map
+from .wcs_server import LocalWcsServer
+
+
+def run_benchmarks(
+    tile_px=(256, 512, 2048),
+    workers=(1, 4),
+    scale="medium",
+    latency: float = 0.1,
+    failure_rate: float = 0.0,
+    repeat: int = 1,
+    seed: int = 0,
+) -> list:
+    """
+    Time the WCS fetch of a synthetic DTM for each tile size and worker count
+
+    Args:
+        tile_px (list, optional): Tile sizes in pixels. Defaults to (256, 512, 2048).
+        workers (list, optional): Numbers of download threads. Defaults to (1, 4).
+        scale (str, optional): Scale of the synthetic map, see synthetic_map.SCALES. Defaults to "medium".
+        latency (float, optional): Seconds the server waits per request. Defaults to 0.1.
+        failure_rate (float, optional): Fraction of tile requests failed by the server. Defaults to 0.0.
+        repeat (int, optional): Fetches per combination, the fastest is kept. Defaults to 1.
+        seed (int, optional): Seed of the map and the failures. Defaults to 0.
+
+    Returns:
+        list of dict: tile_px, workers, seconds, requests and failures of each combination
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="m2l_bench_wcs_") as workdir:
+        synthetic_map = make_synthetic_map(workdir, seed=seed, **get_scale(scale))
+        bbox = synthetic_map["bbox_3d"]
+        polygon = geopandas.GeoDataFrame(
+            geometry=[box(bbox["minx"], bbox["miny"], bbox["maxx"], bbox["maxy"])],
+            crs=synthetic_map["working_projection"],
+        )
+        with LocalWcsServer(
+            synthetic_map["files"]["dtm_filename"],
+            latency=latency,
+            failure_rate=failure_rate,
+            seed=seed,
+        ) as server:
+            for px in tile_px:
+                for n in workers:
+                    best = None
+                    for _ in range(repeat):
+                        requests, failures = server.requests, server.failures
+                        start = time.perf_counter()
+                        dtm = m2l_utils.load_and_reproject_dtm(
+                            polygon,
+                            synthetic_map["working_projection"],
+                            url=server.url,
+                            wcs_tile_px=px,
+                            wcs_workers=n,
+                        )
+                        seconds = time.perf_counter() - start
+                        dtm.close()
+                        if best is None or seconds < best["seconds"]:
+                            best = {
+                                "tile_px": px,
+                                "workers": n,
+                                "seconds": seconds,
+                                "requests": server.requests - requests,
+                                "failures": server.failures - failures,
+                            }
+                    results.append(best)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the tiled WCS DTM fetch")
+    parser.add_argument("--tile-px", type=int, nargs="+", default=[256, 512, 2048])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--scale", default="medium")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Save the results as json")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.tile_px,
+        args.workers,
+        scale=args.scale,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        repeat=args.repeat,
+    )
+    print("{:>8s} {:>8s} {:>10s} {:>9s} {:>9s}".format(
+        "tile_px", "workers", "seconds", "requests", "failures"
+    ))
+    for result in results:
+        print("{tile_px:>8d} {workers:>8d} {seconds:>10.3f} {requests:>9d} {failures:>9d}".format(**result))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
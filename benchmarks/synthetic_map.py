@@ -0,0 +1,343 @@
+"""
+Synthetic map data for benchmarking map2loop offline
+
+make_synthetic_map writes a geology polygon layer, fault and fold polylines,
+bedding structure points, a DTM GeoTIFF and the matching hjson metadata file
+into a directory. The map is a stack of units whose boundaries are folded by a
+sine wave, cut by roughly north south faults, so every stage of Project.run
+has real work to do. The same scale and seed always give the same files.
+"""
+import argparse
+import json
+import math
+import os
+
+import geopandas
+import hjson
+import numpy
+import rasterio
+import rasterio.transform
+from shapely.geometry import LineString, Point, Polygon
+
+# Project CRS of the synthetic map (GDA94 / MGA zone 50, as in the examples)
+CRS = "EPSG:28350"
+
+# named scales, multiples of the "small" map
+SCALES = {
+    "tiny": {
+        "units": 4,
+        "faults": 2,
+        "points": 100,
+        "raster_size": 64,
+        "map_size": 10000.0,
+    },
+    "small": {
+        "units": 8,
+        "faults": 4,
+        "points": 400,
+        "raster_size": 128,
+        "map_size": 20000.0,
+    },
+    "medium": {
+        "units": 16,
+        "faults": 8,
+        "points": 1600,
+        "raster_size": 256,
+        "map_size": 40000.0,
+    },
+    "large": {
+        "units": 32,
+        "faults": 16,
+        "points": 6400,
+        "raster_size": 512,
+        "map_size": 80000.0,
+    },
+}
+
+# column names of the synthetic layers, in the format of README section 6.2
+METADATA = {
+    # Orientations
+    "d": "DIP",
+    "dd": "DIP_DIR",
+    "sf": "FEATURE",
+    "bedding": "Bed",
+    "otype": "dip direction",
+    "bo": "TYPE",
+    "btype": "overturned",
+    # Stratigraphy
+    "g": "GROUP_",
+    "g2": "SUPERSUITE",
+    "c": "UNITNAME",
+    "ds": "DESCRIPTN",
+    "u": "CODE",
+    "r1": "ROCKTYPE1",
+    "r2": "ROCKTYPE2",
+    "sill": "sill",
+    "intrusive": "intrusive",
+    "volcanic": "volcanic",
+    # Mineral Deposits
+    "msc": "SITE_CODE",
+    "msn": "SHORT_NAME",
+    "mst": "SITE_TYPE_",
+    "mtc": "TARGET_COM",
+    "mscm": "SITE_COMMO",
+    "mcom": "COMMODITY_",
+    "minf": "Infrastructure",
+    # Timing
+    "min": "MIN_AGE_MA",
+    "max": "MAX_AGE_MA",
+    # faults and folds
+    "f": "FEATURE",
+    "fault": "Fault",
+    "ff": "FEATURE",
+    "fold": "Fold axial trace",
+    "fdip": "DIP",
+    "fdipnull": "0",
+    "fdipdir": "DIP_DIR",
+    "fdipdir_flag": "num",
+    "fdipest": "DIP_EST",
+    "fdipest_vals": "gentle,moderate,steep",
+    "n": "NAME",
+    "t": "TYPE",
+    "syn": "syncline",
+    # ids
+    "o": "OBJECTID",
+    "gi": "GEOPNT_ID",
+    "deposit_dist": 500,
+}
+
+
+def get_scale(scale) -> dict:
+    """
+    Parameters of a scale given by name (see SCALES) or as a number times "small"
+
+    Args:
+        scale (str or float): A key of SCALES or a multiple of the small map
+
+    Returns:
+        dict: units, faults, points, raster_size and map_size
+    """
+    if isinstance(scale, str) and scale in SCALES:
+        return dict(SCALES[scale])
+    try:
+        factor = float(scale)
+    except (TypeError, ValueError):
+        raise NameError(
+            f"map2loop error: Unknown scale {scale}, use one of {list(SCALES)} or a number"
+        )
+    small = SCALES["small"]
+    # points and dtm pixels grow with the area, units and faults with its side
+    return {
+        "units": max(2, int(round(small["units"] * math.sqrt(factor)))),
+        "faults": max(1, int(round(small["faults"] * math.sqrt(factor)))),
+        "points": max(10, int(round(small["points"] * factor))),
+        "raster_size": max(16, int(round(small["raster_size"] * math.sqrt(factor)))),
+        "map_size": small["map_size"] * math.sqrt(factor),
+    }
+
+
+def make_synthetic_map(
+    directory: str,
+    units: int = 8,
+    faults: int = 4,
+    points: int = 400,
+    raster_size: int = 128,
+    map_size: float = 20000.0,
+    vertices: int = 200,
+    seed: int = 0,
+) -> dict:
+    """
+    Write a synthetic map and its metadata into a directory
+
+    Args:
+        directory (str): Where the files are written, created if needed
+        units (int, optional): Number of stratigraphic units. Defaults to 8.
+        faults (int, optional): Number of faults. Defaults to 4.
+        points (int, optional): Number of bedding structure points. Defaults to 400.
+        raster_size (int, optional): Width and height of the DTM in pixels. Defaults to 128.
+        map_size (float, optional): Width and height of the map in metres. Defaults to 20000.0.
+        vertices (int, optional): Vertices along each unit boundary. Defaults to 200.
+        seed (int, optional): Seed of the random faults, points and DTM. Defaults to 0.
+
+    Returns:
+        dict: The Project filename arguments, the bbox_3d, the working projection
+            and the parameters the map was made with
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = numpy.random.default_rng(seed)
+    minx, miny = 500000.0, 7490000.0
+    maxx, maxy = minx + map_size, miny + map_size
+    # units are stacked south to north, youngest in the north, and folded by
+    # a sine wave with two wavelengths across the map
+    wavelength = map_size / 2.0
+    amplitude = map_size / (4.0 * units)
+    thickness = map_size / units
+
+    def boundary(x, i):
+        return miny + i * thickness + amplitude * numpy.sin(2 * numpy.pi * x / wavelength)
+
+    xs = numpy.linspace(minx, maxx, vertices)
+    geology_rows = []
+    for i in range(units):
+        # the outer boundaries are the map edges so the units fill the map
+        lower = numpy.full(vertices, miny) if i == 0 else boundary(xs, i)
+        upper = numpy.full(vertices, maxy) if i == units - 1 else boundary(xs, i + 1)
+        ring = list(zip(xs, lower)) + list(zip(xs[::-1], upper[::-1]))
+        age = 100.0 * (units - i)
+        geology_rows.append(
+            {
+                "OBJECTID": i,
+                "UNITNAME": f"unit_{i:03d}",
+                "GROUP_": f"group_{i // 3:03d}",
+                "SUPERSUITE": "",
+                "CODE": f"U{i:03d}",
+                "DESCRIPTN": "sandstone and siltstone",
+                "ROCKTYPE1": "sedimentary",
+                "ROCKTYPE2": "sandstone",
+                "MIN_AGE_MA": age - 50.0,
+                "MAX_AGE_MA": age,
+                "geometry": Polygon(ring),
+            }
+        )
+    geology = geopandas.GeoDataFrame(geology_rows, crs=CRS)
+
+    fault_rows = []
+    positions = numpy.sort(rng.uniform(minx, maxx, faults))
+    for i, x0 in enumerate(positions):
+        fault_y = numpy.linspace(miny, maxy, 50)
+        fault_x = x0 + (map_size / 50.0) * numpy.sin(
+            2 * numpy.pi * (fault_y - miny) / map_size + rng.uniform(0, 2 * numpy.pi)
+        )
+        fault_rows.append(
+            {
+                "OBJECTID": i,
+                "FEATURE": "Fault",
+                "NAME": f"Fault_{i:03d}",
+                "DIP": 70.0,
+                "DIP_DIR": 90.0 if i % 2 == 0 else 270.0,
+                "DIP_EST": "steep",
+                "geometry": LineString(zip(fault_x, fault_y)),
+            }
+        )
+    faults_gdf = geopandas.GeoDataFrame(fault_rows, crs=CRS)
+
+    fold_rows = []
+    # axial traces where the boundaries reach their crests and troughs
+    crest = minx + wavelength / 4.0
+    i = 0
+    while crest < maxx:
+        fold_rows.append(
+            {
+                "OBJECTID": i,
+                "FEATURE": "Fold axial trace",
+                "TYPE": "anticline" if i % 2 == 0 else "syncline",
+                "geometry": LineString([(crest, miny), (crest, maxy)]),
+            }
+        )
+        crest += wavelength / 2.0
+        i += 1
+    folds = geopandas.GeoDataFrame(fold_rows, crs=CRS)
+
+    # bedding dips north, its dip direction follows the slope of the fold
+    px = rng.uniform(minx, maxx, points)
+    py = rng.uniform(miny, maxy, points)
+    slope = (
+        amplitude * 2 * numpy.pi / wavelength * numpy.cos(2 * numpy.pi * px / wavelength)
+    )
+    dip_dir = numpy.mod(-numpy.degrees(numpy.arctan(slope)), 360.0)
+    dip = numpy.clip(30.0 + rng.normal(0.0, 5.0, points), 5.0, 85.0)
+    structure = geopandas.GeoDataFrame(
+        {
+            "GEOPNT_ID": numpy.arange(points),
+            "FEATURE": "Bed",
+            "TYPE": "upright",
+            "DIP": numpy.round(dip, 1),
+            "DIP_DIR": numpy.round(dip_dir, 1),
+        },
+        geometry=[Point(x, y) for x, y in zip(px, py)],
+        crs=CRS,
+    )
+
+    # the dtm is square (load_and_reproject_dtm expects it) and covers a margin
+    # around the map, elevations stay well above 0 which is the nodata value
+    margin = map_size * 0.05
+    transform = rasterio.transform.from_bounds(
+        minx - margin,
+        miny - margin,
+        maxx + margin,
+        maxy + margin,
+        raster_size,
+        raster_size,
+    )
+    cols, rows = numpy.meshgrid(numpy.arange(raster_size), numpy.arange(raster_size))
+    gx, gy = rasterio.transform.xy(transform, rows.ravel(), cols.ravel())
+    gx = numpy.asarray(gx).reshape(raster_size, raster_size)
+    gy = numpy.asarray(gy).reshape(raster_size, raster_size)
+    elevation = (
+        400.0
+        + 150.0 * numpy.sin(2 * numpy.pi * (gx - minx) / wavelength)
+        + 100.0 * numpy.cos(2 * numpy.pi * (gy - miny) / map_size)
+        + rng.normal(0.0, 5.0, (raster_size, raster_size))
+    ).astype(numpy.float32)
+
+    files = {
+        "geology_filename": os.path.join(directory, "geology.shp"),
+        "fault_filename": os.path.join(directory, "faults.shp"),
+        "fold_filename": os.path.join(directory, "folds.shp"),
+        "structure_filename": os.path.join(directory, "structure.shp"),
+        "dtm_filename": os.path.join(directory, "dtm.tif"),
+        "metadata_filename": os.path.join(directory, "meta.hjson"),
+    }
+    geology.to_file(files["geology_filename"])
+    faults_gdf.to_file(files["fault_filename"])
+    folds.to_file(files["fold_filename"])
+    structure.to_file(files["structure_filename"])
+    with rasterio.open(
+        files["dtm_filename"],
+        "w",
+        driver="GTiff",
+        width=raster_size,
+        height=raster_size,
+        count=1,
+        dtype="float32",
+        crs=CRS,
+        transform=transform,
+        nodata=0,
+    ) as dst:
+        dst.write(elevation, 1)
+    with open(files["metadata_filename"], "w") as f:
+        hjson.dump(METADATA, f)
+
+    return {
+        "files": files,
+        "bbox_3d": {
+            "minx": minx,
+            "miny": miny,
+            "maxx": maxx,
+            "maxy": maxy,
+            "base": -3200.0,
+            "top": 1200.0,
+        },
+        "working_projection": CRS,
+        "params": {
+            "units": units,
+            "faults": faults,
+            "points": points,
+            "raster_size": raster_size,
+            "map_size": map_size,
+            "vertices": vertices,
+            "seed": seed,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic map2loop map")
+    parser.add_argument("directory", help="Where the files are written")
+    parser.add_argument(
+        "--scale", default="small", help=f"One of {list(SCALES)} or a multiple of small"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    result = make_synthetic_map(args.directory, seed=args.seed, **get_scale(args.scale))
+    print(json.dumps(result, indent=1))
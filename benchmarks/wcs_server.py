@@ -0,0 +1,228 @@
+"""
+A local stand-in for a WCS 1.0.0 DTM server
+
+LocalWcsServer serves GetCapabilities and GetCoverage requests from a local
+GeoTIFF, so m2l_utils.fetch_wcs_dtm can be benchmarked offline. The GeoTIFF
+is reprojected to EPSG:4326 once at start up and each GetCoverage is
+resampled from it at the requested bbox and size. A fixed latency and a
+random failure rate per request can be set to mimic a slow or flaky server.
+"""
+import argparse
+import http.server
+import random
+import threading
+import time
+import urllib.parse
+
+import numpy
+import rasterio
+import rasterio.io
+import rasterio.transform
+import rasterio.warp
+from rasterio.enums import Resampling
+
+CAPABILITIES = """<?xml version="1.0" encoding="UTF-8"?>
+<WCS_Capabilities xmlns="http://www.opengis.net/wcs" xmlns:gml="http://www.opengis.net/gml" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.0.0">
+  <Service>
+    <name>WCS</name>
+    <label>map2loop local DTM</label>
+    <fees>NONE</fees>
+    <accessConstraints>NONE</accessConstraints>
+  </Service>
+  <Capability>
+    <Request>
+      <GetCapabilities><DCPType><HTTP><Get><OnlineResource xlink:href="{url}"/></Get></HTTP></DCPType></GetCapabilities>
+      <GetCoverage><DCPType><HTTP><Get><OnlineResource xlink:href="{url}"/></Get></HTTP></DCPType></GetCoverage>
+    </Request>
+    <Exception><Format>application/vnd.ogc.se_xml</Format></Exception>
+  </Capability>
+  <ContentMetadata>
+    <CoverageOfferingBrief>
+      <name>1</name>
+      <label>dtm</label>
+      <lonLatEnvelope srsName="urn:ogc:def:crs:OGC:1.3:CRS84">
+        <gml:pos>{minx} {miny}</gml:pos>
+        <gml:pos>{maxx} {maxy}</gml:pos>
+      </lonLatEnvelope>
+    </CoverageOfferingBrief>
+  </ContentMetadata>
+</WCS_Capabilities>
+"""
+
+
+class LocalWcsServer:
+    """
+    A threaded http server answering WCS 1.0.0 requests from a GeoTIFF
+
+    Attributes
+    ----------
+    url: str
+        The service url to pass to load_and_reproject_dtm, set by start
+    latency: float
+        Seconds each request waits before it is answered
+    failure_rate: float
+        Fraction of GetCoverage requests answered with a 503 error
+    requests: int
+        Number of GetCoverage requests received
+    failures: int
+        Number of GetCoverage requests failed on purpose
+    """
+
+    def __init__(
+        self,
+        dtm_filename: str,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        with rasterio.open(dtm_filename) as src:
+            transform, width, height = rasterio.warp.calculate_default_transform(
+                src.crs, "EPSG:4326", src.width, src.height, *src.bounds
+            )
+            self.data = numpy.zeros((height, width), dtype=numpy.float32)
+            rasterio.warp.reproject(
+                src.read(1),
+                self.data,
+                src_transform=src.transform,
+                src_crs=src.crs,
+                dst_transform=transform,
+                dst_crs="EPSG:4326",
+                resampling=Resampling.bilinear,
+            )
+        self.transform = transform
+        self.bounds = rasterio.transform.array_bounds(height, width, transform)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.host = host
+        self.port = port
+        self.url = None
+        self.httpd = None
+        self.thread = None
+
+    def coverage(self, bbox, width: int, height: int) -> bytes:
+        """
+        GeoTIFF bytes of the DTM resampled to a bbox in EPSG:4326
+        """
+        data = numpy.zeros((height, width), dtype=numpy.float32)
+        transform = rasterio.transform.from_bounds(*bbox, width, height)
+        rasterio.warp.reproject(
+            self.data,
+            data,
+            src_transform=self.transform,
+            src_crs="EPSG:4326",
+            dst_transform=transform,
+            dst_crs="EPSG:4326",
+            src_nodata=0,
+            dst_nodata=0,
+            resampling=Resampling.bilinear,
+        )
+        with rasterio.io.MemoryFile() as memfile:
+            with memfile.open(
+                driver="GTiff",
+                width=width,
+                height=height,
+                count=1,
+                dtype="float32",
+                crs="EPSG:4326",
+                transform=transform,
+                nodata=0,
+            ) as dst:
+                dst.write(data, 1)
+            return memfile.read()
+
+    def handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                params = {key.lower(): values[0] for key, values in query.items()}
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                request = params.get("request", "").lower()
+                if request == "getcapabilities":
+                    minx, miny, maxx, maxy = server.bounds
+                    body = CAPABILITIES.format(
+                        url=server.url, minx=minx, miny=miny, maxx=maxx, maxy=maxy
+                    )
+                    self.reply(200, "application/xml", body.encode("utf-8"))
+                elif request == "getcoverage":
+                    with server.lock:
+                        server.requests += 1
+                        fail = server.random.random() < server.failure_rate
+                        if fail:
+                            server.failures += 1
+                    if fail:
+                        self.reply(503, "text/plain", b"simulated failure")
+                        return
+                    try:
+                        bbox = [float(v) for v in params["bbox"].split(",")]
+                        body = server.coverage(
+                            bbox, int(params["width"]), int(params["height"])
+                        )
+                    except Exception as e:
+                        self.reply(400, "text/plain", str(e).encode("utf-8"))
+                        return
+                    self.reply(200, "image/tiff", body)
+                else:
+                    self.reply(400, "text/plain", b"unsupported request")
+
+        return Handler
+
+    def start(self):
+        self.httpd = http.server.ThreadingHTTPServer(
+            (self.host, self.port), self.handler()
+        )
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://{self.host}:{self.port}/wcs"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a GeoTIFF as a local WCS")
+    parser.add_argument("dtm_filename")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = LocalWcsServer(
+        args.dtm_filename,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        port=args.port,
+    ).start()
+    print("Serving", args.dtm_filename, "at", server.url)
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
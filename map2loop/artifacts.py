@@ -0,0 +1,172 @@
+import concurrent.futures
+import os
+import threading
+import warnings
+
+import pandas
+
+
+class Artifact:
+    """
+    Description of an intermediate result passed between stages
+
+    Attributes
+    ----------
+    dtype: type
+        The type every published value must have
+    directory: str
+        The config attribute ("tmp_path" or "output_path") of the directory the file is saved in
+    filename: str
+        The file name the artifact is saved as
+    read: callable
+        Function of the file path returning the value, used when the artifact
+        was not published in this session (e.g. a stage run on its own)
+    write: callable
+        Function of (value, file path) saving the value
+    """
+
+    def __init__(self, dtype, directory: str, filename: str, read, write):
+        self.dtype = dtype
+        self.directory = directory
+        self.filename = filename
+        self.read = read
+        self.write = write
+
+
+def _write_csv(value, filename):
+    value.to_csv(filename, index=False)
+
+
+ARTIFACTS = {
+    # units in stratigraphic order, saved with its "index" column as the csv index
+    "all_sorts": Artifact(
+        pandas.DataFrame,
+        "tmp_path",
+        "all_sorts.csv",
+        pandas.read_csv,
+        lambda value, filename: value.set_index("index").to_csv(filename),
+    ),
+    # decimated basal contact points with X, Y, Z and formation columns
+    "contacts4": Artifact(
+        pandas.DataFrame, "output_path", "contacts4.csv", pandas.read_csv, _write_csv
+    ),
+    "faults": Artifact(
+        pandas.DataFrame, "output_path", "faults.csv", pandas.read_csv, _write_csv
+    ),
+    "fault_orientations": Artifact(
+        pandas.DataFrame,
+        "output_path",
+        "fault_orientations.csv",
+        pandas.read_csv,
+        _write_csv,
+    ),
+    "fault_dimensions": Artifact(
+        pandas.DataFrame,
+        "output_path",
+        "fault_dimensions.csv",
+        pandas.read_csv,
+        _write_csv,
+    ),
+}
+
+
+class ArtifactStore:
+    """
+    An in memory store of the intermediate results stages publish and consume
+
+    Stages publish DataFrames here instead of formatting them into csv files
+    that the next stage parses again. Saving to disk is a side effect done on
+    a background thread, so the csv files are still there for other tools but
+    are off the critical path. Consumers get a copy of the value so they can
+    modify it freely. If an artifact was never published in this session it
+    is read from its file.
+
+    The "artifacts_to_disk" run flag turns the saving off and the
+    "artifacts_async" run flag makes it synchronous when False.
+
+    Attributes
+    ----------
+    config: Config
+        The config giving tmp_path, output_path and the run flags
+    values: dict
+        The published values by name
+    """
+
+    def __init__(self, config=None):
+        self.config = config
+        self.values = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def filename(self, name: str) -> str:
+        artifact = ARTIFACTS[name]
+        return os.path.join(getattr(self.config, artifact.directory), artifact.filename)
+
+    def publish(self, name: str, value):
+        """
+        Store the value of an artifact and save it to disk in the background
+
+        Args:
+            name (str): A key of ARTIFACTS
+            value: The value, of the type declared in ARTIFACTS
+        """
+        if name not in ARTIFACTS:
+            raise NameError(f"map2loop error: Unknown artifact {name}")
+        artifact = ARTIFACTS[name]
+        if not isinstance(value, artifact.dtype):
+            raise TypeError(
+                f"map2loop error: Artifact {name} must be a {artifact.dtype.__name__} not a {type(value).__name__}"
+            )
+        with self.lock:
+            self.values[name] = value
+            if self.config is None or not self.config.run_flags["artifacts_to_disk"]:
+                return
+            if not self.config.run_flags["artifacts_async"]:
+                artifact.write(value, self.filename(name))
+            else:
+                if self.executor is None:
+                    self.executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="artifact_writer"
+                    )
+                # the writer gets its own copy so later in place edits by stages can't race it
+                self.pending.append(
+                    (
+                        name,
+                        self.executor.submit(
+                            artifact.write, value.copy(), self.filename(name)
+                        ),
+                    )
+                )
+
+    def get(self, name: str):
+        """
+        Get a copy of an artifact
+
+        Args:
+            name (str): A key of ARTIFACTS
+
+        Returns:
+            The published value, or the value read from its file if it was not published
+        """
+        with self.lock:
+            if name not in self.values:
+                self.flush()
+                self.values[name] = ARTIFACTS[name].read(self.filename(name))
+            return self.values[name].copy()
+
+    def flush(self):
+        """
+        Wait for pending disk writes, warning about any that failed
+        """
+        pending, self.pending = self.pending, []
+        for name, future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                warnings.warn(f"Could not save artifact {name}: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.flush()
+            self.values = {}
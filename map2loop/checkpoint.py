@@ -0,0 +1,188 @@
+import json
+import os
+import pickle
+import shutil
+import warnings
+
+from .artifacts import ARTIFACTS
+
+# run flags that only change how fast the results are worked out, not the results
+EXECUTION_RUN_FLAGS = [
+    "interpolation_workers",
+    "interpolation_chunk_size",
+    "geology_grid_resolution",
+    "dtm_backend",
+    "dtm_tile_size",
+    "dtm_cache_mb",
+    "dtm_cache_dir",
+    "dtm_cache_max_mb",
+    "dtm_cache_max_age_days",
+    "dtm_wcs_tile_px",
+    "dtm_wcs_workers",
+    "load_workers",
+    "map_cache_dir",
+    "thickness_workers",
+    "thickness_chunk_size",
+    "artifacts_to_disk",
+    "artifacts_async",
+    "stage_workers",
+    "checkpoint_dir",
+    "profile",
+    "profile_print",
+]
+
+
+class StageCheckpoints:
+    """
+    An on disk store of the results of the stages of Project.run
+
+    A checkpoint is kept per stage and key (see StageScheduler.keys) holding
+    copies of the files the stage wrote or changed under the project
+    directory, found by comparing the modification times and sizes before and
+    after the stage, and a pickle of the attributes listed in Stage.state and
+    of the artifacts among its outputs. Restoring copies the files back and
+    sets the attributes and artifacts again.
+
+    Attributes
+    ----------
+    checkpoint_dir: str
+        The directory holding a sub directory per stage and key
+    project_path: str
+        The project directory the stages write into
+    owner: Project
+        The object the Stage.state paths start from
+    """
+
+    def __init__(self, checkpoint_dir: str, project_path: str, owner):
+        self.checkpoint_dir = os.path.abspath(checkpoint_dir)
+        self.project_path = os.path.abspath(project_path)
+        self.owner = owner
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def _dir(self, stage, key: str) -> str:
+        return os.path.join(self.checkpoint_dir, stage.name, key)
+
+    def _manifest(self, stage, key: str) -> str:
+        return os.path.join(self._dir(stage, key), "manifest.json")
+
+    def has(self, stage, key: str) -> bool:
+        return os.path.isfile(self._manifest(stage, key))
+
+    def snapshot(self) -> dict:
+        """
+        Record the modification time and size of every file in the project
+
+        Returns:
+            dict: (mtime, size) by path relative to the project directory
+        """
+        files = {}
+        for root, dirs, filenames in os.walk(self.project_path):
+            if os.path.abspath(root) == self.checkpoint_dir:
+                dirs[:] = []
+                continue
+            dirs[:] = [
+                d
+                for d in dirs
+                if os.path.abspath(os.path.join(root, d)) != self.checkpoint_dir
+            ]
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[os.path.relpath(path, self.project_path)] = (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                )
+        return files
+
+    def _get(self, path: str):
+        value = self.owner
+        for name in path.split("."):
+            value = getattr(value, name)
+        return value
+
+    def _set(self, path: str, value):
+        names = path.split(".")
+        parent = self.owner
+        for name in names[:-1]:
+            parent = getattr(parent, name)
+        setattr(parent, names[-1], value)
+
+    def save(self, stage, key: str, before: dict):
+        """
+        Store the results of a stage that has just run
+
+        Args:
+            stage (Stage): The stage
+            key (str): The key of the stage
+            before (dict): The snapshot taken before the stage ran
+        """
+        artifacts = self.owner.map_data.artifacts
+        # wait for the stage's artifacts to reach the disk so their files are seen
+        artifacts.flush()
+        after = self.snapshot()
+        changed = [path for path in after if before.get(path) != after[path]]
+        directory = self._dir(stage, key)
+        tmp_directory = directory + ".{}.part".format(os.getpid())
+        try:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            for path in changed:
+                target = os.path.join(tmp_directory, "files", path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(self.project_path, path), target)
+            state = {
+                "attributes": {path: self._get(path) for path in stage.state},
+                "artifacts": {
+                    name: artifacts.values[name]
+                    for name in stage.outputs
+                    if name in ARTIFACTS and name in artifacts.values
+                },
+            }
+            with open(os.path.join(tmp_directory, "state.pickle"), "wb") as f:
+                pickle.dump(state, f)
+            # the manifest is written last so only complete checkpoints are found
+            with open(os.path.join(tmp_directory, "manifest.json"), "w") as f:
+                json.dump({"stage": stage.name, "key": key, "files": changed}, f)
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp_directory, directory)
+        except Exception as e:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            warnings.warn(f"Could not checkpoint stage {stage.name}: {e}\n")
+
+    def restore(self, stage, key: str) -> bool:
+        """
+        Put back the results of a stage from its checkpoint
+
+        Args:
+            stage (Stage): The stage
+            key (str): The key of the stage
+
+        Returns:
+            bool: True if the stage was restored, False if it has to be run
+        """
+        if not self.has(stage, key):
+            return False
+        directory = self._dir(stage, key)
+        try:
+            with open(self._manifest(stage, key), "r") as f:
+                files = json.load(f)["files"]
+            with open(os.path.join(directory, "state.pickle"), "rb") as f:
+                state = pickle.load(f)
+            for path in files:
+                target = os.path.join(self.project_path, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(directory, "files", path), target)
+            for path, value in state["attributes"].items():
+                self._set(path, value)
+            for name, value in state["artifacts"].items():
+                self.owner.map_data.artifacts.publish(name, value)
+            return True
+        except Exception as e:
+            warnings.warn(f"Could not restore stage {stage.name}: {e}\n")
+            return False
+
+    def clear(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
@@ -47,6 +47,11 @@ class Config(object):
             "interpolation_spacing": 500,
             "misorientation": 30,
             "interpolation_scheme": "scipy_rbf",
+            "interpolation_neighbours": 16,
+            "interpolation_workers": 1,
+            "interpolation_chunk_size": 25000,
+            "interpolation_mode": "dense",
+            "geology_grid_resolution": 50,
             "fault_decimate": 5,
             "min_fault_length": 5000,
             "fault_dip": 90,
@@ -77,6 +82,24 @@ class Config(object):
             "fault_formation_weight": 5,
             "map2graph": False,
             "granular_map2graph": False,
+            "dtm_backend": "memory",
+            "dtm_tile_size": 512,
+            "dtm_cache_mb": 256,
+            "dtm_cache_dir": "",
+            "dtm_cache_max_mb": 2048,
+            "dtm_cache_max_age_days": 30,
+            "dtm_wcs_tile_px": 512,
+            "dtm_wcs_workers": 4,
+            "load_workers": 1,
+            "map_cache_dir": "",
+            "thickness_workers": 1,
+            "thickness_chunk_size": 2000,
+            "artifacts_to_disk": True,
+            "artifacts_async": True,
+            "stage_workers": 1,
+            "checkpoint_dir": "",
+            "profile": False,
+            "profile_print": False,
         }
 
     @beartype.beartype
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+
+import rasterio
+
+from . import m2l_utils
+
+
+class DtmCache:
+    """
+    A persistent on disk cache of downloaded, reprojected and clipped DTMs
+
+    Entries are geotiffs named by a hash of everything that determines their
+    content (the source, the lat/long bounding box including step_out, the dtm
+    crs, the working projection and the dtm backend and tile size, which set
+    the geotiff's layout) so a repeated run over the same area skips the
+    coverage download and the warp. Local file sources also hash the file size
+    and modification time so an edited file is fetched again. A run never opens
+    a cache entry in place, so evicting entries can't pull a DTM from under a
+    run that is using it.
+
+    Attributes
+    ----------
+    cache_dir: str
+        The directory holding the cached geotiffs and their json sidecars
+    max_size_mb: float
+        Total size allowed for the cache, least recently used entries are evicted first
+    max_age_days: float
+        Entries stored longer ago than this are evicted, 0 or less means no limit
+    """
+
+    def __init__(
+        self, cache_dir: str, max_size_mb: float = 2048, max_age_days: float = 30
+    ):
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        source: str,
+        bbox,
+        dtm_crs,
+        working_projection,
+        dtm_backend: str = "memory",
+        dtm_tile_size: int = 512,
+    ) -> str:
+        """
+        Build the content address of a DTM
+
+        Args:
+            source (str): The url, "AU" or local path the DTM is fetched from
+            bbox (tuple): (minlong, minlat, maxlong, maxlat) in dtm_crs, including step_out
+            dtm_crs (str): The crs of the source DTM e.g. "EPSG:4326"
+            working_projection (str): The crs the DTM is reprojected into
+            dtm_backend (str, optional): The dtm_backend run flag. Defaults to "memory".
+            dtm_tile_size (int, optional): The dtm_tile_size run flag. Defaults to 512.
+
+        Returns:
+            str: hex digest identifying the cache entry
+        """
+        params = {
+            "source": source,
+            "bbox": [round(float(b), 8) for b in bbox],
+            "dtm_crs": str(dtm_crs),
+            "working_projection": str(working_projection),
+            "dtm_backend": str(dtm_backend),
+            "dtm_tile_size": int(dtm_tile_size),
+        }
+        if os.path.isfile(source):
+            stat = os.stat(source)
+            params["source_size"] = stat.st_size
+            params["source_mtime"] = stat.st_mtime_ns
+        payload = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _tif(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".tif")
+
+    def _sidecar(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _created(self, key: str) -> float:
+        try:
+            with open(self._sidecar(key), "r") as f:
+                return float(json.load(f)["created"])
+        except Exception:
+            return os.path.getmtime(self._tif(key))
+
+    def _expired(self, key: str) -> bool:
+        if self.max_age_days is None or self.max_age_days <= 0:
+            return False
+        return time.time() - self._created(key) > self.max_age_days * 86400
+
+    def remove(self, key: str):
+        for filename in (self._tif(key), self._sidecar(key)):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def get(self, key: str):
+        """
+        Look up a cache entry, marking it as recently used
+
+        Args:
+            key (str): The key from make_key
+
+        Returns:
+            str or None: Path of the cached geotiff or None on a miss
+        """
+        filename = self._tif(key)
+        if not os.path.isfile(filename):
+            return None
+        if self._expired(key):
+            self.remove(key)
+            return None
+        os.utime(filename, None)
+        return filename
+
+    def load(self, key: str, dst_path: str = None):
+        """
+        Open a cached DTM in the same form load_and_reproject_dtm returns it
+
+        Args:
+            key (str): The key from make_key
+            dst_path (str, optional): Copy the cached geotiff here and return a
+                m2l_utils.DtmFile over the copy, so the entry can be evicted while
+                the DTM is in use. Defaults to None, a rasterio MemoryFile.
+
+        Returns:
+            rasterio.io.MemoryFile or m2l_utils.DtmFile or None: The DTM or None on a miss
+        """
+        filename = self.get(key)
+        if filename is None:
+            return None
+        try:
+            if dst_path is None:
+                with open(filename, "rb") as f:
+                    return rasterio.io.MemoryFile(f.read())
+            shutil.copyfile(filename, dst_path)
+        except FileNotFoundError:
+            # evicted by another run between the lookup and the read
+            return None
+        return m2l_utils.DtmFile(dst_path)
+
+    def put(self, key: str, dtm, params: dict = None):
+        """
+        Store a DTM and evict old entries
+
+        Args:
+            key (str): The key from make_key
+            dtm (rasterio.io.MemoryFile or m2l_utils.DtmFile): The reprojected DTM
+            params (dict, optional): Extra description stored in the json sidecar
+
+        Returns:
+            str: Path of the cached geotiff
+        """
+        filename = self._tif(key)
+        tmp_filename = filename + ".{}.part".format(os.getpid())
+        if isinstance(dtm, m2l_utils.DtmFile):
+            shutil.copyfile(dtm.name, tmp_filename)
+        else:
+            with open(tmp_filename, "wb") as f:
+                f.write(dtm.getbuffer())
+        os.replace(tmp_filename, filename)
+        with open(self._sidecar(key), "w") as f:
+            json.dump({"created": time.time(), "params": params or {}}, f)
+        self.evict(keep=(key,))
+        return filename
+
+    def entries(self):
+        """
+        List cache entries as (key, size in bytes, last used time) tuples
+        """
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".tif"):
+                path = os.path.join(self.cache_dir, filename)
+                stat = os.stat(path)
+                entries.append((filename[:-4], stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, keep=()):
+        """
+        Remove expired entries, then least recently used entries until the cache fits max_size_mb
+
+        Args:
+            keep (tuple, optional): Keys that are never evicted, e.g. the entry just stored. Defaults to ().
+        """
+        entries = []
+        # kept entries still take up space, they count towards the cap but are never removed
+        kept = 0
+        for key, size, used in self.entries():
+            if key in keep:
+                kept += size
+            elif self._expired(key):
+                self.remove(key)
+            else:
+                entries.append((used, size, key))
+        total = kept + sum(size for _, size, _ in entries)
+        limit = self.max_size_mb * 1024 * 1024
+        for used, size, key in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                self.remove(key)
+                total -= size
+            except OSError as e:
+                warnings.warn(f"Could not evict DTM cache entry {key}: {e}")
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            self.remove(key)
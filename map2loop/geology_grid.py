@@ -0,0 +1,163 @@
+import geopandas
+import numpy as np
+import pandas as pd
+import rasterio.features
+import rasterio.transform
+import shapely
+
+from .profiler import timer_decorator, count_items
+
+
+class GeologyGrid:
+    """
+    A rasterised lookup of which geology polygon each point falls in
+
+    The polygons are burnt once into a grid of row positions at a fixed
+    resolution so point to unit lookups are a single array index. Cells that
+    the polygon boundaries pass through, and points outside the grid, fall back
+    to an exact point within polygon test, so the answers match
+    geopandas.sjoin(points, geology, how="left", predicate="within") except that
+    a point inside overlapping polygons only gets the first of them.
+
+    Attributes
+    ----------
+    geology: geopandas.GeoDataFrame
+        The geology polygons the grid was built from
+    bounds: tuple
+        (minx, miny, maxx, maxy) of the grid
+    resolution: float
+        The cell size of the grid in the units of the geology crs
+    ids: numpy.ndarray
+        The grid of geology row positions, -1 where there is no polygon
+    edges: numpy.ndarray
+        The grid of boolean flags marking cells touched by a polygon boundary
+    """
+
+    def __init__(self, geology, bounds, resolution: float = 50):
+        self.geology = geology
+        self.resolution = float(resolution)
+        minx, miny, maxx, maxy = bounds
+        width = max(int(np.ceil((maxx - minx) / self.resolution)), 1)
+        height = max(int(np.ceil((maxy - miny) / self.resolution)), 1)
+        self.bounds = (
+            minx,
+            maxy - height * self.resolution,
+            minx + width * self.resolution,
+            maxy,
+        )
+        self.transform = rasterio.transform.from_origin(
+            minx, maxy, self.resolution, self.resolution
+        )
+        geometry = np.asarray(geology.geometry)
+        valid = ~shapely.is_missing(geometry) & ~shapely.is_empty(geometry)
+        positions = np.flatnonzero(valid)
+        if len(positions) > 0:
+            # burnt last to first so the first of any overlapping polygons wins
+            self.ids = rasterio.features.rasterize(
+                ((geometry[p], int(p) + 1) for p in positions[::-1]),
+                out_shape=(height, width),
+                transform=self.transform,
+                fill=0,
+                dtype="int32",
+            ) - 1
+            self.edges = rasterio.features.rasterize(
+                ((boundary, 1) for boundary in shapely.boundary(geometry[positions])),
+                out_shape=(height, width),
+                transform=self.transform,
+                fill=0,
+                all_touched=True,
+                dtype="uint8",
+            ).astype(bool)
+        else:
+            self.ids = np.full((height, width), -1, dtype="int32")
+            self.edges = np.zeros((height, width), dtype=bool)
+
+    @timer_decorator
+    def lookup(self, xy):
+        """
+        Find the geology polygon each point is within
+
+        Args:
+            xy (numpy.ndarray): (N, 2) array of point locations
+
+        Returns:
+            numpy.ndarray: row positions in geology, -1 for points not within a polygon
+        """
+        xy = np.asarray(xy, dtype=float).reshape((-1, 2))
+        count_items("points", len(xy))
+        col = np.floor((xy[:, 0] - self.bounds[0]) / self.resolution).astype(int)
+        row = np.floor((self.bounds[3] - xy[:, 1]) / self.resolution).astype(int)
+        inside = (
+            (row >= 0)
+            & (row < self.ids.shape[0])
+            & (col >= 0)
+            & (col < self.ids.shape[1])
+        )
+        positions = np.full(len(xy), -1, dtype=int)
+        positions[inside] = self.ids[row[inside], col[inside]]
+        exact = ~inside
+        exact[inside] = self.edges[row[inside], col[inside]]
+        if exact.any():
+            positions[exact] = self.exact_lookup(xy[exact])
+        return positions
+
+    def exact_lookup(self, xy):
+        """
+        Polygon exact version of lookup used near boundaries and outside the grid
+        """
+        positions = np.full(len(xy), len(self.geology), dtype=int)
+        point_idx, geology_idx = self.geology.sindex.query(
+            shapely.points(xy), predicate="within"
+        )
+        np.minimum.at(positions, point_idx, geology_idx)
+        positions[positions == len(self.geology)] = -1
+        return positions
+
+    def values(self, xy, column: str = "UNIT_NAME"):
+        """
+        Look up a geology column at each point
+
+        Args:
+            xy (numpy.ndarray): (N, 2) array of point locations
+            column (str, optional): The geology column to return. Defaults to "UNIT_NAME".
+
+        Returns:
+            numpy.ndarray: the column value of the polygon at each point, nan where there is none
+        """
+        positions = self.lookup(xy)
+        values = self.geology[column].to_numpy()
+        if len(values) == 0:
+            return np.full(len(positions), np.nan)
+        if values.dtype.kind in "iub":
+            values = values.astype(float)
+        return np.where(positions >= 0, values[np.maximum(positions, 0)], np.nan)
+
+    @timer_decorator
+    def sjoin(self, points):
+        """
+        Join the geology attributes onto a layer of points like
+        geopandas.sjoin(points, geology, how="left", predicate="within")
+
+        Args:
+            points (geopandas.GeoDataFrame): The point layer
+
+        Returns:
+            geopandas.GeoDataFrame: points with index_right and the geology columns added
+        """
+        positions = self.lookup(
+            np.column_stack((points.geometry.x.to_numpy(), points.geometry.y.to_numpy()))
+        )
+        attributes = pd.DataFrame(
+            self.geology.drop(columns=self.geology.geometry.name)
+        )
+        attributes.insert(0, "index_right", self.geology.index)
+        attributes = attributes.reset_index(drop=True).reindex(positions)
+        attributes.index = points.index
+        clashes = set(points.columns).intersection(attributes.columns)
+        joined = points.rename(columns={c: c + "_left" for c in clashes})
+        attributes = attributes.rename(columns={c: c + "_right" for c in clashes})
+        return geopandas.GeoDataFrame(
+            pd.concat([joined, attributes], axis=1),
+            geometry=points.geometry.name,
+            crs=points.crs,
+        )
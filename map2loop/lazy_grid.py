@@ -0,0 +1,185 @@
+import numpy as np
+
+from . import m2l_interpolation
+from .m2l_enums import VerboseLevel
+
+
+class LazyInterpolationGrids:
+    """
+    The interpolated dip, dip direction, polarity and contact grids evaluated on demand
+
+    Holds the same values as m2l_interpolation.interpolation_to_grids would give
+    for interpolation_grids, but no node is evaluated until a cell is read.
+    Reading a cell evaluates the tile_size x tile_size tile around it in one
+    vectorised call and caches it, and each supergroup's interpolants are only
+    fitted the first time one of its nodes is needed. Runs over a large bbox
+    where later stages only read the grids at contacts, faults and structures
+    then only pay for the tiles around those features.
+
+    Attributes
+    ----------
+    shape: tuple
+        (config.height, config.width) of the grids
+    tile_size: int
+        Number of rows and columns of nodes evaluated together
+    tiles: dict
+        Evaluated tiles keyed by (tile row, tile column), each a (4, rows, cols)
+        array of dip, dip_dir, polarity and contact values
+    """
+
+    names = ["dip", "dip_dir", "polarity", "contact"]
+
+    def __init__(
+        self, config, map_data, basal_contacts_filename: str, super_groups: list, tile_size: int = 32
+    ):
+        self.config = config
+        self.map_data = map_data
+        (
+            self.geology,
+            self.orientations,
+            self.contacts,
+        ) = m2l_interpolation.interpolation_inputs(
+            config, map_data, basal_contacts_filename
+        )
+        self.spacing = m2l_interpolation.interpolation_spacing(config)
+        self.shape = (config.height, config.width)
+        self.tile_size = tile_size
+        self.super_groups = super_groups
+        # a group listed in more than one supergroup uses the last of them
+        self.group_index = {}
+        for i, groups in enumerate(super_groups):
+            for group in groups:
+                self.group_index[group] = i
+        self.fits = {}
+        self.tiles = {}
+
+    def grid(self, name: str):
+        """
+        Get one of the grids
+
+        Args:
+            name (str): One of "dip", "dip_dir", "polarity" or "contact"
+
+        Returns:
+            LazyGrid: The grid, indexed [r, c] like the dense numpy grids
+        """
+        return LazyGrid(self, self.names.index(name))
+
+    def fit(self, supergroup: int):
+        if supergroup not in self.fits:
+            if self.config.verbose_level != VerboseLevel.NONE:
+                print(self.super_groups[supergroup])
+            self.fits[supergroup] = m2l_interpolation.fit_supergroup(
+                self.config,
+                self.orientations,
+                self.contacts,
+                self.super_groups[supergroup],
+            )
+        return self.fits[supergroup]
+
+    def tile(self, tile_row: int, tile_col: int):
+        key = (tile_row, tile_col)
+        if key not in self.tiles:
+            self.tiles[key] = self.evaluate_tile(tile_row, tile_col)
+        return self.tiles[key]
+
+    def evaluate_tile(self, tile_row: int, tile_col: int):
+        rows = np.arange(
+            tile_row * self.tile_size, min((tile_row + 1) * self.tile_size, self.shape[0])
+        )
+        cols = np.arange(
+            tile_col * self.tile_size, min((tile_col + 1) * self.tile_size, self.shape[1])
+        )
+        r, c = np.meshgrid(rows, cols, indexing="ij")
+        x = self.config.bbox[0] + c.ravel() * self.spacing
+        y = self.config.bbox[1] + r.ravel() * self.spacing
+
+        values = np.full((len(self.names), len(x)), -999.0)
+        positions = self.map_data.get_geology_grid().lookup(np.column_stack((x, y)))
+        groups = self.geology["GROUP"].to_numpy()
+        supergroups = np.array(
+            [self.group_index.get(groups[p], -1) if p >= 0 else -1 for p in positions]
+        )
+        for supergroup in np.unique(supergroups):
+            if supergroup < 0:
+                continue
+            nodes = supergroups == supergroup
+            orientation_interpolators, contact_interpolators = self.fit(supergroup)
+            n = np.zeros(nodes.sum())
+            contact_l = np.zeros(nodes.sum())
+            contact_m = np.zeros(nodes.sum())
+            angle = np.zeros(nodes.sum())
+            if orientation_interpolators is not None:
+                _, _, n, _, _ = m2l_interpolation.evaluate_orientation_grid(
+                    orientation_interpolators, x[nodes], y[nodes]
+                )
+            if contact_interpolators is not None:
+                contact_l, contact_m, angle = m2l_interpolation.evaluate_contacts_grid(
+                    contact_interpolators, x[nodes], y[nodes]
+                )
+            (
+                _,
+                _,
+                dip,
+                dip_direction,
+            ) = m2l_interpolation.combine_orientations_and_contacts(
+                n, contact_l, contact_m
+            )
+            values[0, nodes] = dip
+            values[1, nodes] = dip_direction
+            values[2, nodes] = n
+            values[3, nodes] = angle
+        return values.reshape((len(self.names), len(rows), len(cols)))
+
+    def to_array(self, band: int):
+        """
+        Evaluate every tile and return one grid as a dense numpy array
+        """
+        grid = np.empty(self.shape)
+        for tile_row in range(0, -(-self.shape[0] // self.tile_size)):
+            for tile_col in range(0, -(-self.shape[1] // self.tile_size)):
+                tile = self.tile(tile_row, tile_col)[band]
+                grid[
+                    tile_row * self.tile_size : tile_row * self.tile_size + tile.shape[0],
+                    tile_col * self.tile_size : tile_col * self.tile_size + tile.shape[1],
+                ] = tile
+        return grid
+
+
+class LazyGrid:
+    """
+    One grid of a LazyInterpolationGrids, read with grid[r, c] like a 2D numpy
+    array. Any other indexing, or np.asarray(grid), evaluates the whole grid
+    """
+
+    def __init__(self, grids: LazyInterpolationGrids, band: int):
+        self.grids = grids
+        self.band = band
+        self.shape = grids.shape
+        self.ndim = 2
+        self.dtype = np.dtype("float64")
+
+    def __getitem__(self, key):
+        if (
+            isinstance(key, tuple)
+            and len(key) == 2
+            and all(isinstance(k, (int, np.integer)) for k in key)
+        ):
+            r, c = key
+            if r < 0:
+                r = r + self.shape[0]
+            if c < 0:
+                c = c + self.shape[1]
+            if not (0 <= r < self.shape[0] and 0 <= c < self.shape[1]):
+                raise IndexError(
+                    "index {} is out of bounds for grid of shape {}".format(key, self.shape)
+                )
+            size = self.grids.tile_size
+            return self.grids.tile(r // size, c // size)[self.band, r % size, c % size]
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None):
+        grid = self.grids.to_array(self.band)
+        if dtype is not None:
+            grid = grid.astype(dtype)
+        return grid
@@ -26,10 +26,12 @@ from . import m2l_utils
 from . import m2l_interpolation
 import numpy as np
 import os
+import concurrent.futures
 import random
 import networkx as nx
 import statistics
 from shapely.ops import snap
+import shapely
 import beartype
 from .m2l_enums import Datatype, VerboseLevel
 from .config import Config
@@ -72,8 +74,7 @@ def save_orientations(config: Config, map_data: MapData, workflow):
     """
     structures = map_data.get_map_data(Datatype.STRUCTURE)
     dtm = map_data.get_map_data(Datatype.DTM).open()
-    dtb = map_data.dtb
-    dtb_null = map_data.dtb_null
+    dtm_sampler = map_data.get_dtm_sampler()
     is_bed = structures["STRUCTURE_TYPE"].str.contains(
         config.c_l["bedding"], regex=False
     )
@@ -83,7 +84,11 @@ def save_orientations(config: Config, map_data: MapData, workflow):
     i = 0
     f = open(os.path.join(config.output_path, "orientations.csv"), "w")
     f.write("X,Y,Z,azimuth,dip,polarity,formation\n")
-    for indx, apoint in structure_clip.iterrows():
+    clip_heights = dtm_sampler.values(
+        np.column_stack([structure_clip.geometry.x, structure_clip.geometry.y]),
+        workflow["cover_map"],
+    )
+    for (indx, apoint), point_height in zip(structure_clip.iterrows(), clip_heights):
         if not str(apoint["ROCKTYPE1"]) == "None":
             if not str(apoint["ROCKTYPE1"]) == "nan":
                 if not config.c_l["intrusive"] in apoint["ROCKTYPE1"]:
@@ -91,16 +96,13 @@ def save_orientations(config: Config, map_data: MapData, workflow):
                         apoint["DIP"] != 0
                         and i % config.run_flags["orientation_decimate"] == 0
                     ):
-                        locations = [(apoint["geometry"].x, apoint["geometry"].y)]
                         if (
                             apoint["geometry"].x > dtm.bounds[0]
                             and apoint["geometry"].x < dtm.bounds[2]
                             and apoint["geometry"].y > dtm.bounds[1]
                             and apoint["geometry"].y < dtm.bounds[3]
                         ):
-                            height = m2l_utils.value_from_dtm_dtb(
-                                dtm, dtb, dtb_null, workflow["cover_map"], locations
-                            )
+                            height = point_height
                             dipdir = apoint["DIPDIR"]
                             if apoint["POLARITY"] != config.c_l["btype"]:
                                 polarity = 1
@@ -142,7 +144,13 @@ def save_orientations(config: Config, map_data: MapData, workflow):
         ]
         f = open(os.path.join(config.output_path, "secondary_orientations.csv"), "w")
         f.write("X,Y,Z,type,azimuth,dip,polarity,formation\n")
-        for indx, apoint in structures.iterrows():
+        structure_heights = dtm_sampler.values(
+            np.column_stack([structures.geometry.x, structures.geometry.y]),
+            workflow["cover_map"],
+        )
+        for (indx, apoint), point_height in zip(
+            structures.iterrows(), structure_heights
+        ):
             if not str(apoint["ROCKTYPE1"]) == "None":
                 if not str(apoint["ROCKTYPE1"]) == "nan":
                     if not config.c_l["intrusive"] in apoint["ROCKTYPE1"]:
@@ -150,16 +158,13 @@ def save_orientations(config: Config, map_data: MapData, workflow):
                             apoint["DIP"] != 0
                             and i % config.run_flags["orientation_decimate"] == 0
                         ):
-                            locations = [(apoint["geometry"].x, apoint["geometry"].y)]
                             if (
                                 apoint["geometry"].x > dtm.bounds[0]
                                 and apoint["geometry"].x < dtm.bounds[2]
                                 and apoint["geometry"].y > dtm.bounds[1]
                                 and apoint["geometry"].y < dtm.bounds[3]
                             ):
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm, dtb, dtb_null, workflow["cover_map"], locations
-                                )
+                                height = point_height
                                 dipdir = apoint["DIPDIR"]
                                 polarity = 1
                                 index = 0
@@ -287,7 +292,8 @@ def create_orientations(config: Config, map_data: MapData, workflow: dict):
     f.write("X,Y,Z,azimuth,dip,polarity,formation\n")
     # f.write("X,Y,Z,DipDirection,dip,dippolarity,formation\n")
 
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
+    empty_points = []
     for i in range(0, ngroups):
         if groups[i][1] == 0:
             for indx, ageol in geology.iterrows():
@@ -299,27 +305,25 @@ def create_orientations(config: Config, map_data: MapData, workflow: dict):
                     apoly = Polygon(ageol["geometry"])
                     apoint = apoly.representative_point()
                     # print(apoint.x,apoint.y)
-                    locations = [(apoint.x, apoint.y)]
-                    height = m2l_utils.value_from_dtm_dtb(
-                        dtm,
-                        map_data.dtb,
-                        map_data.dtb_null,
-                        workflow["cover_map"],
-                        locations,
-                    )
-                    if height == -999:
-                        print("point off map", locations)
-                        height = 0  # needs a better solution!
-                    ostr = "{},{},{},{},{},{},{}\n".format(
-                        apoint.x, apoint.y, height, 0, 45, 1, ageol["UNIT_NAME"]
-                    )
-                    # ostr = str(apoint.x)+","+str(apoint.y)+","+height+",0,45,1"+","+str(ageol['UNIT_NAME'])+"\n"
-                    f.write(ostr)
+                    empty_points.append((apoint, ageol["UNIT_NAME"]))
                     # plt.title(str(ageol['UNIT_NAME']))
                     # plt.scatter(apoint.x,apoint.y,color = "red")
                     # plt.plot(*apoly.exterior.xy)
                     # plt.show()
                     break
+    heights = dtm_sampler.values(
+        [(apoint.x, apoint.y) for apoint, unit_name in empty_points],
+        workflow["cover_map"],
+    )
+    for (apoint, unit_name), height in zip(empty_points, heights):
+        if height == -999:
+            print("point off map", [(apoint.x, apoint.y)])
+            height = 0  # needs a better solution!
+        ostr = "{},{},{},{},{},{},{}\n".format(
+            apoint.x, apoint.y, height, 0, 45, 1, unit_name
+        )
+        # ostr = str(apoint.x)+","+str(apoint.y)+","+height+",0,45,1"+","+str(ageol['UNIT_NAME'])+"\n"
+        f.write(ostr)
 
     f.close()
     if config.verbose_level != VerboseLevel.NONE:
@@ -378,6 +382,98 @@ def extract_poly_coords(geom, i):
     return {"exterior_coords": exterior_coords, "interior_coords": interior_coords}
 
 
+####################################################
+# find the contacts shared by each pair of units from a single planar noding of all unit boundaries
+#
+# extract_shared_boundaries(units,column,tolerance)
+# Args:
+# units geopandas polygon layer with one (multi)polygon per unit
+# column name of the unit name column
+# tolerance distance in projection units within which a boundary edge is considered shared with a neighbouring unit
+# Returns:
+# geopandas layer with one row per touching pair of units, columns <column>_1, <column>_2, geometry. Pairs are ordered
+# as in units, geometry is the part of the boundary of the second unit shared with the first
+#
+# All unit boundaries are noded once (shapely.union_all), every resulting edge is matched to the unit boundaries
+# within tolerance of its midpoint through a spatial index, and edges lying on two units are grouped by unit pair.
+# Cost grows with the number of boundary vertices instead of the square of the number of units.
+####################################################
+
+
+def extract_shared_boundaries(units, column="UNIT_NAME", tolerance=1.0):
+    column_names = [column + "_1", column + "_2", "geometry"]
+    units = units.reset_index(drop=True)
+    boundaries = units.geometry.boundary
+    if len(units) < 2:
+        return gpd.GeoDataFrame(
+            columns=column_names, geometry="geometry", crs=units.crs
+        )
+
+    # node all boundaries against each other so shared stretches become identical edges
+    edges = shapely.get_parts(
+        shapely.get_parts(shapely.union_all(np.asarray(boundaries)))
+    )
+    edges = edges[shapely.get_type_id(edges) == 1]  # LineStrings only
+    midpoints = shapely.line_interpolate_point(edges, 0.5, normalized=True)
+
+    # candidate units for every edge, then the two nearest within tolerance
+    edge_idx, unit_idx = boundaries.sindex.query(
+        shapely.buffer(midpoints, tolerance), predicate="intersects"
+    )
+    candidates = pd.DataFrame(
+        {
+            "edge": edge_idx,
+            "unit": unit_idx,
+            "distance": shapely.distance(
+                midpoints[edge_idx], np.asarray(boundaries)[unit_idx]
+            ),
+        }
+    )
+    candidates = candidates[candidates["distance"] <= tolerance]
+    candidates = candidates.sort_values(["edge", "distance"], kind="stable")
+    rank = candidates.groupby("edge").cumcount()
+    first = candidates[rank == 0].set_index("edge")
+    second = candidates[rank == 1].set_index("edge")
+    pairs = first.join(second, lsuffix="_a", rsuffix="_b", how="inner")
+
+    unit1 = np.minimum(pairs["unit_a"], pairs["unit_b"]).to_numpy()
+    unit2 = np.maximum(pairs["unit_a"], pairs["unit_b"]).to_numpy()
+    distance2 = np.where(
+        pairs["unit_a"].to_numpy() == unit2,
+        pairs["distance_a"].to_numpy(),
+        pairs["distance_b"].to_numpy(),
+    )
+    # keep edges lying on the boundary of the second unit, so near coincident
+    # boundaries only contribute one copy of the contact
+    on_unit2 = distance2 <= tolerance * 1e-3
+    pairs = pd.DataFrame(
+        {
+            "edge": pairs.index.to_numpy()[on_unit2],
+            "unit1": unit1[on_unit2],
+            "unit2": unit2[on_unit2],
+        }
+    ).sort_values(["unit1", "unit2", "edge"], kind="stable")
+    if len(pairs) == 0:
+        return gpd.GeoDataFrame(
+            columns=column_names, geometry="geometry", crs=units.crs
+        )
+
+    group = pairs.groupby(["unit1", "unit2"], sort=True).ngroup().to_numpy()
+    keys = pairs.drop_duplicates(["unit1", "unit2"])
+    geometry = shapely.line_merge(
+        shapely.multilinestrings(edges[pairs["edge"].to_numpy()], indices=group)
+    )
+    names = units[column].to_numpy()
+    return gpd.GeoDataFrame(
+        {
+            column_names[0]: names[keys["unit1"].to_numpy()],
+            column_names[1]: names[keys["unit2"].to_numpy()],
+        },
+        geometry=geometry,
+        crs=units.crs,
+    )
+
+
 ####################################################
 # extract stratigraphically lower contacts from geology polygons and save as points
 #
@@ -411,31 +507,12 @@ def save_basal_contacts(
     # Remove intrusions for geology
     geology = geology[~geology["ROCKTYPE1"].str.contains(config.c_l["intrusive"])]
     geology = geology.dissolve(by="UNIT_NAME", as_index=False)
-    units = geology["UNIT_NAME"].unique()
-    column_names = ["UNIT_NAME_1", "UNIT_NAME_2", "geometry"]
-    contacts = gpd.GeoDataFrame(crs=geology.crs, columns=column_names, data=None)
-    while len(units) > 1:
-        unit1 = units[0]
-        units = units[1:]
-        for unit2 in units:
-            if unit1 != unit2:
-                join = gpd.overlay(
-                    geology[geology["UNIT_NAME"] == unit1],
-                    geology[geology["UNIT_NAME"] == unit2],
-                    keep_geom_type=False,
-                )[column_names]
-                join["geometry"] = join.buffer(1)
-                buffered = geology[geology["UNIT_NAME"] == unit2][["geometry"]].copy()
-                buffered["geometry"] = buffered.boundary
-                end = gpd.overlay(buffered, join, keep_geom_type=False)
-                if len(end):
-                    contacts = pd.concat([contacts, end], ignore_index=True)
+    contacts = extract_shared_boundaries(geology, "UNIT_NAME")
 
     # get stratigraphic column from (all_sorts.csv)
-    units = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"))["code"].tolist()
-    groups = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"))[
-        "group"
-    ].tolist()
+    all_sorts = map_data.artifacts.get("all_sorts")
+    units = all_sorts["code"].tolist()
+    groups = all_sorts["group"].tolist()
 
     # assign contact as basal based on its location in the column
     # also if it's adjacent indicate it's a basal contact otherwise indicate it
@@ -651,26 +728,21 @@ def save_basal_contacts_csv(
     df.reset_index(drop=True, inplace=True)
 
     # get "Z" height value for contact points
-    dtm = map_data.get_map_data(Datatype.DTM).open()
-    df["Z"] = df.apply(
-        lambda row: m2l_utils.value_from_dtm_dtb(
-            dtm,
-            map_data.dtb,
-            map_data.dtb_null,
-            workflow["cover_map"],
-            [(row["X"], row["Y"])],
-        ),
-        axis=1,
+    dtm_sampler = map_data.get_dtm_sampler()
+    df["Z"] = dtm_sampler.heights(
+        df[["X", "Y"]].to_numpy(dtype=float), workflow["cover_map"]
     )
 
     # decimate by config.run_flags["contact_decimate"] for contacts output
     decimate_value = max(1, config.run_flags["contact_decimate"])
     decimated_contacts = df.iloc[::decimate_value].copy()
+    m2l_utils.count_items("contacts", len(decimated_contacts))
 
     # Setup output (contacts4.csv)
     decimated_contacts.rename(columns={"UNIT_NAME": "formation"}, inplace=True)
-    decimated_contacts[["X", "Y", "Z", "formation"]].to_csv(
-        os.path.join(config.output_path, "contacts4.csv")
+    map_data.artifacts.publish(
+        "contacts4",
+        decimated_contacts[["X", "Y", "Z", "formation"]].reset_index(drop=True),
     )
 
     if config.verbose_level != VerboseLevel.NONE:
@@ -711,6 +783,7 @@ def save_contacts_with_faults_removed(
     dtb_null,
     cover_map,
 ):
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
     faults_clip = gpd.read_file(path_fault)
 
     # df = pd.DataFrame.from_dict(ls_dict, "index")
@@ -736,26 +809,24 @@ def save_contacts_with_faults_removed(
 
     ac = open(os.path.join(path_out, "contacts4.csv"), "w")
     ac.write("X,Y,Z,formation\n")
-    i = 0
-    for indx, cdn in contacts_decimate_nofaults.iterrows():
-        if not cdn.geometry.geom_type == "GeometryCollection":
-            # print(cdn.x,cdn.y)
-            # doesn't like point right on edge?
-            locations = [(cdn.geometry.x, cdn.geometry.y)]
-
-            height = m2l_utils.value_from_dtm_dtb(
-                dtm, dtb, dtb_null, cover_map, locations
-            )
-            ostr = "{},{},{},{}\n".format(
-                cdn.geometry.x,
-                cdn.geometry.y,
-                height,
-                cdn["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
-            )
-            # ostr = str(cdn.geometry.x)+","+str(cdn.geometry.y)+","+height+","+str(cdn["UNIT_NAME"].replace(" ","_").replace("-","_"))+"\n"
-            ac.write(ostr)
-
-        i = i + 1
+    # doesn't like point right on edge?
+    contact_points = contacts_decimate_nofaults[
+        contacts_decimate_nofaults.geometry.geom_type != "GeometryCollection"
+    ]
+    heights = dtm_sampler.values(
+        np.column_stack([contact_points.geometry.x, contact_points.geometry.y]),
+        cover_map,
+    )
+    for (indx, cdn), height in zip(contact_points.iterrows(), heights):
+        ostr = "{},{},{},{}\n".format(
+            cdn.geometry.x,
+            cdn.geometry.y,
+            height,
+            cdn["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
+        )
+        # ostr = str(cdn.geometry.x)+","+str(cdn.geometry.y)+","+height+","+str(cdn["UNIT_NAME"].replace(" ","_").replace("-","_"))+"\n"
+        ac.write(ostr)
+    i = len(contacts_decimate_nofaults)
     ac.close()
     print(
         i, "decimated contact points saved as", os.path.join(path_out, "contacts4.csv")
@@ -781,21 +852,16 @@ def save_contacts_with_faults_removed(
 
 @beartype.beartype
 def save_faults(config: Config, map_data: MapData, workflow: dict):
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     faults = map_data.get_map_data(Datatype.FAULT)
-    f = open(os.path.join(config.output_path, "faults.csv"), "w")
-    f.write("X,Y,Z,formation\n")
-    fo = open(os.path.join(config.output_path, "fault_orientations.csv"), "w")
-    fo.write("X,Y,Z,DipDirection,dip,DipPolarity,formation\n")
-    # fo.write("X,Y,Z,azimuth,dip,polarity,formation\n")
-    fd = open(os.path.join(config.output_path, "fault_dimensions.csv"), "w")
-    fd.write(
-        "Fault,HorizontalRadius,VerticalRadius,InfluenceDistance,incLength,colour\n"
-    )
-    # fd.write("Fault_ID,strike,dip_direction,down_dip\n")
+    # rows are collected here and published as artifacts
+    fault_rows = []
+    orientation_rows = []
+    dimension_rows = []
     if faults is not None:
         local_faults = faults.copy()
         local_faults = local_faults.dropna(subset=["geometry"])
+        m2l_utils.count_items("faults", len(local_faults))
 
         # convert text dips to equally spaced angles
         split = config.c_l["fdipest_vals"].split(",")
@@ -821,7 +887,11 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
             "Vertical": (0.707, 0.707),
         }
         random.seed(1)
-        for indx, flt in local_faults.iterrows():
+        # heights of every fault vertex in one pass
+        fault_heights = dtm_sampler.values_per_geometry(
+            local_faults.geometry, workflow["cover_map"]
+        )
+        for (indx, flt), flt_heights in zip(local_faults.iterrows(), fault_heights):
             if config.c_l["fault"].lower() in flt["FEATURE"].lower():
                 fault_name = "Fault_" + str(flt["GEOMETRY_OBJECT_ID"])
                 # display(flt.geometry.type)
@@ -905,7 +975,7 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                         # print('fault_name,l,m,n,azimuth_fault,dip',fault_name,l,m,n,azimuth,fault_dip)
                         first = True
                         incLength = 0
-                        for afs in flt_ls.coords:
+                        for afs, afs_height in zip(flt_ls.coords, flt_heights):
                             if dlsx == 0.0 and dlsy == 0.0:
                                 continue
                             lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
@@ -969,35 +1039,24 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                                     ):
                                         break
                                 saved = saved + 1
-                                locations = [(afs[0], afs[1])]
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm,
-                                    map_data.dtb,
-                                    map_data.dtb_null,
-                                    workflow["cover_map"],
-                                    locations,
-                                )
+                                height = afs_height
                                 # slightly randomise first and last points to avoid awkward quadruple junctions etc.
                                 # if(i == 0 or i == len(flt_ls.coords)-1):
                                 #    ostr = str(afs[0]+np.random.ranf())+","+str(afs[1]+np.random.ranf())+","+str(height)+","+fault_name+"\n"
                                 # else:
-                                ostr = "{},{},{},{}\n".format(
-                                    afs[0], afs[1], height, fault_name
-                                )
-                                # ostr = str(afs[0])+","+str(afs[1])+","+str(height)+","+fault_name+"\n"
-                                f.write(ostr)
+                                fault_rows.append([afs[0], afs[1], height, fault_name])
                                 # dip projection equivalent of surface fault
                                 proj_scale = -(
                                     (config.bbox_3d["base"] - float(height)) / n
                                 )
-                                ostr = "{},{},{},{}\n".format(
-                                    afs[0] + (l * proj_scale) + 1,
-                                    afs[1] + (m * proj_scale) + 1,
-                                    float(height) - (n * proj_scale) + 1,
-                                    fault_name,
+                                fault_rows.append(
+                                    [
+                                        afs[0] + (l * proj_scale) + 1,
+                                        afs[1] + (m * proj_scale) + 1,
+                                        float(height) - (n * proj_scale) + 1,
+                                        fault_name,
+                                    ]
                                 )
-                                # ostr = str(afs[0])+","+str(afs[1])+","+str(height)+","+fault_name+"\n"
-                                f.write(ostr)
                             i = i + 1
 
                         strike = strike * 1.25
@@ -1005,86 +1064,55 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                         g = random.randint(1, 256) - 1
                         b = random.randint(1, 256) - 1
                         hex_rgb = m2l_utils.intstohex((r, g, b))
-                        ostr = "{},{},{},{},{},{}\n".format(
-                            fault_name,
-                            strike / 2,
-                            strike / 2,
-                            strike / 4.0,
-                            incLength,
-                            hex_rgb,
+                        dimension_rows.append(
+                            [
+                                fault_name,
+                                strike / 2,
+                                strike / 2,
+                                strike / 4.0,
+                                incLength,
+                                hex_rgb,
+                            ]
                         )
-                        # ostr = fault_name+","+str(strike/2)+","+str(strike)+","+str(strike/4.0)+"\n"
-                        fd.write(ostr)
 
-                        locations = [
-                            (
-                                flt_ls.coords[int((len(afs) - 1) / 2)][0],
-                                flt_ls.coords[int((len(afs) - 1) / 2)][1],
-                            )
-                        ]
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
-                        )
-                        ostr = "{},{},{},{},{},{},{}\n".format(
-                            flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][0],
-                            flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][1],
-                            height,
-                            azimuth,
-                            fault_dip,
-                            1,
-                            fault_name,
-                        )
-                        # ostr = str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][0])+","+str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][1])+","+height+","+str(azimuth)+","+str(fault_dip)+",1,"+fault_name+"\n"
-                        fo.write(ostr)
-
-                        locations = [(flt_ls.coords[0][0], flt_ls.coords[0][1])]
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
+                        height = flt_heights[int((len(afs) - 1) / 2)]
+                        orientation_rows.append(
+                            [
+                                flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][0],
+                                flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][1],
+                                height,
+                                azimuth,
+                                fault_dip,
+                                1,
+                                fault_name,
+                            ]
                         )
-                        ostr = "{},{},{},{},{},{},{}\n".format(
-                            flt_ls.coords[0][0],
-                            flt_ls.coords[0][1],
-                            height,
-                            azimuth,
-                            fault_dip,
-                            1,
-                            fault_name,
+
+                        height = flt_heights[0]
+                        orientation_rows.append(
+                            [
+                                flt_ls.coords[0][0],
+                                flt_ls.coords[0][1],
+                                height,
+                                azimuth,
+                                fault_dip,
+                                1,
+                                fault_name,
+                            ]
                         )
-                        # ostr = str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][0])+","+str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][1])+","+height+","+str(azimuth)+","+str(fault_dip)+",1,"+fault_name+"\n"
-                        fo.write(ostr)
 
-                        locations = [
-                            (
+                        height = flt_heights[len(flt_ls.coords) - 1]
+                        orientation_rows.append(
+                            [
                                 flt_ls.coords[len(flt_ls.coords) - 1][0],
                                 flt_ls.coords[len(flt_ls.coords) - 1][1],
-                            )
-                        ]
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
-                        )
-                        ostr = "{},{},{},{},{},{},{}\n".format(
-                            flt_ls.coords[len(flt_ls.coords) - 1][0],
-                            flt_ls.coords[len(flt_ls.coords) - 1][1],
-                            height,
-                            azimuth,
-                            fault_dip,
-                            1,
-                            fault_name,
+                                height,
+                                azimuth,
+                                fault_dip,
+                                1,
+                                fault_name,
+                            ]
                         )
-                        # ostr = str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][0])+","+str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][1])+","+height+","+str(azimuth)+","+str(fault_dip)+",1,"+fault_name+"\n"
-                        fo.write(ostr)
 
                 # shouldn't happen any more
                 elif (
@@ -1093,6 +1121,10 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                 ):
                     sum_strike = 0
                     first = True
+                    part_heights = dtm_sampler.values_per_geometry(
+                        [LineString(pline) for pline in flt.geometry],
+                        workflow["cover_map"],
+                    )
                     for pline in flt.geometry:
                         flt_ls = LineString(pline)
                         dlsx = (
@@ -1112,16 +1144,16 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                             firsty = flt_ls.coords[0][1]
                         lastx = flt_ls.coords[0][0]
                         lasty = flt_ls.coords[0][1]
-                    ostr = "{},{},{},{},{},{}\n".format(
-                        fault_name,
-                        sum_strike / 2,
-                        sum_strike,
-                        sum_strike / 4.0,
-                        incLength,
-                        hex_rgb,
+                    dimension_rows.append(
+                        [
+                            fault_name,
+                            sum_strike / 2,
+                            sum_strike,
+                            sum_strike / 4.0,
+                            incLength,
+                            hex_rgb,
+                        ]
                     )
-                    # ostr = fault_name+","+str(sum_strike/2)+","+str(sum_strike)+","+str(sum_strike/4.0)+"\n"
-                    fd.write(ostr)
 
                     dlsx = firstx - lastx
                     dlsy = firsty - lasty
@@ -1133,32 +1165,20 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                     # normal to line segment
                     azimuth = degrees(atan2(lsy, -lsx)) % 180
                     # should be mid-fault not mid fault segemnt but probs doesnt matter
-                    locations = [
-                        (
-                            flt_ls.coords[int((len(afs) - 1) / 2)][0],
-                            flt_ls.coords[int((len(afs) - 1) / 2)][1],
-                        )
-                    ]
-                    height = m2l_utils.value_from_dtm_dtb(
-                        dtm,
-                        map_data.dtb,
-                        map_data.dtb_null,
-                        workflow["cover_map"],
-                        locations,
-                    )
-                    ostr = "{},{},{},{},{},{},{},\n".format(
-                        flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][0],
-                        flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][1],
-                        height,
-                        azimuth,
-                        fault_dip,
-                        1,
-                        fault_name,
+                    height = part_heights[-1][int((len(afs) - 1) / 2)]
+                    orientation_rows.append(
+                        [
+                            flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][0],
+                            flt_ls.coords[int((len(flt_ls.coords) - 1) / 2)][1],
+                            height,
+                            azimuth,
+                            fault_dip,
+                            1,
+                            fault_name,
+                        ]
                     )
-                    # ostr = str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][0])+","+str(flt_ls.coords[int((len(flt_ls.coords)-1)/2)][1])+","+height+","+str(azimuth)+","+str(fault_dip)+",1,"+fault_name+"\n"
-                    fo.write(ostr)
 
-                    for pline in flt.geometry:
+                    for pline, pline_heights in zip(flt.geometry, part_heights):
                         # display(pline)
                         # display(flt)
                         flt_ls = LineString(pline)
@@ -1176,7 +1196,7 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                         if sum_strike > config.run_flags["min_fault_length"]:
                             i = 0
                             saved = 0
-                            for afs in flt_ls.coords:
+                            for afs, afs_height in zip(flt_ls.coords, pline_heights):
                                 # decimate to reduce number of points, but also take mid and end points of a series to keep some shape
                                 if (
                                     i % config.run_flags["fault_decimate"] == 0
@@ -1218,28 +1238,36 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
                                         ):
                                             break
                                     saved = saved + 1
-                                    locations = [(afs[0], afs[1])]
-                                    height = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        workflow["cover_map"],
-                                        locations,
-                                    )
+                                    height = afs_height
                                     # slightly randomise first and last points to avoid awkward quadruple junctions etc.
                                     # if(i == 0 or i == len(flt_ls.coords)-1):
                                     #    ostr = str(afs[0]+np.random.ranf())+","+str(afs[1]+np.random.ranf())+","+str(height)+","+fault_name+"\n"
                                     # else:
-                                    ostr = "{},{},{},{}\n".format(
-                                        afs[0], afs[1], height, fault_name
-                                    )
-                                    # ostr = str(afs[0])+","+str(afs[1])+","+str(height)+","+fault_name+"\n"
-                                    f.write(ostr)
+                                    fault_rows.append([afs[0], afs[1], height, fault_name])
                                 i = i + 1
 
-    f.close()
-    fo.close()
-    fd.close()
+    faults_df = pd.DataFrame(fault_rows, columns=["X", "Y", "Z", "formation"])
+    fault_orientations = pd.DataFrame(
+        orientation_rows,
+        columns=["X", "Y", "Z", "DipDirection", "dip", "DipPolarity", "formation"],
+    )
+    fault_dimensions = pd.DataFrame(
+        dimension_rows,
+        columns=[
+            "Fault",
+            "HorizontalRadius",
+            "VerticalRadius",
+            "InfluenceDistance",
+            "incLength",
+            "colour",
+        ],
+    )
+    # heights are the sampler's strings (or -999), numeric as when the csv was parsed
+    faults_df["Z"] = pd.to_numeric(faults_df["Z"])
+    fault_orientations["Z"] = pd.to_numeric(fault_orientations["Z"])
+    map_data.artifacts.publish("faults", faults_df)
+    map_data.artifacts.publish("fault_orientations", fault_orientations)
+    map_data.artifacts.publish("fault_dimensions", fault_dimensions)
     if config.verbose_level != VerboseLevel.NONE:
         print(
             "fault orientations saved as",
@@ -1273,21 +1301,29 @@ def save_faults(config: Config, map_data: MapData, workflow: dict):
 @beartype.beartype
 def save_fold_axial_traces(config: Config, map_data: MapData, workflow: dict):
     folds_clip = map_data.get_map_data(Datatype.FOLD).copy()
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     # folds_clip = gpd.read_file(path_folds)
     fo = open(os.path.join(config.output_path, "fold_axial_traces.csv"), "w")
     fo.write("X,Y,Z,code,type\n")
     folds_clip = folds_clip.dropna(subset=["geometry"])
+    # heights of every fold vertex in one pass
+    fold_heights = dtm_sampler.values_per_geometry(
+        folds_clip.geometry, workflow["cover_map"]
+    )
 
-    for indx, fold in folds_clip.iterrows():
+    for (indx, fold), ls_heights in zip(folds_clip.iterrows(), fold_heights):
         fold_name = str(fold["GEOMETRY_OBJECT_ID"])
         if not str(fold.geometry.type) == "None":
             if fold.geometry.type == "MultiLineString":
+                # the vertices of the parts follow each other in ls_heights
+                offset = 0
                 for mls in fold.geometry:
                     fold_ls = LineString(mls)
+                    mls_heights = ls_heights[offset : offset + len(fold_ls.coords)]
+                    offset = offset + len(fold_ls.coords)
 
                     i = 0
-                    for afs in fold_ls.coords:
+                    for afs, afs_height in zip(fold_ls.coords, mls_heights):
                         if config.c_l["fold"].lower() in fold["FEATURE"].lower():
                             # decimate to reduce number of points, but also take mid and end points of a series to keep some shape
                             if (
@@ -1295,14 +1331,7 @@ def save_fold_axial_traces(config: Config, map_data: MapData, workflow: dict):
                                 or i == int((len(fold_ls.coords) - 1) / 2)
                                 or i == len(fold_ls.coords) - 1
                             ):
-                                locations = [(afs[0], afs[1])]
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm,
-                                    map_data.dtb,
-                                    map_data.dtb_null,
-                                    workflow["cover_map"],
-                                    locations,
-                                )
+                                height = afs_height
                                 ostr = "{},{},{},FA_{},{}\n".format(
                                     afs[0],
                                     afs[1],
@@ -1317,7 +1346,7 @@ def save_fold_axial_traces(config: Config, map_data: MapData, workflow: dict):
                 fold_ls = LineString(fold.geometry)
 
                 i = 0
-                for afs in fold_ls.coords:
+                for afs, afs_height in zip(fold_ls.coords, ls_heights):
                     if config.c_l["fold"].lower() in fold["FEATURE"].lower():
                         # decimate to reduce number of points, but also take mid and end points of a series to keep some shape
                         if (
@@ -1325,14 +1354,7 @@ def save_fold_axial_traces(config: Config, map_data: MapData, workflow: dict):
                             or i == int((len(fold_ls.coords) - 1) / 2)
                             or i == len(fold_ls.coords) - 1
                         ):
-                            locations = [(afs[0], afs[1])]
-                            height = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
+                            height = afs_height
                             ostr = "{},{},{},FA_{},{}\n".format(
                                 afs[0],
                                 afs[1],
@@ -1367,9 +1389,12 @@ def save_fold_axial_traces(config: Config, map_data: MapData, workflow: dict):
 def create_basal_contact_orientations(
     contacts, structures, output_path, dtm, dtb, dtb_null, cover_map, dist_buffer, c_l
 ):
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
     f = open(os.path.join(output_path, "projected_dip_contacts2.csv"), "w")
     f.write("X,Y,Z,azimuth,dip,polarity,formation\n")
     # print("len = ",len(contacts))
+    # rows are collected first so their heights can be looked up in one pass
+    rows = []
     i = 0
     for indx, acontact in contacts.iterrows():  # loop through distinct linestrings
         # display(acontact[1].geometry)
@@ -1399,10 +1424,6 @@ def create_basal_contact_orientations(
 
                             # dip_dir normal and contact are close enough to parallel
                             if fabs(angle - 90) < 30.0:
-                                locations = [(np.x, np.y)]
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm, dtb, dtb_null, cover_map, locations
-                                )
                                 # normal to line segment
                                 ls_ddir = degrees(atan2(lsy, -lsx))
 
@@ -1410,21 +1431,24 @@ def create_basal_contact_orientations(
                                     -ddy * lsx
                                 ) < 0:  # dot product tests right quadrant
                                     ls_ddir = (ls_ddir - 180) % 360
-                                ostr = "{},{},{},{},{},{},{}\n".format(
-                                    np.x,
-                                    np.y,
-                                    height,
-                                    ls_ddir,
-                                    astr["DIP"],
-                                    1,
-                                    acontact["UNIT_NAME"]
-                                    .replace(" ", "_")
-                                    .replace("-", "_"),
+                                rows.append(
+                                    (
+                                        np.x,
+                                        np.y,
+                                        ls_ddir,
+                                        astr["DIP"],
+                                        acontact["UNIT_NAME"]
+                                        .replace(" ", "_")
+                                        .replace("-", "_"),
+                                    )
                                 )
-                                # ostr = str(np.x)+","+str(np.y)+","+height+","+str(ls_ddir)+","+str(astr["DIP"])+",1,"+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+"\n"
-                                f.write(ostr)
                                 i = i + 1
 
+    heights = dtm_sampler.values([(row[0], row[1]) for row in rows], cover_map)
+    for (x, y, ls_ddir, dip, unit_name), height in zip(rows, heights):
+        ostr = "{},{},{},{},{},{},{}\n".format(x, y, height, ls_ddir, dip, 1, unit_name)
+        # ostr = str(np.x)+","+str(np.y)+","+height+","+str(ls_ddir)+","+str(astr["DIP"])+",1,"+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+"\n"
+        f.write(ostr)
     f.close()
     print(
         "basal contact orientations saved as",
@@ -1506,6 +1530,7 @@ def process_plutons(config: Config, map_data, workflow: dict):
     ls_dict_decimate = {}
     id = 0
     dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     geology = map_data.get_map_data(Datatype.GEOLOGY)
     geol_clip = geology[geology.area > config.run_flags["min_pluton_area"]]
     for indx, ageol in geol_clip.iterrows():
@@ -1536,47 +1561,32 @@ def process_plutons(config: Config, map_data, workflow: dict):
                 gp_ages[ngroups][2] = ngroups
                 ngroups = ngroups + 1
 
-            for inset in np.arange(-5000, 10001, 1000):
-                pluton_buffer = ageol.geometry.buffer(inset)
-
-                if pluton_buffer.area > 0:
-                    locations = [(pluton_buffer.centroid.x, pluton_buffer.centroid.y)]
-                    height = m2l_utils.value_from_dtm_dtb(
-                        dtm,
-                        map_data.dtb,
-                        map_data.dtb_null,
-                        workflow["cover_map"],
-                        locations,
-                    )
-                    plu_dense = densify(pluton_buffer, 1000)
-                    if plu_dense.geom_type == "MultiPolygon":
-                        for apoly in plu_dense:
-                            for x, y in apoly.exterior.coords:
-                                if config.run_flags["pluton_form"] == "saucers":
-                                    depth = (
-                                        float(height)
-                                        - 2000
-                                        + (0.00002 * (inset + 10000) ** 2)
-                                    )
-                                else:
-                                    depth = (
-                                        float(height)
-                                        + 2000
-                                        - (0.00002 * (inset + 10000) ** 2)
-                                    )
-                                ostr = "{},{},{},{}\n".format(
-                                    x,
-                                    y,
-                                    depth,
-                                    newgp.replace(" ", "_").replace("-", "_"),
-                                )
-                                ac.write(ostr)
-                    else:
-                        for x, y in plu_dense.exterior.coords:
+            insets = [
+                (inset, ageol.geometry.buffer(inset))
+                for inset in np.arange(-5000, 10001, 1000)
+            ]
+            insets = [
+                (inset, pluton_buffer)
+                for inset, pluton_buffer in insets
+                if pluton_buffer.area > 0
+            ]
+            # heights of the centroids of all the insets in one pass
+            inset_heights = dtm_sampler.values(
+                [
+                    (pluton_buffer.centroid.x, pluton_buffer.centroid.y)
+                    for inset, pluton_buffer in insets
+                ],
+                workflow["cover_map"],
+            )
+            for (inset, pluton_buffer), height in zip(insets, inset_heights):
+                plu_dense = densify(pluton_buffer, 1000)
+                if plu_dense.geom_type == "MultiPolygon":
+                    for apoly in plu_dense:
+                        for x, y in apoly.exterior.coords:
                             if config.run_flags["pluton_form"] == "saucers":
                                 depth = (
                                     float(height)
-                                    + -2000
+                                    - 2000
                                     + (0.00002 * (inset + 10000) ** 2)
                                 )
                             else:
@@ -1586,9 +1596,30 @@ def process_plutons(config: Config, map_data, workflow: dict):
                                     - (0.00002 * (inset + 10000) ** 2)
                                 )
                             ostr = "{},{},{},{}\n".format(
-                                x, y, depth, newgp.replace(" ", "_").replace("-", "_")
+                                x,
+                                y,
+                                depth,
+                                newgp.replace(" ", "_").replace("-", "_"),
                             )
                             ac.write(ostr)
+                else:
+                    for x, y in plu_dense.exterior.coords:
+                        if config.run_flags["pluton_form"] == "saucers":
+                            depth = (
+                                float(height)
+                                + -2000
+                                + (0.00002 * (inset + 10000) ** 2)
+                            )
+                        else:
+                            depth = (
+                                float(height)
+                                + 2000
+                                - (0.00002 * (inset + 10000) ** 2)
+                            )
+                        ostr = "{},{},{},{}\n".format(
+                            x, y, depth, newgp.replace(" ", "_").replace("-", "_")
+                        )
+                        ac.write(ostr)
 
             neighbours = []
             j += 1
@@ -1653,80 +1684,90 @@ def process_plutons(config: Config, map_data, workflow: dict):
                             }
                             id = id + 1
                             # first = True  # use first found dist so all arcs converge to same point
-                            for lineC in LineStringC.geoms:  # process all linestrings
-                                if lineC.wkt.split(" ")[0] == "LINESTRING":
-                                    # decimate to reduce number of points, but also take second and third point of a series to keep gempy happy
-                                    if (
-                                        k % config.run_flags["contact_decimate"] == 0
-                                        or k == int((len(LineStringC) - 1) / 2)
-                                        or k == len(LineStringC) - 1
-                                    ):
-                                        dlsx = lineC.coords[0][0] - lineC.coords[1][0]
-                                        dlsy = lineC.coords[0][1] - lineC.coords[1][1]
-                                        lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
-                                        lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
-
-                                        locations = [
-                                            (lineC.coords[0][0], lineC.coords[0][1])
-                                        ]
-                                        height = m2l_utils.value_from_dtm_dtb(
-                                            dtm,
-                                            map_data.dtb,
-                                            map_data.dtb_null,
-                                            workflow["cover_map"],
-                                            locations,
-                                        )
-                                        # normal to line segment
-                                        azimuth = (
-                                            180 + degrees(atan2(lsy, -lsx))
-                                        ) % 360
-                                        # pt just a bit in/out from line
-                                        testpx = lineC.coords[0][0] - lsy
-                                        testpy = lineC.coords[0][0] + lsx
-
-                                        if ageol.geometry.type == "Polygon":
-                                            if Polygon(ageol.geometry).contains(
-                                                Point(testpx, testpy)
-                                            ):
-                                                azimuth = (azimuth - 180) % 360
-                                        else:
-                                            if MultiPolygon(ageol.geometry).contains(
-                                                Point(testpx, testpy)
-                                            ):
-                                                azimuth = (azimuth - 180) % 360
-
-                                        if config.run_flags["pluton_form"] == "saucers":
-                                            polarity = 1
-                                            # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",1,"+newgp.replace(" ","_").replace("-","_")+"\n"
-                                        elif config.run_flags["pluton_form"] == "domes":
-                                            polarity = 0
+                            linesC = [
+                                lineC
+                                for lineC in LineStringC.geoms
+                                if lineC.wkt.split(" ")[0] == "LINESTRING"
+                            ]
+                            # heights of the first point of each linestring in one pass
+                            linesC_heights = dtm_sampler.values(
+                                [
+                                    (lineC.coords[0][0], lineC.coords[0][1])
+                                    for lineC in linesC
+                                ],
+                                workflow["cover_map"],
+                            )
+                            for lineC, lineC_height in zip(
+                                linesC, linesC_heights
+                            ):  # process all linestrings
+                                # decimate to reduce number of points, but also take second and third point of a series to keep gempy happy
+                                if (
+                                    k % config.run_flags["contact_decimate"] == 0
+                                    or k == int((len(LineStringC) - 1) / 2)
+                                    or k == len(LineStringC) - 1
+                                ):
+                                    dlsx = lineC.coords[0][0] - lineC.coords[1][0]
+                                    dlsy = lineC.coords[0][1] - lineC.coords[1][1]
+                                    lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
+                                    lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
+
+                                    height = lineC_height
+                                    # normal to line segment
+                                    azimuth = (
+                                        180 + degrees(atan2(lsy, -lsx))
+                                    ) % 360
+                                    # pt just a bit in/out from line
+                                    testpx = lineC.coords[0][0] - lsy
+                                    testpy = lineC.coords[0][0] + lsx
+
+                                    if ageol.geometry.type == "Polygon":
+                                        if Polygon(ageol.geometry).contains(
+                                            Point(testpx, testpy)
+                                        ):
                                             azimuth = (azimuth - 180) % 360
-                                            # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",0,"+newgp.replace(" ","_").replace("-","_")+"\n"
-                                        elif (
-                                            config.run_flags["pluton_form"] == "pendant"
+                                    else:
+                                        if MultiPolygon(ageol.geometry).contains(
+                                            Point(testpx, testpy)
                                         ):
-                                            polarity = 0
-                                            # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",0,"+newgp.replace(" ","_").replace("-","_")+"\n"
-                                        else:  # config.run_flags['pluton_form']  ==  batholith
-                                            polarity = 1
                                             azimuth = (azimuth - 180) % 360
-                                            # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",1,"+newgp.replace(" ","_").replace("-","_")+"\n"
-                                        ostr = "{},{},{},{},{},{},{}\n".format(
-                                            lineC.coords[0][0],
-                                            lineC.coords[0][1],
-                                            height,
-                                            azimuth,
-                                            config.run_flags["pluton_dip"],
-                                            polarity,
-                                            newgp.replace(" ", "_").replace("-", "_"),
-                                        )
-                                        ao.write(ostr)
 
-                                    k += 1
+                                    if config.run_flags["pluton_form"] == "saucers":
+                                        polarity = 1
+                                        # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",1,"+newgp.replace(" ","_").replace("-","_")+"\n"
+                                    elif config.run_flags["pluton_form"] == "domes":
+                                        polarity = 0
+                                        azimuth = (azimuth - 180) % 360
+                                        # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",0,"+newgp.replace(" ","_").replace("-","_")+"\n"
+                                    elif (
+                                        config.run_flags["pluton_form"] == "pendant"
+                                    ):
+                                        polarity = 0
+                                        # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",0,"+newgp.replace(" ","_").replace("-","_")+"\n"
+                                    else:  # config.run_flags['pluton_form']  ==  batholith
+                                        polarity = 1
+                                        azimuth = (azimuth - 180) % 360
+                                        # ostr = str(lineC.coords[0][0])+","+str(lineC.coords[0][1])+","+str(height)+","+str(azimuth)+","+str(config.run_flags['pluton_dip'])+",1,"+newgp.replace(" ","_").replace("-","_")+"\n"
+                                    ostr = "{},{},{},{},{},{},{}\n".format(
+                                        lineC.coords[0][0],
+                                        lineC.coords[0][1],
+                                        height,
+                                        azimuth,
+                                        config.run_flags["pluton_dip"],
+                                        polarity,
+                                        newgp.replace(" ", "_").replace("-", "_"),
+                                    )
+                                    ao.write(ostr)
+
+                                k += 1
                         # apparently this is not needed
                         elif LineStringC.wkt.split(" ")[0] == "LINESTRING":
                             k = 0
                             lineC = LineString(LineStringC)
+                            # the same point is written to all the outputs, look its height up once
+                            locations = [(lineC.coords[0][0], lineC.coords[0][1])]
+                            lineC_height = dtm_sampler.value(
+                                locations, workflow["cover_map"]
+                            )
                             # decimate to reduce number of points, but also take second and third point of a series to keep gempy happy
                             if (
                                 k % config.run_flags["contact_decimate"] == 0
@@ -1734,20 +1775,13 @@ def process_plutons(config: Config, map_data, workflow: dict):
                                 or k == len(LineStringC) - 1
                             ):
                                 # doesn't like point right on edge?
-                                locations = [(lineC.coords[0][0], lineC.coords[0][1])]
                                 if (
                                     lineC.coords[0][0] > dtm.bounds[0]
                                     and lineC.coords[0][0] < dtm.bounds[2]
                                     and lineC.coords[0][1] > dtm.bounds[1]
                                     and lineC.coords[0][1] < dtm.bounds[3]
                                 ):
-                                    height = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        workflow["cover_map"],
-                                        locations,
-                                    )
+                                    height = lineC_height
                                     ostr = "{},{},{},{}\n".format(
                                         lineC.coords[0][0],
                                         lineC.coords[0][1],
@@ -1781,13 +1815,7 @@ def process_plutons(config: Config, map_data, workflow: dict):
                                     and lineC.coords[0][1] > dtm.bounds[1]
                                     and lineC.coords[0][1] < dtm.bounds[3]
                                 ):
-                                    height = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        workflow["cover_map"],
-                                        locations,
-                                    )
+                                    height = lineC_height
                                     ostr = "{},{},{},{}\n".format(
                                         lineC.coords[0][0],
                                         lineC.coords[0][1],
@@ -1812,14 +1840,7 @@ def process_plutons(config: Config, map_data, workflow: dict):
                                 lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
                                 lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
 
-                                locations = [(lineC.coords[0][0], lineC.coords[0][1])]
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm,
-                                    map_data.dtb,
-                                    map_data.dtb_null,
-                                    workflow["cover_map"],
-                                    locations,
-                                )
+                                height = lineC_height
                                 # normal to line segment
                                 azimuth = (180 + degrees(atan2(lsy, -lsx))) % 360
                                 # pt just a bit in/out from line
@@ -1883,11 +1904,7 @@ def process_plutons(config: Config, map_data, workflow: dict):
         an.write(gp_names[i].replace(" ", "_").replace("-", "_") + "\n")
     an.close()
 
-    all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"), sep=",")
-
-    as_2 = open(os.path.join(config.tmp_path, "all_sorts.csv"), "r")
-    contents = as_2.readlines()
-    as_2.close
+    all_sorts = map_data.artifacts.get("all_sorts")
 
     all_sorts_file = open(os.path.join(config.tmp_path, "all_sorts2.csv"), "w")
     all_sorts_file.write(
@@ -1898,9 +1915,8 @@ def process_plutons(config: Config, map_data, workflow: dict):
         all_sorts_file.write("-2,0,1,2,cover_up,cover\n")
         all_sorts_file.write("-1,0,2,2,cover,cover\n")
 
-    for i in range(1, len(all_sorts) + 1):
-        # don't write out if already there in new groups list#
-        all_sorts_file.write(contents[i])
+    # don't write out if already there in new groups list#
+    all_sorts.to_csv(all_sorts_file, header=False, index=False)
 
     all_sorts_file.close()
     if config.verbose_level != VerboseLevel.NONE:
@@ -1933,7 +1949,7 @@ def process_plutons(config: Config, map_data, workflow: dict):
 def tidy_data(config: Config, map_data: MapData, use_group, inputs):
     use_projected_contacts = True
 
-    contacts = pd.read_csv(os.path.join(config.output_path, "contacts4.csv"), sep=",")
+    contacts = map_data.artifacts.get("contacts4")
     contacts["source"] = "strat"
     all_orientations = pd.read_csv(
         os.path.join(config.output_path, "orientations.csv"), sep=","
@@ -2636,189 +2652,332 @@ def calc_thickness(tmp_path, output_path, buffer, max_thickness_allowed, c_l):
     )
 
 
-@beartype.beartype
-def calc_thickness_with_grid(config: Config, map_data: MapData):
-    contact_points_file = os.path.join(config.tmp_path, "raw_contacts.csv")
-    dtm = map_data.get_map_data(Datatype.DTM).open()
-    # load basal contacts as geopandas dataframe
-    contact_lines = gpd.read_file(
-        os.path.join(config.tmp_path, "basal_contacts.shp.zip")
-    )
-    all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"))
-    all_sorts["index2"] = all_sorts.index
-    # all_sorts.set_index('code',inplace=True)
-    geol = map_data.get_map_data(Datatype.GEOLOGY).copy()
-    # geol=gpd.read_file(os.path.join(config.tmp_path, 'geol_clip.shp'))
-    geol.drop_duplicates(subset="UNIT_NAME", inplace=True)
-    # geol.set_index('UNIT_NAME',inplace=True)
-    drops = geol[
-        geol["DESCRIPTION"].str.contains(config.c_l["sill"])
-        & geol["ROCKTYPE1"].str.contains(config.c_l["intrusive"])
-    ]
-    for ind, drop in drops.iterrows():
-        all_sorts.drop(labels=drop.name, inplace=True, errors="ignore")
-    all_sorts["code"] = all_sorts.index
-    all_sorts["index"] = all_sorts["index2"]
-    # all_sorts.set_index('index2',inplace=True)
-
-    contacts = pd.read_csv(contact_points_file)
+####################################
+# find the nearest crossing of the basal contact of another unit along a probe normal to each contact point
+#
+# thickness_crossings(cx,cy,cl,cm,ctextcode,lines,line_units,passes,buffer,max_thickness_allowed)
+# Args:
+# cx,cy arrays of contact point locations
+# cl,cm arrays of contact direction cosines at each point
+# ctextcode array of the unit name of each contact point
+# lines array of basal contact polylines
+# line_units array of the UNIT_NAME of each basal contact polyline
+# passes dict of mode to (codes, skip_codes), mode is "full" to look for the basal contact of the next unit up or
+#   "min" for the basal contact of any other unit, codes are the unit names in stratigraphic order (the unit above
+#   codes[g] is codes[g-1]) and skip_codes the unit names for which no estimates are wanted
+# buffer half length of the probe line drawn normal to the contact
+# max_thickness_allowed upper limit on accepted apparent thickness
+# Returns:
+# dict of mode to list of (contact index, apparent thickness, crossing x, crossing y) in the order estimates are reported
+#
+# All probe lines are built as one shapely array and queried against a single STRtree of the contact lines, the
+# candidate pairs are filtered by unit and all intersections computed in one vectorised call which every pass
+# shares. The nearest crossing is then tracked per contact line exactly as the original per point loop did, so the
+# estimates are unchanged.
+####################################
 
-    clength = len(contacts)
-    cx = contacts["X"].to_numpy()
-    cy = contacts["Y"].to_numpy()
-    cl = contacts["lsx"].to_numpy(dtype=float)
-    cm = contacts["lsy"].to_numpy(dtype=float)
-    ctextcode = contacts["formation"].to_numpy()
 
-    fth = open(os.path.join(config.output_path, "formation_thicknesses.csv"), "w")
-    fth.write(
-        "X,Y,formation,appar_th,thickness,cl,cm,p1x,p1y,p2x,p2y,dip,type,slope_dip,slope_length,delz,zbase,zcross\n"
+def thickness_crossings(
+    cx, cy, cl, cm, ctextcode, lines, line_units, passes, buffer, max_thickness_allowed
+):
+    estimates = {mode: [] for mode in passes}
+    if len(cx) == 0 or len(lines) == 0:
+        return estimates
+    dx1 = -cm * buffer
+    dy1 = cl * buffer
+    probes = shapely.linestrings(
+        np.stack(
+            [np.column_stack([dx1 + cx, dy1 + cy]), np.column_stack([-dx1 + cx, -dy1 + cy])],
+            axis=1,
+        )
+    )
+    tree = shapely.STRtree(lines)
+    probe_idx, line_idx = tree.query(probes, predicate="intersects")
+    order = np.lexsort((line_idx, probe_idx))
+    probe_idx, line_idx = probe_idx[order], line_idx[order]
+
+    # each row of the stratigraphic column matching a contact's unit is a separate pass
+    uppers = {}
+    for mode, (codes, skip_codes) in passes.items():
+        skip_codes = set(skip_codes)
+        uppers[mode] = {}
+        for g in range(len(codes)):
+            if codes[g] not in skip_codes:
+                uppers[mode].setdefault(codes[g], []).append(codes[g - 1])
+
+    # keep candidate lines that belong to the wanted unit for at least one pass
+    keep = np.zeros(len(probe_idx), dtype=bool)
+    for n in range(len(probe_idx)):
+        code = ctextcode[probe_idx[n]]
+        unit = line_units[line_idx[n]]
+        for mode in passes:
+            for upper in uppers[mode].get(code, []):
+                if (unit == upper) == (mode == "full"):
+                    keep[n] = True
+                    break
+            if keep[n]:
+                break
+    probe_idx, line_idx = probe_idx[keep], line_idx[keep]
+    isects = shapely.intersection(probes[probe_idx], lines[line_idx])
+    isect_types = shapely.get_type_id(isects)
+    starts = np.searchsorted(probe_idx, np.arange(len(cx)), side="left")
+    ends = np.searchsorted(probe_idx, np.arange(len(cx)), side="right")
+
+    for mode in passes:
+        min_allowed = 0 if mode == "full" else 1
+        for k in np.unique(probe_idx):
+            for upper in uppers[mode].get(ctextcode[k], []):
+                crossings = []
+                for n in range(starts[k], ends[k]):
+                    if (line_units[line_idx[n]] == upper) != (mode == "full"):
+                        continue
+                    # Point (0) and MultiPoint (4) crossings, collinear overlaps are ignored
+                    if isect_types[n] in (0, 4):
+                        for x, y in shapely.get_coordinates(isects[n]):
+                            if m2l_utils.ptsdist(x, y, cx[k], cy[k]) < buffer * 2:
+                                crossings.append((x, y))
+                    if len(crossings) > 0:
+                        # find closest hit
+                        min_dist = 1e8
+                        for x, y in crossings:
+                            this_dist = m2l_utils.ptsdist(x, y, cx[k], cy[k])
+                            if this_dist < min_dist:
+                                min_dist = this_dist
+                                crossx = x
+                                crossy = y
+                        if min_dist < max_thickness_allowed and min_dist > min_allowed:
+                            estimates[mode].append((k, min_dist, crossx, crossy))
+    return estimates
+
+
+def _thickness_crossings_chunk(args):
+    # process pool worker, contact indices are mapped back to those of the whole layer
+    ids, cx, cy, cl, cm, ctextcode, lines, line_units, passes, buffer, max_thickness_allowed = args
+    estimates = thickness_crossings(
+        cx, cy, cl, cm, ctextcode, lines, line_units, passes, buffer, max_thickness_allowed
     )
+    return {
+        mode: [(ids[k], min_dist, x, y) for k, min_dist, x, y in found]
+        for mode, found in estimates.items()
+    }
 
-    # np.savetxt(os.path.join(config.tmp_path,'dist.csv'),dist,delimiter = ',')
-    # display("ppp",cx.shape,cy.shape,ox.shape,oy.shape,dip.shape,azimuth.shape,dist.shape)
-    n_est = 0
-    for k in range(0, clength):  # loop through all contact segments
-        r = int((cy[k] - config.bbox[1]) / config.run_flags["interpolation_spacing"])
-        c = int((cx[k] - config.bbox[0]) / config.run_flags["interpolation_spacing"])
 
-        dip_mean = map_data.dip_grid[r, c]
+####################################
+# thickness_crossings over spatially coherent chunks of contact points in a process pool
+#
+# parallel_thickness_crossings(contacts,contact_lines,passes,buffer,max_thickness_allowed,workers,chunk_size)
+# Args:
+# contacts dataframe of raw contacts (X,Y,lsx,lsy,formation)
+# contact_lines geopandas layer of basal contact polylines with a UNIT_NAME column
+# passes,buffer,max_thickness_allowed as for thickness_crossings
+# workers number of processes, 1 or less runs everything in this process
+# chunk_size number of contact points sent to a process at a time
+# Returns:
+# dict of mode to list of (contact index, apparent thickness, crossing x, crossing y) in the same order as
+# thickness_crossings over all contacts
+#
+# Contacts are ordered by a coarse tile index so each chunk covers a compact area and only the contact lines within
+# a probe length of that area are sent with it. Estimates are merged back into contact order.
+####################################
+
+
+def parallel_thickness_crossings(
+    contacts, contact_lines, passes, buffer, max_thickness_allowed, workers=1, chunk_size=2000
+):
+    cx = contacts["X"].to_numpy(dtype=float)
+    cy = contacts["Y"].to_numpy(dtype=float)
+    cl = contacts["lsx"].to_numpy(dtype=float)
+    cm = contacts["lsy"].to_numpy(dtype=float)
+    ctextcode = contacts["formation"].to_numpy()
+    lines = np.asarray(contact_lines.geometry)
+    line_units = contact_lines["UNIT_NAME"].to_numpy()
+
+    if workers <= 1 or len(cx) <= chunk_size:
+        return thickness_crossings(
+            cx, cy, cl, cm, ctextcode, lines, line_units, passes, buffer, max_thickness_allowed
+        )
+
+    # square tiles holding about chunk_size contacts each on average
+    width = max(cx.max() - cx.min(), cy.max() - cy.min(), 1.0)
+    tile = width * sqrt(chunk_size / len(cx))
+    tiles_x = np.floor((cx - cx.min()) / tile).astype(int)
+    tiles_y = np.floor((cy - cy.min()) / tile).astype(int)
+    order = np.lexsort((tiles_x, tiles_y))
+
+    tree = shapely.STRtree(lines)
+    jobs = []
+    for start in range(0, len(order), chunk_size):
+        ids = np.sort(order[start : start + chunk_size])
+        area = shapely.box(
+            cx[ids].min() - buffer,
+            cy[ids].min() - buffer,
+            cx[ids].max() + buffer,
+            cy[ids].max() + buffer,
+        )
+        near = np.sort(tree.query(area, predicate="intersects"))
+        jobs.append(
+            (
+                ids,
+                cx[ids],
+                cy[ids],
+                cl[ids],
+                cm[ids],
+                ctextcode[ids],
+                lines[near],
+                line_units[near],
+                passes,
+                buffer,
+                max_thickness_allowed,
+            )
+        )
 
-        dx1 = -cm[k] * config.run_flags["thickness_buffer"]
-        dy1 = cl[k] * config.run_flags["thickness_buffer"]
-        dx2 = -dx1
-        dy2 = -dy1
+    estimates = {mode: [] for mode in passes}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for found in executor.map(_thickness_crossings_chunk, jobs):
+            for mode in passes:
+                estimates[mode].extend(found[mode])
+    for mode in passes:
+        # stable sort keeps the per contact order from the chunk that owned it
+        estimates[mode].sort(key=lambda estimate: estimate[0])
+    return estimates
+
+
+####################################
+# convert apparent thickness estimates to true thickness and write them to formation_thicknesses.csv
+#
+# write_thickness_estimates(fth,config,dip_grid,dtm_sampler,contacts,estimates,mode)
+# Args:
+# fth open formation_thicknesses.csv file
+# config Config of the project
+# dip_grid interpolated dip grid
+# dtm_sampler DtmSampler for the contact and crossing heights (looked up in two batches)
+# contacts dataframe of raw contacts (X,Y,lsx,lsy,formation)
+# estimates list from thickness_crossings
+# mode "full" or "min", written to the type column
+# found_codes optional set which the formation of each estimate written is added to
+# Returns:
+# number of estimates written
+####################################
+
+
+def write_thickness_estimates(
+    fth, config, dip_grid, dtm_sampler, contacts, estimates, mode, found_codes=None
+):
+    if len(estimates) == 0:
+        return 0
+    cx = contacts["X"].to_numpy()
+    cy = contacts["Y"].to_numpy()
+    cl = contacts["lsx"].to_numpy(dtype=float)
+    cm = contacts["lsy"].to_numpy(dtype=float)
+    ctextcode = contacts["formation"].to_numpy()
+    buffer = config.run_flags["thickness_buffer"]
+    max_thickness_allowed = config.run_flags["max_thickness_allowed"]
+    spacing = config.run_flags["interpolation_spacing"]
+
+    contact_ids = np.array([e[0] for e in estimates])
+    zbases = dtm_sampler.heights(np.column_stack([cx[contact_ids], cy[contact_ids]]))
+    zcrosses = dtm_sampler.heights(np.array([(e[2], e[3]) for e in estimates]))
+
+    n_est = 0
+    for (k, min_dist, crossx, crossy), zbase, zcross in zip(estimates, zbases, zcrosses):
+        r = int((cy[k] - config.bbox[1]) / spacing)
+        c = int((cx[k] - config.bbox[0]) / spacing)
+        dip_mean = dip_grid[r, c]
+        dx1 = -cm[k] * buffer
+        dy1 = cl[k] * buffer
         p1 = Point((dx1 + cx[k], dy1 + cy[k]))
-        p2 = Point((dx2 + cx[k], dy2 + cy[k]))
-        ddline = LineString((p1, p2))
-        orig = Point((cx[k], cy[k]))
+        p2 = Point((-dx1 + cx[k], -dy1 + cy[k]))
+
+        zbase = float(zbase)
+        zcross = float(zcross)
+        delz = fabs(zcross - zbase)
+        slope_dip = degrees(atan(delz / min_dist))
+        slope_length = sqrt((min_dist * min_dist) + (delz * delz))
+        if slope_dip < dip_mean and zbase > zcross:
+            surf_dip = dip_mean - slope_dip
+        elif slope_dip < dip_mean and zbase < zcross:
+            surf_dip = dip_mean + slope_dip
+        elif slope_dip > dip_mean and zbase > zcross:
+            surf_dip = slope_dip - dip_mean
+        else:
+            surf_dip = 180 - (dip_mean + slope_dip)
 
-        crossings = np.zeros((1000, 5))
+        true_thick = slope_length * sin(radians(surf_dip))
+        if (
+            not isnan(true_thick)
+            and true_thick > 0
+            and true_thick < max_thickness_allowed
+        ):
+            ostr = "{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{}\n".format(
+                cx[k],
+                cy[k],
+                ctextcode[k],
+                min_dist,
+                int(true_thick),
+                cl[k],
+                cm[k],
+                p1.x,
+                p1.y,
+                p2.x,
+                p2.y,
+                dip_mean,
+                mode,
+                slope_dip,
+                slope_length,
+                delz,
+                zbase,
+                zcross,
+            )
+            fth.write(ostr)
+            n_est = n_est + 1
+            if found_codes is not None:
+                found_codes.add(ctextcode[k])
+    return n_est
 
-        g = 0
-        for indx, apair in all_sorts.iterrows():  # loop through all basal contacts
-            if ctextcode[k] == apair["code"]:
-                # subset contacts to just those with 'a' code
-                is_contacta = (
-                    contact_lines["UNIT_NAME"] == all_sorts.iloc[g - 1]["code"]
-                )
-                acontacts = contact_lines[is_contacta]
-                i = 0
-                for (
-                    ind,
-                    acontact,
-                ) in (
-                    acontacts.iterrows()
-                ):  # loop through distinct linestrings for upper contact
-                    # if(bboxes_intersect(ddline.bounds,acontact[1].geometry.bounds)):
-                    if not str(acontact.geometry) == "None":
-                        if ddline.intersects(acontact.geometry):
-                            isects = ddline.intersection(acontact.geometry)
-                            if isects.geom_type == "MultiPoint":
-                                for pt in isects:
-                                    if (
-                                        pt.distance(orig)
-                                        < config.run_flags["thickness_buffer"] * 2
-                                    ):
-                                        # print(i,",", pt.x, ",",pt.y,",",apair[1]['code'],",",apair[1]['group'])
-                                        crossings[i, 0] = i
-                                        crossings[i, 1] = int(apair["index"])
-                                        crossings[i, 2] = 0
-                                        crossings[i, 3] = pt.x
-                                        crossings[i, 4] = pt.y
-                                        i = i + 1
-                            else:
-                                if (
-                                    isects.distance(orig)
-                                    < config.run_flags["thickness_buffer"] * 2
-                                ):
-                                    # print(i,",", isects.x,",", isects.y,",",apair[1]['code'],",",apair[1]['group'])
-                                    crossings[i, 0] = i
-                                    crossings[i, 1] = int(apair["index"])
-                                    crossings[i, 2] = 0
-                                    crossings[i, 3] = isects.x
-                                    crossings[i, 4] = isects.y
-                                    i = i + 1
 
-                            if (
-                                i > 0
-                            ):  # if we found any intersections with base of next higher unit
-                                min_dist = 1e8
-                                # min_pt = 0
-                                for f in range(0, i):  # find closest hit
-                                    this_dist = m2l_utils.ptsdist(
-                                        crossings[f, 3], crossings[f, 4], cx[k], cy[k]
-                                    )
-                                    if this_dist < min_dist:
-                                        min_dist = this_dist
-                                        # min_pt = f
-                                        crossx = crossings[f, 3]
-                                        crossy = crossings[f, 4]
-                                # if not too far, add to output
-                                if (
-                                    min_dist < config.run_flags["max_thickness_allowed"]
-                                    and min_dist > 0
-                                ):
-                                    locations = [(cx[k], cy[k])]
-                                    zbase = float(
-                                        m2l_utils.value_from_dtm_dtb(
-                                            dtm, "", "", False, locations
-                                        )
-                                    )
-                                    locations = [(crossx, crossy)]
-                                    zcross = float(
-                                        m2l_utils.value_from_dtm_dtb(
-                                            dtm, "", "", False, locations
-                                        )
-                                    )
-                                    delz = fabs(zcross - zbase)
-                                    slope_dip = degrees(atan(delz / min_dist))
-                                    slope_length = sqrt(
-                                        (min_dist * min_dist) + (delz * delz)
-                                    )
-                                    if slope_dip < dip_mean and zbase > zcross:
-                                        surf_dip = dip_mean - slope_dip
-                                    elif slope_dip < dip_mean and zbase < zcross:
-                                        surf_dip = dip_mean + slope_dip
-                                    elif slope_dip > dip_mean and zbase > zcross:
-                                        surf_dip = slope_dip - dip_mean
-                                    else:
-                                        surf_dip = 180 - (dip_mean + slope_dip)
+@beartype.beartype
+def calc_thickness_with_grid(config: Config, map_data: MapData):
+    contact_points_file = os.path.join(config.tmp_path, "raw_contacts.csv")
+    dtm_sampler = map_data.get_dtm_sampler()
+    # load basal contacts as geopandas dataframe
+    contact_lines = gpd.read_file(
+        os.path.join(config.tmp_path, "basal_contacts.shp.zip")
+    )
+    all_sorts = map_data.artifacts.get("all_sorts")
+    all_sorts["index2"] = all_sorts.index
+    # all_sorts.set_index('code',inplace=True)
+    geol = map_data.get_map_data(Datatype.GEOLOGY).copy()
+    # geol=gpd.read_file(os.path.join(config.tmp_path, 'geol_clip.shp'))
+    geol.drop_duplicates(subset="UNIT_NAME", inplace=True)
+    # geol.set_index('UNIT_NAME',inplace=True)
+    drops = geol[
+        geol["DESCRIPTION"].str.contains(config.c_l["sill"])
+        & geol["ROCKTYPE1"].str.contains(config.c_l["intrusive"])
+    ]
+    for ind, drop in drops.iterrows():
+        all_sorts.drop(labels=drop.name, inplace=True, errors="ignore")
+    all_sorts["code"] = all_sorts.index
+    all_sorts["index"] = all_sorts["index2"]
+    # all_sorts.set_index('index2',inplace=True)
 
-                                    true_thick = slope_length * sin(radians(surf_dip))
-                                    if (
-                                        not isnan(true_thick)
-                                        and true_thick > 0
-                                        and true_thick
-                                        < config.run_flags["max_thickness_allowed"]
-                                    ):
-                                        ostr = "{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{}\n".format(
-                                            cx[k],
-                                            cy[k],
-                                            ctextcode[k],
-                                            min_dist,
-                                            int(true_thick),
-                                            cl[k],
-                                            cm[k],
-                                            p1.x,
-                                            p1.y,
-                                            p2.x,
-                                            p2.y,
-                                            dip_mean,
-                                            "full",
-                                            slope_dip,
-                                            slope_length,
-                                            delz,
-                                            zbase,
-                                            zcross,
-                                        )
-                                        # ostr = str(cx[k])+','+str(cy[k])+','+ctextcode[k]+','+str(int(true_thick))+\
-                                        #    ','+str(cl[k])+','+str(cm[k])+','+str(lm)+','+str(mm)+','+str(nm)+','+\
-                                        #    str(p1.x)+','+str(p1.y)+','+str(p2.x)+','+str(p2.y)+','+str(dip_mean)+'\n'
-                                        fth.write(ostr)
-                                        n_est = n_est + 1
+    contacts = pd.read_csv(contact_points_file)
+
+    fth = open(os.path.join(config.output_path, "formation_thicknesses.csv"), "w")
+    fth.write(
+        "X,Y,formation,appar_th,thickness,cl,cm,p1x,p1y,p2x,p2y,dip,type,slope_dip,slope_length,delz,zbase,zcross\n"
+    )
 
-            g = g + 1
+    estimates = parallel_thickness_crossings(
+        contacts,
+        contact_lines,
+        {"full": (all_sorts["code"].to_numpy(), ())},
+        config.run_flags["thickness_buffer"],
+        config.run_flags["max_thickness_allowed"],
+    )
+    n_est = write_thickness_estimates(
+        fth, config, map_data.dip_grid, dtm_sampler, contacts, estimates["full"], "full"
+    )
+    fth.close()
     if config.verbose_level != VerboseLevel.NONE:
         print(
             n_est,
@@ -2829,13 +2988,13 @@ def calc_thickness_with_grid(config: Config, map_data: MapData):
 
 @beartype.beartype
 def calc_min_thickness_with_grid(config: Config, map_data: MapData):
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     contact_points_file = os.path.join(config.tmp_path, "raw_contacts.csv")
     # load basal contacts as geopandas dataframe
     contact_lines = gpd.read_file(
         os.path.join(config.tmp_path, "basal_contacts.shp.zip")
     )
-    all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"))
+    all_sorts = map_data.artifacts.get("all_sorts")
     contacts = pd.read_csv(contact_points_file)
 
     sum_thick = pd.read_csv(
@@ -2844,174 +3003,19 @@ def calc_min_thickness_with_grid(config: Config, map_data: MapData):
     found_codes = sum_thick["formation"].unique()
     if config.verbose_level != VerboseLevel.NONE:
         print(found_codes, "already processed")
-    clength = len(contacts)
-    cx = contacts["X"].to_numpy()
-    cy = contacts["Y"].to_numpy()
-    cl = contacts["lsx"].to_numpy(dtype=float)
-    cm = contacts["lsy"].to_numpy(dtype=float)
-    ctextcode = contacts["formation"].to_numpy()
 
     fth = open(os.path.join(config.output_path, "formation_thicknesses.csv"), "a+")
-    # fth.write('X,Y,formation,appar_th,thickness,cl,cm,p1x,p1y,p2x,p2y,dip\n')
-
-    # np.savetxt(os.path.join(config.tmp_path,'dist.csv'),dist,delimiter = ',')
-    # display("ppp",cx.shape,cy.shape,ox.shape,oy.shape,dip.shape,azimuth.shape,dist.shape)
-    n_est = 0
-    for k in range(0, clength):  # loop through all contact segments
-        if not (ctextcode[k] in found_codes):
-            # print(ctextcode[k])
-            r = int(
-                (cy[k] - config.bbox[1]) / config.run_flags["interpolation_spacing"]
-            )
-            c = int(
-                (cx[k] - config.bbox[0]) / config.run_flags["interpolation_spacing"]
-            )
-
-            dip_mean = map_data.dip_grid[r, c]
-
-            dx1 = -cm[k] * config.run_flags["thickness_buffer"]
-            dy1 = cl[k] * config.run_flags["thickness_buffer"]
-            dx2 = -dx1
-            dy2 = -dy1
-            p1 = Point((dx1 + cx[k], dy1 + cy[k]))
-            p2 = Point((dx2 + cx[k], dy2 + cy[k]))
-            ddline = LineString((p1, p2))
-            orig = Point((cx[k], cy[k]))
-
-            crossings = np.zeros((1000, 5))
-
-            g = 0
-            for indx, apair in all_sorts.iterrows():  # loop through all basal contacts
-                if ctextcode[k] == apair["code"]:
-                    # subset contacts to just those with 'a' code
-                    is_contacta = (
-                        contact_lines["UNIT_NAME"] != all_sorts.iloc[g - 1]["code"]
-                    )
-                    acontacts = contact_lines[is_contacta]
-                    i = 0
-                    for (
-                        ind,
-                        acontact,
-                    ) in (
-                        acontacts.iterrows()
-                    ):  # loop through distinct linestrings for upper contact
-                        # if(bboxes_intersect(ddline.bounds,acontact[1].geometry.bounds)):
 
-                        if not str(acontact.geometry) == "None":
-                            if ddline.intersects(acontact.geometry):
-                                isects = ddline.intersection(acontact.geometry)
-                                if isects.geom_type == "MultiPoint":
-                                    for pt in isects.geoms:
-                                        if (
-                                            pt.distance(orig)
-                                            < config.run_flags["thickness_buffer"] * 2
-                                        ):
-                                            # print(i,",", pt.x, ",",pt.y,",",apair[1]['code'],",",apair[1]['group'])
-                                            crossings[i, 0] = i
-                                            crossings[i, 1] = int(apair["index"])
-                                            crossings[i, 2] = 0
-                                            crossings[i, 3] = pt.x
-                                            crossings[i, 4] = pt.y
-                                            i = i + 1
-                                else:
-                                    if not isects.geom_type == "GeometryCollection":
-                                        if (
-                                            isects.distance(orig)
-                                            < config.run_flags["thickness_buffer"] * 2
-                                        ):
-                                            # print(i,",", isects.x,",", isects.y,",",apair[1]['code'],",",apair[1]['group'])
-                                            crossings[i, 0] = i
-                                            crossings[i, 1] = int(apair["index"])
-                                            crossings[i, 2] = 0
-                                            crossings[i, 3] = isects.x
-                                            crossings[i, 4] = isects.y
-                                            i = i + 1
-
-                                if (
-                                    i > 0
-                                ):  # if we found any intersections with base of next higher unit
-                                    min_dist = 1e8
-                                    # min_pt = 0
-                                    for f in range(0, i):  # find closest hit
-                                        this_dist = m2l_utils.ptsdist(
-                                            crossings[f, 3],
-                                            crossings[f, 4],
-                                            cx[k],
-                                            cy[k],
-                                        )
-                                        if this_dist < min_dist:
-                                            min_dist = this_dist
-                                            # min_pt = f
-                                            crossx = crossings[f, 3]
-                                            crossy = crossings[f, 4]
-                                    # if not too far, add to output
-                                    if (
-                                        min_dist
-                                        < config.run_flags["max_thickness_allowed"]
-                                        and min_dist > 1
-                                    ):
-                                        locations = [(cx[k], cy[k])]
-                                        zbase = float(
-                                            m2l_utils.value_from_dtm_dtb(
-                                                dtm, "", "", False, locations
-                                            )
-                                        )
-                                        locations = [(crossx, crossy)]
-                                        zcross = float(
-                                            m2l_utils.value_from_dtm_dtb(
-                                                dtm, "", "", False, locations
-                                            )
-                                        )
-                                        delz = fabs(zcross - zbase)
-                                        slope_dip = degrees(atan(delz / min_dist))
-                                        slope_length = sqrt(
-                                            (min_dist * min_dist) + (delz * delz)
-                                        )
-                                        if slope_dip < dip_mean and zbase > zcross:
-                                            surf_dip = dip_mean - slope_dip
-                                        elif slope_dip < dip_mean and zbase < zcross:
-                                            surf_dip = dip_mean + slope_dip
-                                        elif slope_dip > dip_mean and zbase > zcross:
-                                            surf_dip = slope_dip - dip_mean
-                                        else:
-                                            surf_dip = 180 - (dip_mean + slope_dip)
-
-                                        true_thick = slope_length * sin(
-                                            radians(surf_dip)
-                                        )
-                                        if (
-                                            not isnan(true_thick)
-                                            and true_thick > 0
-                                            and true_thick
-                                            < config.run_flags["max_thickness_allowed"]
-                                        ):
-                                            ostr = "{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{}\n".format(
-                                                cx[k],
-                                                cy[k],
-                                                ctextcode[k],
-                                                min_dist,
-                                                int(true_thick),
-                                                cl[k],
-                                                cm[k],
-                                                p1.x,
-                                                p1.y,
-                                                p2.x,
-                                                p2.y,
-                                                dip_mean,
-                                                "min",
-                                                slope_dip,
-                                                slope_length,
-                                                delz,
-                                                zbase,
-                                                zcross,
-                                            )
-                                            # ostr = str(cx[k])+','+str(cy[k])+','+ctextcode[k]+','+str(int(true_thick))+\
-                                            #    ','+str(cl[k])+','+str(cm[k])+','+str(lm)+','+str(mm)+','+str(nm)+','+\
-                                            #    str(p1.x)+','+str(p1.y)+','+str(p2.x)+','+str(p2.y)+','+str(dip_mean)+'\n'
-                                            fth.write(ostr)
-                                            n_est = n_est + 1
-
-            g = g + 1
+    estimates = parallel_thickness_crossings(
+        contacts,
+        contact_lines,
+        {"min": (all_sorts["code"].to_numpy(), found_codes)},
+        config.run_flags["thickness_buffer"],
+        config.run_flags["max_thickness_allowed"],
+    )
+    n_est = write_thickness_estimates(
+        fth, config, map_data.dip_grid, dtm_sampler, contacts, estimates["min"], "min"
+    )
     if config.verbose_level != VerboseLevel.NONE:
         print(
             n_est,
@@ -3021,6 +3025,82 @@ def calc_min_thickness_with_grid(config: Config, map_data: MapData):
     fth.close()
 
 
+####################################
+# full and min thickness estimates in a single pass
+#
+# calc_all_thickness_with_grid(config,map_data)
+# Args:
+# config Config of the project
+# map_data MapData with the dip grid and dtm
+#
+# Writes the same formation_thicknesses.csv as calc_thickness_with_grid followed by calc_min_thickness_with_grid,
+# but reads the contacts and basal contacts once and works out both sets of estimates from one set of probe
+# intersections, spread over run_flags['thickness_workers'] processes in chunks of
+# run_flags['thickness_chunk_size'] contact points. Min estimates are only kept for units that got no full estimate.
+####################################
+
+
+@beartype.beartype
+def calc_all_thickness_with_grid(config: Config, map_data: MapData):
+    dtm_sampler = map_data.get_dtm_sampler()
+    contact_lines = gpd.read_file(
+        os.path.join(config.tmp_path, "basal_contacts.shp.zip")
+    )
+    all_sorts = map_data.artifacts.get("all_sorts")
+    min_codes = all_sorts["code"].to_numpy()
+    # the full estimates match units against the all_sorts index as calc_thickness_with_grid does
+    all_sorts["index2"] = all_sorts.index
+    geol = map_data.get_map_data(Datatype.GEOLOGY).copy()
+    geol.drop_duplicates(subset="UNIT_NAME", inplace=True)
+    drops = geol[
+        geol["DESCRIPTION"].str.contains(config.c_l["sill"])
+        & geol["ROCKTYPE1"].str.contains(config.c_l["intrusive"])
+    ]
+    for ind, drop in drops.iterrows():
+        all_sorts.drop(labels=drop.name, inplace=True, errors="ignore")
+    full_codes = all_sorts.index.to_numpy()
+
+    contacts = pd.read_csv(os.path.join(config.tmp_path, "raw_contacts.csv"))
+    estimates = parallel_thickness_crossings(
+        contacts,
+        contact_lines,
+        {"full": (full_codes, ()), "min": (min_codes, ())},
+        config.run_flags["thickness_buffer"],
+        config.run_flags["max_thickness_allowed"],
+        workers=config.run_flags["thickness_workers"],
+        chunk_size=config.run_flags["thickness_chunk_size"],
+    )
+
+    thickness_file = os.path.join(config.output_path, "formation_thicknesses.csv")
+    fth = open(thickness_file, "w")
+    fth.write(
+        "X,Y,formation,appar_th,thickness,cl,cm,p1x,p1y,p2x,p2y,dip,type,slope_dip,slope_length,delz,zbase,zcross\n"
+    )
+    found_codes = set()
+    n_est = write_thickness_estimates(
+        fth,
+        config,
+        map_data.dip_grid,
+        dtm_sampler,
+        contacts,
+        estimates["full"],
+        "full",
+        found_codes,
+    )
+    if config.verbose_level != VerboseLevel.NONE:
+        print(n_est, "thickness estimates saved as", thickness_file)
+        print(found_codes, "already processed")
+
+    ctextcode = contacts["formation"].to_numpy()
+    min_estimates = [e for e in estimates["min"] if ctextcode[e[0]] not in found_codes]
+    n_est = write_thickness_estimates(
+        fth, config, map_data.dip_grid, dtm_sampler, contacts, min_estimates, "min"
+    )
+    fth.close()
+    if config.verbose_level != VerboseLevel.NONE:
+        print(n_est, "min thickness estimates appended to", thickness_file)
+
+
 ####################################
 # Normalise thickness for each estimate to median for that formation
 #
@@ -3089,7 +3169,7 @@ def normalise_thickness(output_path):
 def save_fold_axial_traces_orientations(
     config: Config, map_data: MapData, workflow: dict
 ):
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     geology = gpd.read_file(os.path.join(config.tmp_path, "geol_clip.shp"))
     # contacts = np.genfromtxt(os.path.join(config.tmp_path,'interpolation_contacts_'+config.run_flags['interpolation_scheme']+'.csv'),delimiter = ',',dtype = 'float')
     f = open(
@@ -3103,16 +3183,26 @@ def save_fold_axial_traces_orientations(
     fo.write("X,Y,Z,code,type\n")
     dummy = []
     dummy.append(1)
-    for indx, fold in folds_clip.iterrows():
+    # heights of every fold vertex in one pass
+    fold_heights = dtm_sampler.values_per_geometry(
+        folds_clip.geometry, workflow["cover_map"]
+    )
+    # orientations either side of the traces, their heights are looked up in one pass at the end
+    fat_rows = []
+    for (indx, fold), ls_heights in zip(folds_clip.iterrows(), fold_heights):
         fold_name = str(fold["GEOMETRY_OBJECT_ID"])
         if not str(fold.geometry.type) == "None":
             if fold.geometry.type == "MultiLineString":
+                # the vertices of the parts follow each other in ls_heights
+                offset = 0
                 for mls in fold.geometry:
                     fold_ls = LineString(mls)
+                    mls_heights = ls_heights[offset : offset + len(fold_ls.coords)]
+                    offset = offset + len(fold_ls.coords)
 
                     i = 0
                     first = True
-                    for afs in fold_ls.coords:
+                    for afs, afs_height in zip(fold_ls.coords, mls_heights):
                         if config.c_l["fold"].lower() in fold["FEATURE"].lower():
                             # save out current geometry of FAT
                             # decimate to reduce number of points, but also take mid and end points of a series to keep some shape
@@ -3121,14 +3211,7 @@ def save_fold_axial_traces_orientations(
                                 or i == int((len(fold_ls.coords) - 1) / 2)
                                 or i == len(fold_ls.coords) - 1
                             ):
-                                locations = [(afs[0], afs[1])]
-                                height = m2l_utils.value_from_dtm_dtb(
-                                    dtm,
-                                    map_data.dtb,
-                                    map_data.dtb_null,
-                                    workflow["cover_map"],
-                                    locations,
-                                )
+                                height = afs_height
                                 ostr = "{},{},{},FA_{},{}\n".format(
                                     afs[0],
                                     afs[1],
@@ -3184,35 +3267,25 @@ def save_fold_axial_traces_orientations(
                                             crs=map_data.working_projection,
                                             geometry=geometry,
                                         )
-                                        structure_code = gpd.sjoin(
+                                        structure_code = m2l_utils.sjoin(
                                             gdf, geology, how="left", predicate="within"
                                         )
                                         if (
                                             not str(structure_code.iloc[0]["UNIT_NAME"])
                                             == "nan"
                                         ):
-                                            locations = [(midxr, midyr)]
-                                            height = m2l_utils.value_from_dtm_dtb(
-                                                dtm,
-                                                map_data.dtb,
-                                                map_data.dtb_null,
-                                                workflow["cover_map"],
-                                                locations,
-                                            )
-                                            ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                                midxr,
-                                                midyr,
-                                                height,
-                                                dipdir2,
-                                                int(dip),
-                                                1,
-                                                str(structure_code.iloc[0]["UNIT_NAME"])
-                                                .replace(" ", "_")
-                                                .replace("-", "_"),
-                                                structure_code.iloc[0]["GROUP"],
+                                            fat_rows.append(
+                                                (
+                                                    midxr,
+                                                    midyr,
+                                                    dipdir2,
+                                                    int(dip),
+                                                    str(structure_code.iloc[0]["UNIT_NAME"])
+                                                    .replace(" ", "_")
+                                                    .replace("-", "_"),
+                                                    structure_code.iloc[0]["GROUP"],
+                                                )
                                             )
-                                            # ostr = str(midxr)+','+str(midyr)+','+str(height)+','+str(dipdir)+','+str(int(dip))+',1,'+str(structure_code.iloc[0]['UNIT_NAME']).replace(" ","_").replace("-","_")+','+str(structure_code.iloc[0]['GROUP])+'\n'
-                                            f.write(ostr)
 
                                         geometry = [Point(midxl, midyl)]
                                         gdf = gpd.GeoDataFrame(
@@ -3220,42 +3293,32 @@ def save_fold_axial_traces_orientations(
                                             crs=map_data.working_projection,
                                             geometry=geometry,
                                         )
-                                        structure_code = gpd.sjoin(
+                                        structure_code = m2l_utils.sjoin(
                                             gdf, geology, how="left", predicate="within"
                                         )
                                         if (
                                             not str(structure_code.iloc[0]["UNIT_NAME"])
                                             == "nan"
                                         ):
-                                            locations = [(midxl, midyl)]
-                                            height = m2l_utils.value_from_dtm_dtb(
-                                                dtm,
-                                                map_data.dtb,
-                                                map_data.dtb_null,
-                                                workflow["cover_map"],
-                                                locations,
-                                            )
-                                            ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                                midxl,
-                                                midyl,
-                                                height,
-                                                dipdir2 + 180,
-                                                int(dip),
-                                                1,
-                                                str(structure_code.iloc[0]["UNIT_NAME"])
-                                                .replace(" ", "_")
-                                                .replace("-", "_"),
-                                                structure_code.iloc[0]["GROUP"],
+                                            fat_rows.append(
+                                                (
+                                                    midxl,
+                                                    midyl,
+                                                    dipdir2 + 180,
+                                                    int(dip),
+                                                    str(structure_code.iloc[0]["UNIT_NAME"])
+                                                    .replace(" ", "_")
+                                                    .replace("-", "_"),
+                                                    structure_code.iloc[0]["GROUP"],
+                                                )
                                             )
-                                            # ostr = str(midxl)+','+str(midyl)+','+str(height)+','+str(dipdir+180)+','+str(int(dip))+',1,'+str(structure_code.iloc[0]['UNIT_NAME']).replace(" ","_").replace("-","_")+','+str(structure_code.iloc[0]['GROUP'])+'\n'
-                                            f.write(ostr)
 
                         i = i + 1
             else:
                 fold_ls = LineString(fold.geometry)
                 i = 0
                 first = True
-                for afs in fold_ls.coords:
+                for afs, afs_height in zip(fold_ls.coords, ls_heights):
                     if config.c_l["fold"].lower() in fold["FEATURE"].lower():
                         # save out current geometry of FAT
                         # decimate to reduce number of points, but also take mid and end points of a series to keep some shape
@@ -3264,14 +3327,7 @@ def save_fold_axial_traces_orientations(
                             or i == int((len(fold_ls.coords) - 1) / 2)
                             or i == len(fold_ls.coords) - 1
                         ):
-                            locations = [(afs[0], afs[1])]
-                            height = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
+                            height = afs_height
                             ostr = "{},{},{},FA_{},{}\n".format(
                                 afs[0],
                                 afs[1],
@@ -3322,35 +3378,25 @@ def save_fold_axial_traces_orientations(
                                         crs=map_data.working_projection,
                                         geometry=geometry,
                                     )
-                                    structure_code = gpd.sjoin(
+                                    structure_code = m2l_utils.sjoin(
                                         gdf, geology, how="left", predicate="within"
                                     )
                                     if (
                                         not str(structure_code.iloc[0]["UNIT_NAME"])
                                         == "nan"
                                     ):
-                                        locations = [(midxr, midyr)]
-                                        height = m2l_utils.value_from_dtm_dtb(
-                                            dtm,
-                                            map_data.dtb,
-                                            map_data.dtb_null,
-                                            workflow["cover_map"],
-                                            locations,
-                                        )
-                                        ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                            midxr,
-                                            midyr,
-                                            height,
-                                            dipdir2,
-                                            int(dip),
-                                            1,
-                                            str(structure_code.iloc[0]["UNIT_NAME"])
-                                            .replace(" ", "_")
-                                            .replace("-", "_"),
-                                            structure_code.iloc[0]["GROUP"],
+                                        fat_rows.append(
+                                            (
+                                                midxr,
+                                                midyr,
+                                                dipdir2,
+                                                int(dip),
+                                                str(structure_code.iloc[0]["UNIT_NAME"])
+                                                .replace(" ", "_")
+                                                .replace("-", "_"),
+                                                structure_code.iloc[0]["GROUP"],
+                                            )
                                         )
-                                        # ostr = str(midxr)+','+str(midyr)+','+str(height)+','+str(dipdir)+','+str(int(dip))+',1,'+str(structure_code.iloc[0]['UNIT_NAME']).replace(" ","_").replace("-","_")+','+str(structure_code.iloc[0]['GROUP'])+'\n'
-                                        f.write(ostr)
 
                                     geometry = [Point(midxl, midyl)]
                                     gdf = gpd.GeoDataFrame(
@@ -3358,40 +3404,38 @@ def save_fold_axial_traces_orientations(
                                         crs=map_data.working_projection,
                                         geometry=geometry,
                                     )
-                                    structure_code = gpd.sjoin(
+                                    structure_code = m2l_utils.sjoin(
                                         gdf, geology, how="left", predicate="within"
                                     )
                                     if (
                                         not str(structure_code.iloc[0]["UNIT_NAME"])
                                         == "nan"
                                     ):
-                                        locations = [(midxl, midyl)]
-                                        height = m2l_utils.value_from_dtm_dtb(
-                                            dtm,
-                                            map_data.dtb,
-                                            map_data.dtb_null,
-                                            workflow["cover_map"],
-                                            locations,
-                                        )
-                                        ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                            midxl,
-                                            midyl,
-                                            height,
-                                            dipdir2 + 180,
-                                            int(dip),
-                                            1,
-                                            str(structure_code.iloc[0]["UNIT_NAME"])
-                                            .replace(" ", "_")
-                                            .replace("-", "_"),
-                                            structure_code.iloc[0]["GROUP"],
+                                        fat_rows.append(
+                                            (
+                                                midxl,
+                                                midyl,
+                                                dipdir2 + 180,
+                                                int(dip),
+                                                str(structure_code.iloc[0]["UNIT_NAME"])
+                                                .replace(" ", "_")
+                                                .replace("-", "_"),
+                                                structure_code.iloc[0]["GROUP"],
+                                            )
                                         )
-                                        # ostr = str(midxl)+','+str(midyl)+','+str(height)+','+str(dipdir+180)+','+str(int(dip))+',1,'+str(structure_code.iloc[0]['UNIT_NAME']).replace(" ","_").replace("-","_")+','+str(structure_code.iloc[0]['GROUP'])+'\n'
-                                        f.write(ostr)
                             first = False
                             lastx = afs[0]
                             lasty = afs[1]
                     i = i + 1
 
+    heights = dtm_sampler.values(
+        [(row[0], row[1]) for row in fat_rows], workflow["cover_map"]
+    )
+    for (x, y, dipdir2, dip, unit_name, group), height in zip(fat_rows, heights):
+        ostr = "{},{},{},{},{},{},{},{}\n".format(
+            x, y, height, dipdir2, dip, 1, unit_name, group
+        )
+        f.write(ostr)
     fo.close()
     f.close()
     if config.verbose_level != VerboseLevel.NONE:
@@ -3476,7 +3520,7 @@ def extract_section(
     surface_cut=2000,
 ):
     faults = map_data.get_map_data(Datatype.FAULT)
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts2.csv"), sep=",")
     sf = open(os.path.join(config.output_path, "seismic_faults.csv"), "w")
     sf.write("X,Y,Z,formation\n")
@@ -3484,8 +3528,13 @@ def extract_section(
     sb.write("X,Y,Z,formation\n")
     for indx, interps in seismic_interp.iterrows():
         i_ls = LineString(interps.geometry)
-        for seg in i_ls.coords:
-            mx, my = section2model(seismic_line, seismic_bbox, seg[0], seg[1])
+        # model coordinates and heights of every vertex in one pass
+        model_xy = [
+            section2model(seismic_line, seismic_bbox, seg[0], seg[1])
+            for seg in i_ls.coords
+        ]
+        seg_heights = dtm_sampler.values(model_xy, workflow["cover_map"])
+        for seg, (mx, my), height in zip(i_ls.coords, model_xy, seg_heights):
             if mx != -999 and my != -999:
                 mz = (
                     seismic_bbox.loc["BR"]["DEPTH"]
@@ -3495,14 +3544,6 @@ def extract_section(
                         - seismic_bbox.loc["BR"].geometry.y
                     )
                 )
-                locations = [(mx, my)]
-                height = m2l_utils.value_from_dtm_dtb(
-                    dtm,
-                    map_data.dtb,
-                    map_data.dtb_null,
-                    workflow["cover_map"],
-                    locations,
-                )
                 if not height == -999 and mz > surface_cut:
                     mz2 = -mz + float(height)
                     # print(mx,my,mz,height,mz2)
@@ -3559,7 +3600,7 @@ def save_orientations_with_polarity(config: Config, map_data: MapData):
     contact_lines = gpd.read_file(
         os.path.join(config.tmp_path, "basal_contacts.shp.zip")
     )
-    all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"), sep=",")
+    all_sorts = map_data.artifacts.get("all_sorts")
     orientations = pd.read_csv(
         os.path.join(config.output_path, "orientations.csv"), sep=","
     )
@@ -3722,10 +3763,9 @@ def fault_strat_offset(config: Config, map_data: MapData):
         index_col=False,
     )
     formations = fm_thick["formation"].unique()
-    all_sorts = pd.read_csv(os.path.join(config.tmp_path, "all_sorts.csv"), sep=",")
+    all_sorts = map_data.artifacts.get("all_sorts")
     codes = all_sorts["code"].unique()
     local_faults = map_data.get_map_data(Datatype.FAULT).copy()
-    local_geology = map_data.get_map_data(Datatype.GEOLOGY).copy()
 
     als_thick = [
         [
@@ -3798,16 +3838,12 @@ def fault_strat_offset(config: Config, map_data: MapData):
 
     new_als.set_index("code", inplace=True)
 
-    all_long_faults = np.genfromtxt(
-        os.path.join(config.output_path, "fault_dimensions.csv"),
-        delimiter=",",
-        dtype="U100",
-    )
+    all_long_faults = map_data.artifacts.get("fault_dimensions")
 
     data = []
     columns = ["X", "Y", "id", "left_fm", "right_fm", "min_offset", "strat_offset"]
     if len(all_long_faults) > 0:
-        fault_names = all_long_faults[1:, :1]
+        fault_names = all_long_faults[["Fault"]].to_numpy(dtype=str)
 
         if config.verbose_level != VerboseLevel.NONE:
             print(
@@ -3865,14 +3901,13 @@ def fault_strat_offset(config: Config, map_data: MapData):
                 ymidsList += ymids
                 faultIds += [fault["GEOMETRY_OBJECT_ID"]] * len(xmids)
 
-        # Create geometry from left and right points list and join with geology to
+        # Look up the left and right points in the rasterised geology to
         # find which formation the point lands in
         lgdf = gpd.GeoDataFrame(crs=map_data.working_projection, geometry=lgeomList)
         rgdf = gpd.GeoDataFrame(crs=map_data.working_projection, geometry=rgeomList)
-        lcode = gpd.sjoin(lgdf, local_geology, how="left", predicate="within")
-        lcode = lcode[~lcode.index.duplicated(keep="first")]
-        rcode = gpd.sjoin(rgdf, local_geology, how="left", predicate="within")
-        rcode = rcode[~rcode.index.duplicated(keep="first")]
+        geology_grid = map_data.get_geology_grid()
+        lcode = geology_grid.sjoin(lgdf)
+        rcode = geology_grid.sjoin(rgdf)
 
         # For each set of joined points fill a 2D list (data) with point information and
         # what formation is left and right of it, (also list strat column difference and
@@ -3951,6 +3986,7 @@ def process_cover(
     use_vector: bool = True,
     use_grid: bool = True,
 ):
+    dtm_sampler = map_data.get_dtm_sampler()
     if (
         use_grid and use_vector
     ):  # assumes a grid of depth to cover, with a defined null value for no cover, and a vector description of cover limits
@@ -3978,7 +4014,7 @@ def process_cover(
             geometry=map_data.get_map_data(Datatype.COVER_MAP).buffer(-1500)
         )
 
-        actual_cover = gpd.sjoin(
+        actual_cover = m2l_utils.sjoin(
             cover_pts, cover_buffered, how="inner", predicate="within"
         )
         actual_cover["index_right"] = actual_cover["index_right"].fillna(0)
@@ -3986,12 +4022,11 @@ def process_cover(
             print("df,actual_cover", len(df), len(actual_cover))
         allpts = open(os.path.join(config.output_path, "cover_grid.csv"), "w")
         allpts.write("X,Y,Z,formation\n")
-        dtm = map_data.get_map_data(Datatype.DTM).open()
-        for indx, pt in actual_cover.iterrows():
-            locations = [(pt["X"], pt["Y"])]
-            height = m2l_utils.value_from_dtm_dtb(
-                dtm, map_data.dtb, map_data.dtb_null, workflow["cover_map"], locations
-            )
+        cover_heights = dtm_sampler.values(
+            np.column_stack([actual_cover["X"], actual_cover["Y"]]),
+            workflow["cover_map"],
+        )
+        for (indx, pt), height in zip(actual_cover.iterrows(), cover_heights):
             ostr = "{},{},{},{}\n".format(pt["X"], pt["Y"], height, "cover")
             allpts.write(ostr)
             if (
@@ -4009,7 +4044,10 @@ def process_cover(
             # need to ignore points outside bbox and make poly os bbox
             coords = extract_poly_coords(cpoly.geometry, 0)
             k = 0
-            for pt in coords["exterior_coords"]:
+            exterior_heights = dtm_sampler.values(
+                [(pt[0], pt[1]) for pt in coords["exterior_coords"]]
+            )
+            for pt, pt_height in zip(coords["exterior_coords"], exterior_heights):
                 # decimate to reduce number of points, but also take second and third point of a series
                 if (
                     k % config.run_flags["contact_decimate"] == 0
@@ -4022,11 +4060,7 @@ def process_cover(
                         and pt[1] > bbox[1]
                         and pt[1] < bbox[3]
                     ):
-                        locations = [(pt[0], pt[1])]
-
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm, map_data.dtb, map_data.dtb_null, False, locations
-                        )
+                        height = pt_height
                         ostr = "{},{},{},{}\n".format(pt[0], pt[1], height, "cover")
                         # ostr = str(pt[0])+","+str(pt[1])+","+height+",cover\n"
                         allpts.write(ostr)
@@ -4045,7 +4079,8 @@ def process_cover(
             if len(coords["interior_coords"]) > 0:
                 for i in range(0, len(coords["interior_coords"]), 2):
                     for pts in coords["interior_coords"][i + 1 : i + 2]:
-                        for pt in pts:
+                        pts_heights = dtm_sampler.values([(pt[0], pt[1]) for pt in pts])
+                        for pt, pt_height in zip(pts, pts_heights):
                             # decimate to reduce number of points, but also take second and third point of a series
                             if (
                                 k % config.run_flags["contact_decimate"] == 0
@@ -4058,15 +4093,7 @@ def process_cover(
                                     and pt[1] > bbox[1]
                                     and pt[1] < bbox[3]
                                 ):
-                                    locations = [(pt[0], pt[1])]
-
-                                    height = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        False,
-                                        locations,
-                                    )
+                                    height = pt_height
                                     ostr = "{},{},{},{}\n".format(
                                         pt[0], pt[1], height, "cover"
                                     )
@@ -4108,11 +4135,10 @@ def process_cover(
         allpts = open(os.path.join(config.output_path, "cover_grid.csv"), "w")
         allpts.write("X,Y,Z,formation\n")
 
-        for indx, pt in cover_pts.iterrows():
-            locations = [(pt["X"], pt["Y"])]
-            height = m2l_utils.value_from_dtm_dtb(
-                dtm, map_data.dtb, map_data.dtb_null, workflow["cover_map"], locations
-            )
+        cover_heights = dtm_sampler.values(
+            np.column_stack([cover_pts["X"], cover_pts["Y"]]), workflow["cover_map"]
+        )
+        for (indx, pt), height in zip(cover_pts.iterrows(), cover_heights):
             ostr = "{},{},{},{}\n".format(pt["X"], pt["Y"], height, "cover")
             # ostr = str(pt['X'])+','+str(pt['Y'])+','+str(height)+',cover\n'
             allpts.write(ostr)
@@ -4139,13 +4165,16 @@ def process_cover(
             coords = extract_poly_coords(cpoly.geometry, 0)
             k = 0
             first = True
-            for pt in coords["exterior_coords"]:
+            exterior_heights = dtm_sampler.values(
+                [(pt[0], pt[1]) for pt in coords["exterior_coords"]],
+                workflow["cover_map"],
+            )
+            for pt, pt_height in zip(coords["exterior_coords"], exterior_heights):
                 if first:
                     lastx = pt[0]
                     lasty = pt[1]
                     first = False
                 # decimate to reduce number of points, but also take second and third point of a series
-                locations = [(pt[0], pt[1])]
                 if (
                     k % config.run_flags["contact_decimate"] == 0
                     or k == int((len(coords["exterior_coords"]) - 1) / 2)
@@ -4165,14 +4194,7 @@ def process_cover(
                             lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
                             lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
 
-                            locations = [(pt[0], pt[1])]
-                            height = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
+                            height = pt_height
                             # normal to line segment
                             azimuth = (180 + degrees(atan2(lsy, -lsx))) % 360
                             # pt just a bit in/out from line
@@ -4186,7 +4208,7 @@ def process_cover(
                                 df, geometry=gpd.points_from_xy(df.X, df.Y)
                             )
                             gdf.crs = map_data.working_projection
-                            point_within = gpd.sjoin(gdf, cover, predicate="within")
+                            point_within = m2l_utils.sjoin(gdf, cover, predicate="within")
                             if len(point_within) > 0:
                                 # if Polygon(cpoly.geometry).contains(Point(testpx, testpy)):
                                 azimuth = (azimuth) % 360
@@ -4220,13 +4242,15 @@ def process_cover(
             if len(coords["interior_coords"]) > 0:
                 for i in range(0, len(coords["interior_coords"]), 2):
                     for pts in coords["interior_coords"][i + 1 : i + 2]:
-                        for pt in pts:
+                        pts_heights = dtm_sampler.values(
+                            [(pt[0], pt[1]) for pt in pts], workflow["cover_map"]
+                        )
+                        for pt, pt_height in zip(pts, pts_heights):
                             if first:
                                 lastx = pt[0]
                                 lasty = pt[1]
                                 first = False
                             # decimate to reduce number of points, but also take second and third point of a series
-                            locations = [(pt[0], pt[1])]
                             if (
                                 k % config.run_flags["contact_decimate"] == 0
                                 or k == int((len(coords["interior_coords"]) - 1) / 2)
@@ -4246,14 +4270,7 @@ def process_cover(
                                         lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
                                         lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
 
-                                        locations = [(pt[0], pt[1])]
-                                        height = m2l_utils.value_from_dtm_dtb(
-                                            dtm,
-                                            map_data.dtb,
-                                            map_data.dtb_null,
-                                            workflow["cover_map"],
-                                            locations,
-                                        )
+                                        height = pt_height
                                         # normal to line segment
                                         azimuth = (
                                             180 + degrees(atan2(lsy, -lsx))
@@ -4272,7 +4289,7 @@ def process_cover(
                                             df, geometry=gpd.points_from_xy(df.X, df.Y)
                                         )
                                         gdf.crs = map_data.working_projection
-                                        point_within = gpd.sjoin(
+                                        point_within = m2l_utils.sjoin(
                                             gdf, cover, predicate="within"
                                         )
                                         if len(point_within) > 0:
@@ -4342,13 +4359,27 @@ def save_basal_contacts_orientations_csv(
     f.write("X,Y,Z,azimuth,dip,polarity,formation\n")
     contacts = map_data.basal_contacts_no_faults
     first_geom = contacts.iloc[0].geometry
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     for index, contact in contacts[:-1].iterrows():
         i = 0
         # print(contact['UNIT_NAME'])
         first = True
         if contact.geometry is not None and contact.geometry != first_geom:
             if contact.geometry.type == "MultiLineString":  # why not LineString?
+                # heights of the first point of each line and of the midpoints
+                # between consecutive lines, looked up in one pass each
+                starts = [
+                    (line.coords[0][0], line.coords[0][1])
+                    for line in contact.geometry.geoms
+                ]
+                start_heights = dtm_sampler.values(starts, workflow["cover_map"])
+                mid_heights = dtm_sampler.values(
+                    [
+                        (lastx + ((x - lastx) / 2), lasty + ((y - lasty) / 2))
+                        for (lastx, lasty), (x, y) in zip(starts[:-1], starts[1:])
+                    ],
+                    workflow["cover_map"],
+                )
                 for line in contact.geometry.geoms:
                     # first_in_line = True
                     if i % config.run_flags["contact_decimate"] == 0:
@@ -4379,15 +4410,8 @@ def save_basal_contacts_orientations_csv(
                             else:
                                 polarity = 1
 
-                            locations = [(midx, midy)]
-
-                            height = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
+                            # lastx, lasty is always the first point of the previous line
+                            height = mid_heights[i - 1]
 
                             if config.run_flags["contact_dip"] == -999:
                                 dip = map_data.dip_grid[r, c]
@@ -4397,24 +4421,8 @@ def save_basal_contacts_orientations_csv(
                                         flip = True
                                     else:
                                         flip = False
-                                    locations1 = [(lastx, lasty)]
-                                    height1 = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        workflow["cover_map"],
-                                        locations1,
-                                    )
-                                    locations2 = [
-                                        (line.coords[0][0], line.coords[0][1])
-                                    ]
-                                    height2 = m2l_utils.value_from_dtm_dtb(
-                                        dtm,
-                                        map_data.dtb,
-                                        map_data.dtb_null,
-                                        workflow["cover_map"],
-                                        locations2,
-                                    )
+                                    height1 = start_heights[i - 1]
+                                    height2 = start_heights[i]
 
                                     l1, m1, n1, l2, m2, n2 = lmn_from_line_dip(
                                         lastx,
@@ -4528,6 +4536,7 @@ def process_sills(
     bbox,
     buffer,
 ):
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
     sills = geol_clip[geol_clip["DESCRIPTION"].str.contains(c_l["sill"])]
     sills = sills[sills["ROCKTYPE1"].str.contains(c_l["intrusive"])]
 
@@ -4554,127 +4563,132 @@ def process_sills(
                         or LineStringC.wkt.split(" ")[0] == "GEOMETRYCOLLECTION"
                     ):
                         k = 0
-                        for lineC in LineStringC:  # process all linestrings
+                        linesC = [
+                            lineC
+                            for lineC in LineStringC
+                            if lineC.wkt.split(" ")[0] == "LINESTRING"
+                        ]
+                        # heights of the first point of each linestring in one pass
+                        linesC_heights = dtm_sampler.values(
+                            [(lineC.coords[0][0], lineC.coords[0][1]) for lineC in linesC],
+                            cover_map,
+                        )
+                        for lineC, lineC_height in zip(
+                            linesC, linesC_heights
+                        ):  # process all linestrings
                             # first = True
-                            if lineC.wkt.split(" ")[0] == "LINESTRING":
-                                # decimate to reduce number of points, but also take second and third point of a series to keep gempy happy
+                            # decimate to reduce number of points, but also take second and third point of a series to keep gempy happy
+                            if (
+                                k % contact_decimate == 0
+                                or k == int((len(LineStringC) - 1) / 2)
+                                or k == len(LineStringC) - 1
+                            ):
+                                # doesn't like point right on edge?
                                 if (
-                                    k % contact_decimate == 0
-                                    or k == int((len(LineStringC) - 1) / 2)
-                                    or k == len(LineStringC) - 1
+                                    lineC.coords[0][0] > dtm.bounds[0]
+                                    and lineC.coords[0][0] < dtm.bounds[2]
+                                    and lineC.coords[0][1] > dtm.bounds[1]
+                                    and lineC.coords[0][1] < dtm.bounds[3]
                                 ):
-                                    # doesn't like point right on edge?
+                                    height = lineC_height
 
-                                    locations = [
-                                        (lineC.coords[0][0], lineC.coords[0][1])
-                                    ]
-                                    if (
-                                        lineC.coords[0][0] > dtm.bounds[0]
-                                        and lineC.coords[0][0] < dtm.bounds[2]
-                                        and lineC.coords[0][1] > dtm.bounds[1]
-                                        and lineC.coords[0][1] < dtm.bounds[3]
-                                    ):
-                                        height = m2l_utils.value_from_dtm_dtb(
-                                            dtm, dtb, dtb_null, cover_map, locations
-                                        )
+                                    dlsx = lineC.coords[0][0] - lineC.coords[1][0]
+                                    dlsy = lineC.coords[0][1] - lineC.coords[1][1]
+                                    lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
+                                    lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
 
-                                        dlsx = lineC.coords[0][0] - lineC.coords[1][0]
-                                        dlsy = lineC.coords[0][1] - lineC.coords[1][1]
-                                        lsx = dlsx / sqrt((dlsx * dlsx) + (dlsy * dlsy))
-                                        lsy = dlsy / sqrt((dlsx * dlsx) + (dlsy * dlsy))
+                                    azimuth = (
+                                        180 + degrees(atan2(lsy, -lsx))
+                                    ) % 360
 
-                                        azimuth = (
-                                            180 + degrees(atan2(lsy, -lsx))
-                                        ) % 360
+                                    # pt just a bit in/out from line
+                                    testpx = lineC.coords[0][0] - lsy
+                                    testpy = lineC.coords[0][0] + lsx
 
-                                        # pt just a bit in/out from line
-                                        testpx = lineC.coords[0][0] - lsy
-                                        testpy = lineC.coords[0][0] + lsx
+                                    midx = lineC.coords[0][0] + (
+                                        (lineC.coords[1][0] - lineC.coords[0][0])
+                                        / 2
+                                    )
+                                    midy = lineC.coords[0][1] + (
+                                        (lineC.coords[1][1] - lineC.coords[0][1])
+                                        / 2
+                                    )
+                                    # midpoint = Point(midx, midy)
+                                    dx1 = -lsy * buffer
+                                    dy1 = lsx * buffer
+                                    dx2 = -dx1
+                                    dy2 = -dy1
+
+                                    if sill.geometry.type == "Polygon":
+                                        if Polygon(sill.geometry).contains(
+                                            Point(testpx, testpy)
+                                        ):
+                                            azimuth = (azimuth - 180) % 360
+                                    else:
+                                        if MultiPolygon(sill.geometry).contains(
+                                            Point(testpx, testpy)
+                                        ):
+                                            azimuth = (azimuth - 180) % 360
 
-                                        midx = lineC.coords[0][0] + (
-                                            (lineC.coords[1][0] - lineC.coords[0][0])
-                                            / 2
-                                        )
-                                        midy = lineC.coords[0][1] + (
-                                            (lineC.coords[1][1] - lineC.coords[0][1])
-                                            / 2
-                                        )
-                                        # midpoint = Point(midx, midy)
-                                        dx1 = -lsy * buffer
-                                        dy1 = lsx * buffer
-                                        dx2 = -dx1
-                                        dy2 = -dy1
-
-                                        if sill.geometry.type == "Polygon":
-                                            if Polygon(sill.geometry).contains(
-                                                Point(testpx, testpy)
-                                            ):
-                                                azimuth = (azimuth - 180) % 360
-                                        else:
-                                            if MultiPolygon(sill.geometry).contains(
-                                                Point(testpx, testpy)
-                                            ):
-                                                azimuth = (azimuth - 180) % 360
-
-                                        p1 = Point(midx + lsy, midy - lsx)
-                                        p2 = Point((midx + dx2, midy + dy2))
-
-                                        r = int((midy - bbox[1]) / spacing)
-                                        c = int((midx - bbox[0]) / spacing)
-
-                                        dip_mean = dip_grid[r, c]
-                                        ddline = LineString((p1, p2))
-                                        # print(ddline,midpoint)
-                                        if ddline.intersects(sill.geometry):
-                                            isects = ddline.intersection(sill.geometry)
-                                            if isects.geom_type == "MultiLineString":
-                                                min_dist = 1e9
-                                                for line in isects:
-                                                    app_thickness = m2l_utils.ptsdist(
-                                                        line.coords[1][0],
-                                                        line.coords[1][1],
-                                                        midx,
-                                                        midy,
-                                                    )
-                                                    if app_thickness < buffer * 2:
-                                                        if min_dist > app_thickness:
-                                                            min_dist = app_thickness
-                                                app_thickness = min_dist
-                                                est_thickness = app_thickness * sin(
-                                                    radians(dip_mean)
-                                                )
+                                    p1 = Point(midx + lsy, midy - lsx)
+                                    p2 = Point((midx + dx2, midy + dy2))
 
-                                            else:
-                                                # print(isects)
+                                    r = int((midy - bbox[1]) / spacing)
+                                    c = int((midx - bbox[0]) / spacing)
+
+                                    dip_mean = dip_grid[r, c]
+                                    ddline = LineString((p1, p2))
+                                    # print(ddline,midpoint)
+                                    if ddline.intersects(sill.geometry):
+                                        isects = ddline.intersection(sill.geometry)
+                                        if isects.geom_type == "MultiLineString":
+                                            min_dist = 1e9
+                                            for line in isects:
                                                 app_thickness = m2l_utils.ptsdist(
-                                                    isects.coords[1][0],
-                                                    isects.coords[1][1],
+                                                    line.coords[1][0],
+                                                    line.coords[1][1],
                                                     midx,
                                                     midy,
                                                 )
                                                 if app_thickness < buffer * 2:
-                                                    est_thickness = app_thickness * sin(
-                                                        radians(dip_mean)
-                                                    )
+                                                    if min_dist > app_thickness:
+                                                        min_dist = app_thickness
+                                            app_thickness = min_dist
+                                            est_thickness = app_thickness * sin(
+                                                radians(dip_mean)
+                                            )
+
                                         else:
-                                            app_thickness = -999
-                                            est_thickness = -999
-
-                                        sill_dict[i] = {
-                                            "X": lineC.coords[0][0],
-                                            "Y": lineC.coords[0][1],
-                                            "Z": height,
-                                            "sill_code": sill["UNIT_NAME"],
-                                            "host_code": geol["UNIT_NAME"],
-                                            "outwards": azimuth,
-                                            "apparent thickness": app_thickness,
-                                            "true thickness": est_thickness,
-                                        }
-                                        i = i + 1
+                                            # print(isects)
+                                            app_thickness = m2l_utils.ptsdist(
+                                                isects.coords[1][0],
+                                                isects.coords[1][1],
+                                                midx,
+                                                midy,
+                                            )
+                                            if app_thickness < buffer * 2:
+                                                est_thickness = app_thickness * sin(
+                                                    radians(dip_mean)
+                                                )
                                     else:
-                                        continue
+                                        app_thickness = -999
+                                        est_thickness = -999
+
+                                    sill_dict[i] = {
+                                        "X": lineC.coords[0][0],
+                                        "Y": lineC.coords[0][1],
+                                        "Z": height,
+                                        "sill_code": sill["UNIT_NAME"],
+                                        "host_code": geol["UNIT_NAME"],
+                                        "outwards": azimuth,
+                                        "apparent thickness": app_thickness,
+                                        "true thickness": est_thickness,
+                                    }
+                                    i = i + 1
+                                else:
+                                    continue
 
-                                k += 1
+                            k += 1
 
     sills_df = pd.DataFrame.from_dict(sill_dict, orient="index")
     sills_df.to_csv(os.path.join(output_path, "sills.csv"))
@@ -16,9 +16,12 @@ from math import (
 import geopandas as gpd
 import pandas as pd
 import os
+import concurrent.futures
 from shapely.geometry import LineString, Point
 from . import m2l_utils
 import rasterio
+import rasterio.transform
+import shapely
 from .m2l_enums import Datatype, VerboseLevel
 
 import beartype
@@ -121,6 +124,70 @@ def scipy_CT(x, y, z, xi, yi):  # actually CloughTocher2DInterpolator
     return interp(xi, yi)
 
 
+######################################
+# k nearest neighbour Inverse Distance Weighting
+#
+# knn_idw(x, y, z, neighbours)
+# Args:
+# x,y coordinates of points to be interpolated
+# z value to be interpolated
+# neighbours number of nearest observations used for each interpolated value
+#
+# Returns a function of (xi, yi) giving the interpolated values. Observations are held in a cKDTree so memory is
+# bounded by the number of locations times neighbours rather than by the full observations x locations matrix of
+# simple_idw. A location on top of an observation takes its value.
+######################################
+
+
+def knn_idw(x, y, z, neighbours=16):
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(np.column_stack((x, y)))
+    z = np.asarray(z)
+    k = min(neighbours, len(z))
+
+    def interp(xi, yi):
+        dist, idx = tree.query(np.column_stack((xi, yi)), k=k)
+        if k == 1:
+            dist = dist[:, np.newaxis]
+            idx = idx[:, np.newaxis]
+        exact = dist == 0
+        with np.errstate(divide="ignore"):
+            weights = np.where(exact.any(axis=1)[:, np.newaxis], exact, 1.0 / dist)
+        weights /= weights.sum(axis=1)[:, np.newaxis]
+        return np.einsum("ij,ij...->i...", weights, z[idx])
+
+    return interp
+
+
+######################################
+# local Radial Basis Function interpolation
+#
+# local_rbf(x, y, z, neighbours)
+# Args:
+# x,y coordinates of points to be interpolated
+# z value to be interpolated
+# neighbours number of nearest observations in the rbf system solved for each interpolated value
+#
+# Returns a function of (xi, yi) giving the interpolated values from scipy's RBFInterpolator restricted to the
+# nearest neighbours of each location, which scales close to linearly with observations instead of the cubic
+# global solve of scipy_rbf
+######################################
+
+
+def local_rbf(x, y, z, neighbours=16):
+    from scipy.interpolate import RBFInterpolator
+
+    interp = RBFInterpolator(
+        np.column_stack((x, y)),
+        np.asarray(z),
+        neighbors=min(neighbours, len(z)),
+        kernel="thin_plate_spline",
+        smoothing=0.15,
+    )
+    return lambda xi, yi: interp(np.column_stack((xi, yi)))
+
+
 ######################################
 # calculate all distances between to arrays of points
 # Make a distance matrix between pairwise observations
@@ -161,26 +228,62 @@ def plot(x, y, z, grid):
 ######################################
 # switch function to select which intepolator to call
 #
-# interpolator_switch(calc, x, y, z, xi, yi)
+# interpolator_switch(calc, x, y, z, xi, yi, neighbours)
 # Args:
-# calc string naming the interpolator to use
+# calc string naming the interpolator to use, one of 'simple_idw', 'scipy_idw', 'scipy_rbf', 'scipy_LNDI', 'scipy_CT',
+#   'scipy_knn_idw' or 'scipy_local_rbf'
 # x,y coordinates of points to be interpolated
 # z value to be interpolated
 # xi,yi grid of points where interpolation of z will be calculated - sci_py version of Simple Inverse Distance Weighting interpolation of observations z at x,y locations returned at locations defined by xi,yi arrays
 #
 ######################################
-def interpolator_switch(calc, x, y, z, xi, yi):
+def interpolator_switch(calc, x, y, z, xi, yi, neighbours=16):
+    return interpolator_fit(calc, x, y, z, neighbours)(xi, yi)
+
+
+######################################
+# fit an interpolator once so that it can be evaluated at any number of locations
+#
+# interpolator_fit(calc, x, y, z, neighbours)
+# Args:
+# calc string naming the interpolator to use, as for interpolator_switch
+# x,y coordinates of points to be interpolated
+# z values to be interpolated, either an array of N values or an (N x k) array of k values per point
+# neighbours number of nearest observations used by the scipy_knn_idw and scipy_local_rbf schemes
+#
+# Returns a function of (xi, yi) returning the interpolated values, with one column per column of z. The costly part
+# of each scheme (the rbf solve or the triangulation) is done here once instead of every time a set of locations is
+# evaluated, and is shared by all the columns of z.
+######################################
+@m2l_utils.timer_decorator
+def interpolator_fit(calc, x, y, z, neighbours=16):
+    z = np.asarray(z)
+    m2l_utils.count_items("points", len(z))
     if calc == "simple_idw":
-        val = simple_idw(x, y, z, xi, yi)
+        return lambda xi, yi: simple_idw(x, y, z, xi, yi)
+    elif calc == "scipy_knn_idw":
+        return knn_idw(x, y, z, neighbours)
+    elif calc == "scipy_local_rbf":
+        return local_rbf(x, y, z, neighbours)
     elif calc == "scipy_idw":
-        val = scipy_idw(x, y, z, xi, yi)
+        return _rbf_fit(x, y, z, function="linear")
     elif calc == "scipy_LNDI":
-        val = scipy_LNDI(x, y, z, xi, yi)
+        from scipy.interpolate import LinearNDInterpolator
+
+        return LinearNDInterpolator(list(zip(x, y)), z)
     elif calc == "scipy_CT":
-        val = scipy_CT(x, y, z, xi, yi)
+        from scipy.interpolate import CloughTocher2DInterpolator
+
+        return CloughTocher2DInterpolator(list(zip(x, y)), z, rescale=True)
     else:
-        val = scipy_rbf(x, y, z, xi, yi)
-    return val
+        return _rbf_fit(x, y, z, function="multiquadric", smooth=0.15)
+
+
+def _rbf_fit(x, y, z, **kwargs):
+    # N-D mode solves all the columns of z against one factorisation of the kernel matrix
+    if z.ndim > 1:
+        kwargs["mode"] = "N-D"
+    return Rbf(x, y, z, **kwargs)
 
 
 ######################################
@@ -199,22 +302,13 @@ def interpolator_switch(calc, x, y, z, xi, yi):
 
 
 def call_interpolator(calc, x, y, l, m, n, xi, yi, nx, ny, fault_flag):
-    # Calculate IDW or other interpolators
-
-    ZIl = interpolator_switch(calc, x, y, l, xi, yi)
+    # Calculate IDW or other interpolators, l, m and n are solved together
+    ZIl, ZIm, ZIn = call_interpolator_grid(calc, x, y, l, m, n, xi, yi)
     if not fault_flag:
         ZIl = ZIl.reshape((ny, nx))
-
-    ZIm = interpolator_switch(calc, x, y, m, xi, yi)
-    if not fault_flag:
         ZIm = ZIm.reshape((ny, nx))
-
-    if type(n) is not int:
-        ZIn = interpolator_switch(calc, x, y, n, xi, yi)
-        if not fault_flag:
+        if type(n) is not int:
             ZIn = ZIn.reshape((ny, nx))
-    else:
-        ZIn = 0
     return (ZIl, ZIm, ZIn)
 
 
@@ -500,6 +594,7 @@ def interpolate_contacts(
     gridy,
     fault_flag,
 ):
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
     geol_file = gpd.read_file(geology_file, bbox=bbox)
     # print(len(geol_file))
     # geol_file.plot( color='black',edgecolor='black')
@@ -530,10 +625,16 @@ def interpolate_contacts(
     f.write("X,Y,Z,angle,lsx,lsy,formation,group\n")
     j = 0
     i = 0
+    # rows are collected first so their heights can be looked up in one pass
+    rows = []
     for (
         indx,
         acontact,
     ) in geol_file.iterrows():  # loop through distinct linestrings in MultiLineString
+        if str(acontact["GROUP"]) == "None":
+            group = acontact["UNIT_NAME"]
+        else:
+            group = acontact["GROUP"]
         if acontact.geometry.type == "MultiLineString":
             # print(i)
             for line in acontact.geometry:  # loop through line segments
@@ -554,56 +655,9 @@ def interpolate_contacts(
                         angle = degrees(atan2(lsx, lsy))
                         l[i] = lsx
                         m[i] = lsy
-                        # doesn't like point right on edge?
-                        locations = [(x[i], y[i])]
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm, dtb, dtb_null, cover_map, locations
+                        rows.append(
+                            (x[i], y[i], angle, lsx, lsy, acontact["UNIT_NAME"], group)
                         )
-                        if str(acontact["GROUP"]) == "None":
-                            ostr = (
-                                str(x[i])
-                                + ","
-                                + str(y[i])
-                                + ","
-                                + str(height)
-                                + ","
-                                + str(angle % 180)
-                                + ","
-                                + str(lsx)
-                                + ","
-                                + str(lsy)
-                                + ","
-                                + acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_")
-                                + ","
-                                + acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_")
-                                + "\n"
-                            )
-                        else:
-                            ostr = (
-                                str(x[i])
-                                + ","
-                                + str(y[i])
-                                + ","
-                                + str(height)
-                                + ","
-                                + str(angle % 180)
-                                + ","
-                                + str(lsx)
-                                + ","
-                                + str(lsy)
-                                + ","
-                                + acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_")
-                                + ","
-                                + acontact["GROUP"].replace(" ", "_").replace("-", "_")
-                                + "\n"
-                            )
-                        f.write(ostr)
                         npts = npts + 1
                 i = i + 1
         else:
@@ -624,55 +678,36 @@ def interpolate_contacts(
                     angle = degrees(atan2(lsx, lsy))
                     l[i] = lsx
                     m[i] = lsy
-                    # doesn't like point right on edge?
-                    locations = [(x[i], y[i])]
-                    height = m2l_utils.value_from_dtm_dtb(
-                        dtm, dtb, dtb_null, cover_map, locations
+                    rows.append(
+                        (x[i], y[i], angle, lsx, lsy, acontact["UNIT_NAME"], group)
                     )
-                    if str(acontact["GROUP"]) == "None":
-                        ostr = (
-                            str(x[i])
-                            + ","
-                            + str(y[i])
-                            + ","
-                            + str(height)
-                            + ","
-                            + str(angle % 180)
-                            + ","
-                            + str(lsx)
-                            + ","
-                            + str(lsy)
-                            + ","
-                            + acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_")
-                            + ","
-                            + acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_")
-                            + "\n"
-                        )
-                    else:
-                        ostr = (
-                            str(x[i])
-                            + ","
-                            + str(y[i])
-                            + ","
-                            + str(height)
-                            + ","
-                            + str(angle % 180)
-                            + ","
-                            + str(lsx)
-                            + ","
-                            + str(lsy)
-                            + ","
-                            + acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_")
-                            + ","
-                            + acontact["GROUP"].replace(" ", "_").replace("-", "_")
-                            + "\n"
-                        )
-                    # print(ostr)
-                    f.write(ostr)
                     # print(npts,dlsx,dlsy)
                     npts = npts + 1
                 i = i + 1
         j = j + 1
+
+    # doesn't like point right on edge?
+    heights = dtm_sampler.values([(row[0], row[1]) for row in rows], cover_map)
+    for (px, py, angle, lsx, lsy, unit_name, group), height in zip(rows, heights):
+        ostr = (
+            str(px)
+            + ","
+            + str(py)
+            + ","
+            + str(height)
+            + ","
+            + str(angle % 180)
+            + ","
+            + str(lsx)
+            + ","
+            + str(lsy)
+            + ","
+            + unit_name.replace(" ", "_").replace("-", "_")
+            + ","
+            + group.replace(" ", "_").replace("-", "_")
+            + "\n"
+        )
+        f.write(ostr)
     f.close()
     # print("i",i,"npts",npts)
 
@@ -816,7 +851,7 @@ def interpolate_contacts(
 @beartype.beartype
 def save_contact_vectors(config: Config, map_data, workflow: dict):
     geol_file = map_data.basal_contacts_no_faults
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
     # geol_file = gpd.read_file(geology_file, bbox=config.bbox)
     # print(len(geol_file))
     # geol_file.plot( color='black',edgecolor='black')
@@ -846,10 +881,16 @@ def save_contact_vectors(config: Config, map_data, workflow: dict):
     f.write("X,Y,Z,angle,lsx,lsy,formation,group\n")
     j = 0
     i = 0
+    # rows are collected first so their heights can be looked up in one pass
+    rows = []
     for (
         indx,
         acontact,
     ) in geol_file.iterrows():  # loop through distinct linestrings in MultiLineString
+        if str(acontact["GROUP"]) == "None":
+            group = acontact["UNIT_NAME"]
+        else:
+            group = acontact["GROUP"]
         if acontact.geometry and acontact.geometry.type == "MultiLineString":
             # print(i)
             for line in acontact.geometry.geoms:  # loop through line segments
@@ -870,47 +911,9 @@ def save_contact_vectors(config: Config, map_data, workflow: dict):
                         angle = degrees(atan2(lsx, lsy))
                         l[i] = lsx
                         m[i] = lsy
-                        # doesn't like point right on edge?
-                        locations = [(x[i], y[i])]
-                        height = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
+                        rows.append(
+                            (x[i], y[i], angle, lsx, lsy, acontact["UNIT_NAME"], group)
                         )
-
-                        if str(acontact["GROUP"]) == "None":
-                            ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                x[i],
-                                y[i],
-                                height,
-                                angle % 180,
-                                lsx,
-                                lsy,
-                                acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_"),
-                                acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_"),
-                            )
-                            # ostr=str(x[i])+","+str(y[i])+","+str(height)+","+str(angle%180)+","+str(lsx)+","+str(lsy)+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+"\n"
-                        else:
-                            ostr = "{},{},{},{},{},{},{},{}\n".format(
-                                x[i],
-                                y[i],
-                                height,
-                                angle % 180,
-                                lsx,
-                                lsy,
-                                acontact["UNIT_NAME"]
-                                .replace(" ", "_")
-                                .replace("-", "_"),
-                                acontact["GROUP"].replace(" ", "_").replace("-", "_"),
-                            )
-                            # ostr=str(x[i])+","+str(y[i])+","+str(height)+","+str(angle%180)+","+str(lsx)+","+str(lsy)+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+","+acontact["GROUP"].replace(" ","_").replace("-","_")+"\n"
-                        f.write(ostr)
                         npts = npts + 1
                 i = i + 1
         else:
@@ -931,45 +934,31 @@ def save_contact_vectors(config: Config, map_data, workflow: dict):
                     angle = degrees(atan2(lsx, lsy))
                     l[i] = lsx
                     m[i] = lsy
-                    # doesn't like point right on edge?
-                    locations = [(x[i], y[i])]
-                    height = m2l_utils.value_from_dtm_dtb(
-                        dtm,
-                        map_data.dtb,
-                        map_data.dtb_null,
-                        workflow["cover_map"],
-                        locations,
+                    rows.append(
+                        (x[i], y[i], angle, lsx, lsy, acontact["UNIT_NAME"], group)
                     )
-                    if str(acontact["GROUP"]) == "None":
-                        ostr = "{},{},{},{},{},{},{},{}\n".format(
-                            x[i],
-                            y[i],
-                            height,
-                            angle % 180,
-                            lsx,
-                            lsy,
-                            acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
-                            acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
-                        )
-                        # ostr=str(x[i])+","+str(y[i])+","+str(height)+","+str(angle%180)+","+str(lsx)+","+str(lsy)+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+"\n"
-                    else:
-                        ostr = "{},{},{},{},{},{},{},{}\n".format(
-                            x[i],
-                            y[i],
-                            height,
-                            angle % 180,
-                            lsx,
-                            lsy,
-                            acontact["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
-                            acontact["GROUP"].replace(" ", "_").replace("-", "_"),
-                        )
-                        # ostr=str(x[i])+","+str(y[i])+","+str(height)+","+str(angle%180)+","+str(lsx)+","+str(lsy)+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+","+acontact["GROUP"].replace(" ","_").replace("-","_")+"\n"
-                    # print(ostr)
-                    f.write(ostr)
                     # print(npts,dlsx,dlsy)
                     npts = npts + 1
                 i = i + 1
         j = j + 1
+
+    # doesn't like point right on edge?
+    heights = dtm_sampler.values(
+        [(row[0], row[1]) for row in rows], workflow["cover_map"]
+    )
+    for (px, py, angle, lsx, lsy, unit_name, group), height in zip(rows, heights):
+        ostr = "{},{},{},{},{},{},{},{}\n".format(
+            px,
+            py,
+            height,
+            angle % 180,
+            lsx,
+            lsy,
+            unit_name.replace(" ", "_").replace("-", "_"),
+            group.replace(" ", "_").replace("-", "_"),
+        )
+        # ostr=str(x[i])+","+str(y[i])+","+str(height)+","+str(angle%180)+","+str(lsx)+","+str(lsy)+","+acontact["UNIT_NAME"].replace(" ","_").replace("-","_")+","+acontact["GROUP"].replace(" ","_").replace("-","_")+"\n"
+        f.write(ostr)
     f.close()
     if config.verbose_level != VerboseLevel.NONE:
         print(
@@ -1062,18 +1051,19 @@ def join_contacts_and_orientations(
 
     gdf.crs = dst_crs
     # print(gdf.crs, geology.crs)
-    structure_code = gpd.sjoin(gdf, geology, how="left", predicate="within")
+    structure_code = m2l_utils.sjoin(gdf, geology, how="left", predicate="within")
     dtm = rasterio.open(dtm_reproj_file)
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
     if fault_flag:
         f = open(os.path.join(output_path, "f_combo_full.csv"), "w")
     else:
         f = open(os.path.join(output_path, "combo_full.csv"), "w")
     f.write("X,Y,Z,azimuth,dip,polarity,formation\n")
     # last_code = ""
-    for indx, a_point in structure_code.iterrows():
-
-        locations = [(a_point["x"], a_point["y"])]
-        height = m2l_utils.value_from_dtm_dtb(dtm, dtb, dtb_null, cover_map, locations)
+    point_heights = dtm_sampler.values(
+        np.column_stack([structure_code["x"], structure_code["y"]]), cover_map
+    )
+    for (indx, a_point), height in zip(structure_code.iterrows(), point_heights):
         ostr = str(a_point["x"]) + ","
         ostr = ostr + str(a_point["y"]) + ","
         ostr = ostr + str(height) + "," + str(int(a_point["dipdirection"])) + ","
@@ -1324,6 +1314,7 @@ def process_fault_throw_and_near_orientations(
     faults = gpd.read_file(fault_file)
     geology = gpd.read_file(geology_file)
     dtm = rasterio.open(dtm_reproj_file)
+    dtm_sampler = m2l_utils.DtmSampler(dtm, dtb, dtb_null)
 
     all_long_faults = np.genfromtxt(
         os.path.join(output_path, "fault_dimensions.csv"), delimiter=",", dtype="U100"
@@ -1388,8 +1379,8 @@ def process_fault_throw_and_near_orientations(
 
                 lgdf = gpd.GeoDataFrame(index, crs=dst_crs, geometry=lgeom)
                 rgdf = gpd.GeoDataFrame(index, crs=dst_crs, geometry=rgeom)
-                lcode = gpd.sjoin(lgdf, geology, how="left", predicate="within")
-                rcode = gpd.sjoin(rgdf, geology, how="left", predicate="within")
+                lcode = m2l_utils.sjoin(lgdf, geology, how="left", predicate="within")
+                rcode = m2l_utils.sjoin(rgdf, geology, how="left", predicate="within")
                 # display(lcode)
 
                 # add points to list if they have different geology code than previous node on left side
@@ -1526,28 +1517,26 @@ def process_fault_throw_and_near_orientations(
                                     )
                                     lastrcode = indr["UNIT_NAME"]
 
-                locations = [(firstlx, firstly)]
-                first_height_l = m2l_utils.value_from_dtm_dtb(
-                    dtm, dtb, dtb_null, cover_map, locations
+                (
+                    first_height_l,
+                    first_height_r,
+                    last_height_l,
+                    last_height_r,
+                ) = dtm_sampler.values(
+                    [
+                        (firstlx, firstly),
+                        (firstrx, firstry),
+                        (lastlx, lastly),
+                        (lastrx, lastry),
+                    ],
+                    cover_map,
                 )
                 ostr = "{},{},{},{}\n".format(firstlx, firstly, first_height_l, firstlc)
                 fftc.write(ostr)
-                locations = [(firstrx, firstry)]
-                first_height_r = m2l_utils.value_from_dtm_dtb(
-                    dtm, dtb, dtb_null, cover_map, locations
-                )
                 ostr = "{},{},{},{}\n".format(firstrx, firstry, first_height_r, firstrc)
                 fftc.write(ostr)
-                locations = [(lastlx, lastly)]
-                last_height_l = m2l_utils.value_from_dtm_dtb(
-                    dtm, dtb, dtb_null, cover_map, locations
-                )
                 ostr = "{},{},{},{}\n".format(lastlx, lastly, last_height_l, lastlc)
                 fftc.write(ostr)
-                locations = [(lastrx, lastry)]
-                last_height_r = m2l_utils.value_from_dtm_dtb(
-                    dtm, dtb, dtb_null, cover_map, locations
-                )
                 ostr = "{},{},{},{}\n".format(lastrx, lastry, last_height_r, lastrc)
                 fftc.write(ostr)
 
@@ -1619,8 +1608,8 @@ def process_fault_throw_and_near_orientations(
                     rgeom = [Point(xy) for xy in rcoords]
                     lgdf = gpd.GeoDataFrame(index, crs=dst_crs, geometry=lgeom)
                     rgdf = gpd.GeoDataFrame(index, crs=dst_crs, geometry=rgeom)
-                    lcode = gpd.sjoin(lgdf, geology, how="left", predicate="within")
-                    rcode = gpd.sjoin(rgdf, geology, how="left", predicate="within")
+                    lcode = m2l_utils.sjoin(lgdf, geology, how="left", predicate="within")
+                    rcode = m2l_utils.sjoin(rgdf, geology, how="left", predicate="within")
 
                     # add points to list if they have different geology code than previous node on left side
 
@@ -1751,32 +1740,30 @@ def process_fault_throw_and_near_orientations(
                                         )
                                         lastrcode = indr["UNIT_NAME"]
 
-                    locations = [(firstlx, firstly)]
-                    first_height_l = m2l_utils.value_from_dtm_dtb(
-                        dtm, dtb, dtb_null, cover_map, locations
+                    (
+                        first_height_l,
+                        first_height_r,
+                        last_height_l,
+                        last_height_r,
+                    ) = dtm_sampler.values(
+                        [
+                            (firstlx, firstly),
+                            (firstrx, firstry),
+                            (lastlx, lastly),
+                            (lastrx, lastry),
+                        ],
+                        cover_map,
                     )
                     ostr = "{},{},{},{}\n".format(
                         firstlx, firstly, first_height_l, firstlc
                     )
                     fftc.write(ostr)
-                    locations = [(firstrx, firstry)]
-                    first_height_r = m2l_utils.value_from_dtm_dtb(
-                        dtm, dtb, dtb_null, cover_map, locations
-                    )
                     ostr = "{},{},{},{}\n".format(
                         firstrx, firstry, first_height_r, firstrc
                     )
                     fftc.write(ostr)
-                    locations = [(lastlx, lastly)]
-                    last_height_l = m2l_utils.value_from_dtm_dtb(
-                        dtm, dtb, dtb_null, cover_map, locations
-                    )
                     ostr = "{},{},{},{}\n".format(lastlx, lastly, last_height_l, lastlc)
                     fftc.write(ostr)
-                    locations = [(lastrx, lastry)]
-                    last_height_r = m2l_utils.value_from_dtm_dtb(
-                        dtm, dtb, dtb_null, cover_map, locations
-                    )
                     ostr = "{},{},{},{}\n".format(lastrx, lastry, last_height_r, lastrc)
                     fftc.write(ostr)
 
@@ -2026,50 +2013,81 @@ def process_fault_throw_and_near_orientations(
     )
 
 
-def call_interpolator_grid(calc, x, y, l, m, n, xi, yi):
+def call_interpolator_grid(calc, x, y, l, m, n, xi, yi, neighbours=16):
     # Calculate IDW or other interpolators
+    interpolators = fit_interpolator_grid(calc, x, y, l, m, n, neighbours)
+    return evaluate_interpolator_grid(interpolators, xi, yi)
 
-    ZIl = interpolator_switch(calc, x, y, l, xi, yi)
-    ZIm = interpolator_switch(calc, x, y, m, xi, yi)
+
+######################################
+# fit the interpolators of two or three direction cosine arrays
+#
+# fit_interpolator_grid(calc, x, y, l, m, n, neighbours)
+# Args:
+# calc string naming the interpolator to use, as for interpolator_switch
+# x,y coordinates of points to be interpolated
+# l,m,n arrays of direction cosines, n is 0 for 2D direction cosines
+# neighbours number of nearest observations used by the local schemes
+#
+# Returns (interpolator, k), a single interpolator from interpolator_fit of the (N x k) array of l,m(,n) so the
+# system is built and solved once for all components, and k the number of components (2 or 3)
+######################################
+def fit_interpolator_grid(calc, x, y, l, m, n, neighbours=16):
     if type(n) is not int:
-        ZIn = interpolator_switch(calc, x, y, n, xi, yi)
+        lmn = np.column_stack((l, m, n))
     else:
-        ZIn = 0
+        lmn = np.column_stack((l, m))
+    return (interpolator_fit(calc, x, y, lmn, neighbours), lmn.shape[1])
 
-    return (ZIl, ZIm, ZIn)
+
+@m2l_utils.timer_decorator
+def evaluate_interpolator_grid(interpolators, xi, yi):
+    interp, k = interpolators
+    m2l_utils.count_items("points", len(xi))
+    ZI = np.asarray(interp(xi, yi)).reshape((-1, k))
+    if k == 3:
+        return (ZI[:, 0], ZI[:, 1], ZI[:, 2])
+    return (ZI[:, 0], ZI[:, 1], 0)
 
 
 def interpolate_orientation_grid(structures, calc, xcoords, ycoords, c_l):
+    interpolators = fit_orientation_grid(structures, calc, c_l)
+    return evaluate_orientation_grid(interpolators, xcoords, ycoords)
 
-    npts = len(structures)
-    x = np.zeros(npts)
-    y = np.zeros(npts)
-    dip = np.zeros(npts)
-    dipdir = np.zeros(npts)
 
-    i = 0
-    l = np.zeros(npts)
-    m = np.zeros(npts)
-    n = np.zeros(npts)
-    for a_pt in structures.iterrows():
-        x[i] = a_pt[1]["geometry"].x + (np.random.ranf())
-        y[i] = a_pt[1]["geometry"].y + (np.random.ranf())
-        dip[i] = a_pt[1]["DIP"]
+######################################
+# fit the l,m,n interpolators of a set of bedding orientations
+#
+# fit_orientation_grid(structures, calc, c_l, neighbours)
+# Args:
+# structures geopandas point layer of bedding with DIP, DIPDIR and POLARITY columns
+# calc string naming the interpolator to use
+# c_l dictionary of codes and labels
+# neighbours number of nearest observations used by the local schemes
+#
+# Returns interpolators to pass to evaluate_orientation_grid
+######################################
+def fit_orientation_grid(structures, calc, c_l, neighbours=16):
+    npts = len(structures)
+    x = structures.geometry.x.to_numpy() + np.random.ranf(npts)
+    y = structures.geometry.y.to_numpy() + np.random.ranf(npts)
 
-        # All orientation have been converted to dipdir
-        dipdir[i] = a_pt[1]["DIPDIR"]
+    # All orientation have been converted to dipdir
+    l, m, n = m2l_utils.ddd2dircos_arr(
+        structures["DIP"].to_numpy(dtype=float),
+        structures["DIPDIR"].to_numpy(dtype=float),
+    )
+    # this code is now in the right place?
+    polarity = np.where((structures["POLARITY"] == c_l["btype"]).to_numpy(), -1, 1)
+    l = l * polarity
+    m = m * polarity
+    n = n * polarity
 
-        i = i + 1
+    return fit_interpolator_grid(calc, x, y, l, m, n, neighbours)
 
-    for i in range(0, npts):
-        l[i], m[i], n[i] = m2l_utils.ddd2dircos(dip[i], dipdir[i])
-        # this code is now in the right place?
-        if structures.iloc[i]["POLARITY"] == c_l["btype"]:
-            l[i] = -l[i]
-            m[i] = -m[i]
-            n[i] = -n[i]
 
-    ZIl, ZIm, ZIn = call_interpolator_grid(calc, x, y, l, m, n, xcoords, ycoords)
+def evaluate_orientation_grid(interpolators, xcoords, ycoords):
+    ZIl, ZIm, ZIn = evaluate_interpolator_grid(interpolators, xcoords, ycoords)
 
     l2 = ZIl / np.sqrt(ZIl**2 + ZIm**2 + ZIn**2)
     m2 = ZIm / np.sqrt(ZIl**2 + ZIm**2 + ZIn**2)
@@ -2085,77 +2103,76 @@ def interpolate_orientation_grid(structures, calc, xcoords, ycoords, c_l):
     return (l2, m2, n2, dip, dip_direction)
 
 
-def pts2dircos_arr(p1x, p1y, p2x, p2y):
-    dx = p1x - p2x
-    dy = p1y - p2y
-    return (dx, dy)
-
-
 def interpolate_contacts_grid(contacts, calc, xcoords_group, ycoords_group):
-    decimate = 1
-    i = 0
-    listarray = []
-    for (
-        indx,
-        acontact,
-    ) in contacts.iterrows():  # loop through distinct linestrings in MultiLineString
-        if acontact.geometry.type == "MultiLineString":
-            for line in acontact.geometry.geoms:
-                if i % decimate == 0:
-                    listarray.append([line.coords[0][0], line.coords[0][1]])
-                i = i + 1
-        else:
-            if 1 % decimate == 0:
-                listarray.append(
-                    [acontact.geometry.coords[0][0], acontact.geometry.coords[0][1]]
-                )
-            i = i + 1
+    interpolators = fit_contacts_grid(contacts, calc)
+    if interpolators is None:
+        return (0, 0, 0)
+    return evaluate_contacts_grid(interpolators, xcoords_group, ycoords_group)
+
 
-    coords = np.array(listarray)
+######################################
+# fit the l,m interpolators of the strike of a set of basal contacts
+#
+# fit_contacts_grid(contacts, calc, neighbours)
+# Args:
+# contacts geopandas layer of basal contact polylines
+# calc string naming the interpolator to use
+# neighbours number of nearest observations used by the local schemes
+#
+# Returns interpolators to pass to evaluate_contacts_grid or None if there are too few contact segments
+######################################
+def fit_contacts_grid(contacts, calc, neighbours=16):
+    # first point of each distinct linestring, MultiLineStrings are split into their parts
+    parts = shapely.get_parts(np.asarray(contacts.geometry))
+    coords = shapely.get_coordinates(shapely.get_point(parts, 0))
     if len(coords) & 0x1:
         coords2 = coords[: len(coords) - 1, :].reshape((int(len(coords) / 2), 4))
     else:
         coords2 = coords[: len(coords), :].reshape((int(len(coords) / 2), 4))
 
-    dx = coords2[:, 0:1] - coords2[:, 2:3]
-    dy = coords2[:, 1:2] - coords2[:, 3:4]
-    x = coords2[:, 0:1] + (dx / 2)
-    y = coords2[:, 1:2] + (dy / 2)
-
-    dx2 = dx**2
-    dy2 = dy**2
-    mask = np.logical_and(dx2 > 0, dy2 > 0)
-
-    dx = dx[mask]
-    dy = dy[mask]
-    dx2 = dx2[mask]
-    dy2 = dy2[mask]
-    x = x[mask]
-    y = y[mask]
-    scale = np.sqrt(dx2 + dy2)
-    l = dx / scale
-    m = dy / scale
+    # each pair of points gives a strike direction at its mid point
+    dx = coords2[:, 0] - coords2[:, 2]
+    dy = coords2[:, 1] - coords2[:, 3]
+    mask = np.logical_and(dx**2 > 0, dy**2 > 0)
+    x = (coords2[:, 0] + (dx / 2))[mask]
+    y = (coords2[:, 1] + (dy / 2))[mask]
+    l, m = m2l_utils.pts2dircos_arr(
+        coords2[mask, 0], coords2[mask, 1], coords2[mask, 2], coords2[mask, 3]
+    )
     # m=np.where(l<0, -m, m)
     # l=np.where(l<0, -l, l)
 
     if len(x) > 2:
-        ZIl, ZIm, ZIn = call_interpolator_grid(
-            calc, x, y, l, m, 0, xcoords_group, ycoords_group
-        )
-        l2 = ZIl / np.sqrt(ZIl**2 + ZIm**2)
-        m2 = ZIm / np.sqrt(ZIl**2 + ZIm**2)
-        S = np.degrees(np.arctan2(l2, m2))
-
-        return (l2, m2, S)
+        return fit_interpolator_grid(calc, x, y, l, m, 0, neighbours)
     else:
-        return (0, 0, 0)
+        return None
+
+
+def evaluate_contacts_grid(interpolators, xcoords_group, ycoords_group):
+    ZIl, ZIm, ZIn = evaluate_interpolator_grid(interpolators, xcoords_group, ycoords_group)
+    l2 = ZIl / np.sqrt(ZIl**2 + ZIm**2)
+    m2 = ZIm / np.sqrt(ZIl**2 + ZIm**2)
+    S = np.degrees(np.arctan2(l2, m2))
+
+    return (l2, m2, S)
+
+
+######################################
+# load the observations used by interpolation_grids
+#
+# interpolation_inputs(config, map_data, basal_contacts_filename)
+# Args:
+# config Config of the project
+# map_data MapData with geology and structure loaded
+# basal_contacts_filename path of the basal contacts layer
+#
+# Returns (geology, orientations, contacts), geology with GROUP filled from GROUP2 or UNIT_NAME, the non horizontal
+# bedding orientations and the basal contacts within the bbox
+######################################
 
 
 @beartype.beartype
-def interpolation_grids(
-    config: Config, map_data, basal_contacts_filename: str, super_groups: list
-):  # -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    # Note: Hint type returns don't work properly for python 3.8 or older
+def interpolation_inputs(config: Config, map_data, basal_contacts_filename: str):
     geology = map_data.get_map_data(Datatype.GEOLOGY).copy()
     orientations = map_data.get_map_data(Datatype.STRUCTURE).copy()
 
@@ -2169,10 +2186,106 @@ def interpolation_grids(
     geology["GROUP"].fillna(geology["GROUP2"], inplace=True)
     geology["GROUP"].fillna(geology["UNIT_NAME"], inplace=True)
 
-    spacing = config.run_flags["interpolation_spacing"]
+    # orientations = gpd.sjoin(structures, geology, how="left", predicate="within")
+    orientations = orientations[orientations["DIP"] != 0]
+    return (geology, orientations, contacts)
+
+
+######################################
+# fit the orientation and contact interpolants of one supergroup
+#
+# fit_supergroup(config, orientations, contacts, groups)
+# Args:
+# config Config of the project
+# orientations, contacts as returned by interpolation_inputs
+# groups list of the groups in the supergroup
+#
+# Returns (orientation_interpolators, contact_interpolators), either is None when the supergroup has too few
+# observations, in which case its nodes get zero values
+######################################
+
+
+@beartype.beartype
+def fit_supergroup(config: Config, orientations, contacts, groups: list):
     scheme = config.run_flags["interpolation_scheme"]
+    neighbours = config.run_flags["interpolation_neighbours"]
+    first = True
+    for group in groups:
+        if first:
+            all_structures = orientations[orientations["GROUP"] == group]
+            all_contacts = contacts[
+                contacts["GROUP"] == group.replace(" ", "_").replace("-", "_")
+            ]
+            first = False
+
+        another_contact = contacts[
+            contacts["GROUP"] == group.replace(" ", "_").replace("-", "_")
+        ]
+        all_contacts = pd.concat([all_contacts, another_contact], sort=False)
+
+        another_structure = orientations[orientations["GROUP"] == group]
+        all_structures = pd.concat([all_structures, another_structure], sort=False)
+
+    orientation_interpolators = None
+    if len(all_structures) > 2:
+        orientation_interpolators = fit_orientation_grid(
+            all_structures, scheme, config.c_l, neighbours
+        )
+    elif config.verbose_level != VerboseLevel.NONE:
+        print(groups, "has no structures")
+
+    contact_interpolators = None
+    if len(all_contacts) > 0:
+        contact_interpolators = fit_contacts_grid(all_contacts, scheme, neighbours)
+    elif config.verbose_level != VerboseLevel.NONE:
+        print(groups, "has no contacts")
+
+    return (orientation_interpolators, contact_interpolators)
+
+
+######################################
+# combine interpolated bedding and contact orientations
+#
+# combine_orientations_and_contacts(n, contact_l, contact_m)
+# Args:
+# n interpolated z direction cosine of the pole to bedding
+# contact_l, contact_m interpolated direction cosines of the contact strike
+#
+# Returns (lscaled, mscaled, dip, dip_direction), the dip direction taken normal to the interpolated contacts and the
+# dip from the interpolated bedding
+######################################
+
+
+def combine_orientations_and_contacts(n, contact_l, contact_m):
+    scale = np.sqrt(1 - (n**2))
+    lscaled = -scale * contact_m
+    mscaled = scale * contact_l
+
+    dip = 90.0 - np.degrees(np.arcsin(n))
+    mscaled = np.where(mscaled == 0, 1e-5, mscaled)
+    # dip_direction=np.where(mscaled>0, (360+np.degrees(np.arctan2(lscaled,mscaled)))%360, 1)
+    dip_direction = (360 + np.degrees(np.arctan2(lscaled, mscaled))) % 360
+    # dip_direction=np.where(mscaled<0, (540+np.degrees(np.arctan2(lscaled,mscaled)))%360, dip_direction)
+    # dip_direction=np.where(mscaled==0, 90, dip_direction)
+    return (lscaled, mscaled, dip, dip_direction)
+
+
+def interpolation_spacing(config: Config):
+    spacing = config.run_flags["interpolation_spacing"]
     if spacing < 0:
         spacing = -(config.bbox[2] - config.bbox[0]) / spacing
+    return spacing
+
+
+@beartype.beartype
+def interpolation_grids(
+    config: Config, map_data, basal_contacts_filename: str, super_groups: list
+):  # -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    # Note: Hint type returns don't work properly for python 3.8 or older
+    geology, orientations, contacts = interpolation_inputs(
+        config, map_data, basal_contacts_filename
+    )
+    spacing = interpolation_spacing(config)
 
     # x = (config.bbox[2] - config.bbox[0]) / spacing
     # y = (config.bbox[3] - config.bbox[1]) / spacing
@@ -2180,111 +2293,81 @@ def interpolation_grids(
     xcoords = np.arange(config.bbox[0], config.bbox[2], spacing)
     ycoords = np.arange(config.bbox[1], config.bbox[3], spacing)
     xcoords, ycoords = np.meshgrid(xcoords, ycoords)
-    bsh = xcoords.shape
     xcoords, ycoords = xcoords.flatten(), ycoords.flatten()
 
     xycoords = np.vstack((xcoords, ycoords)).transpose()
     xycoords = xycoords.reshape(len(xcoords), 2)
 
-    nodes = gpd.GeoDataFrame(
-        xycoords, geometry=[Point(xy) for xy in zip(xcoords, ycoords)]
+    # the unit of each node from the shared rasterised geology rather than a point per node sjoin
+    positions = map_data.get_geology_grid().lookup(xycoords)
+    node_groups = np.where(
+        positions >= 0, geology["GROUP"].to_numpy()[np.maximum(positions, 0)], np.nan
     )
-    nodes.crs = map_data.working_projection
-    nodes_code = gpd.sjoin(nodes, geology, how="left", predicate="within")
-    # orientations = gpd.sjoin(structures, geology, how="left", predicate="within")
-    orientations = orientations[orientations["DIP"] != 0]
-    first_supergroup = True
-    # avoids massive memory rbf calcs by splitting calc into (non-threaded) chunks, maybe try dask + masks??
-    split = 25000
-    # print('split',split,'bsh[0]',bsh[0],'bsh[1]',bsh[1],'spacing',spacing,'xdim',config.bbox[2]-config.bbox[0],'ydim',config.bbox[3]-config.bbox[1])
-    for i in np.arange(0, bsh[0] * bsh[1], split):
-        min = i
-        max = i + split
-        if max > bsh[0] * bsh[1]:
-            max = bsh[0] * bsh[1] + 1
-        # print('rbf_split', min, max)
-        nodes_code_row = nodes_code[min:max]
-        for groups in super_groups:
-            if config.verbose_level != VerboseLevel.NONE:
-                print(groups)
-            first = True
-            for group in groups:
-
-                if first:
-                    all_nodes = nodes_code_row[nodes_code_row["GROUP"] == group]
-                    all_structures = orientations[orientations["GROUP"] == group]
-                    all_contacts = contacts[
-                        contacts["GROUP"] == group.replace(" ", "_").replace("-", "_")
-                    ]
-                    first = False
-                else:
-                    another_node = nodes_code_row[nodes_code_row["GROUP"] == group]
-                    all_nodes = pd.concat([all_nodes, another_node], sort=False)
-
-                another_contact = contacts[
-                    contacts["GROUP"] == group.replace(" ", "_").replace("-", "_")
-                ]
-                all_contacts = pd.concat([all_contacts, another_contact], sort=False)
-
-                another_structure = orientations[orientations["GROUP"] == group]
-                all_structures = pd.concat(
-                    [all_structures, another_structure], sort=False
-                )
+    # each supergroup's interpolants are fitted once, only their evaluation is split into chunks to bound memory,
+    # the chunks are evaluated by a pool of threads (numpy and scipy release the GIL) straight into the result arrays
+    split = config.run_flags["interpolation_chunk_size"]
+    workers = config.run_flags["interpolation_workers"]
+    chunks = []
+    n_nodes = 0
+    for groups in super_groups:
+        if config.verbose_level != VerboseLevel.NONE:
+            print(groups)
+        nodes = np.concatenate(
+            [np.zeros(0, dtype=int)]
+            + [np.flatnonzero(node_groups == group) for group in groups]
+        )
+        xcoords_group = xcoords[nodes]
+        ycoords_group = ycoords[nodes]
 
-            xcoords_group = all_nodes.geometry.x
-            ycoords_group = all_nodes.geometry.y
+        if len(xcoords_group) == 0:
+            continue
 
-            if len(xcoords_group) > 0:
-                if len(all_structures) > 2:
-                    l, m, n, d, dd = interpolate_orientation_grid(
-                        all_structures, scheme, xcoords_group, ycoords_group, config.c_l
-                    )
-                    xy_lmn = np.vstack(
-                        (xcoords_group, ycoords_group, l, m, n, d, dd)
-                    ).transpose()
-                    xy_lmn = xy_lmn.reshape(len(l), 7)
-                else:
-                    if config.verbose_level != VerboseLevel.NONE:
-                        print(groups, "has no structures")
+        orientation_interpolators, contact_interpolators = fit_supergroup(
+            config, orientations, contacts, groups
+        )
 
-                    xy_lmn = np.zeros((5, len(xcoords_group)))
-                    xy_lmn = np.vstack(
-                        (xcoords_group, ycoords_group, xy_lmn)
-                    ).transpose()
-                    xy_lmn = xy_lmn.reshape(len(xcoords_group), 7)
+        for i in range(0, len(xcoords_group), split):
+            chunks.append(
+                (
+                    n_nodes + i,
+                    xcoords_group[i : i + split],
+                    ycoords_group[i : i + split],
+                    orientation_interpolators,
+                    contact_interpolators,
+                )
+            )
+        n_nodes = n_nodes + len(xcoords_group)
+
+    xy_lmn_all = np.zeros((n_nodes, 7))
+    xy_lm_contacts_all = np.zeros((n_nodes, 5))
+
+    def evaluate_chunk(chunk):
+        start, xcoords_chunk, ycoords_chunk, orientation_interpolators, contact_interpolators = chunk
+        rows = slice(start, start + len(xcoords_chunk))
+        xy_lmn_all[rows, 0] = xcoords_chunk
+        xy_lmn_all[rows, 1] = ycoords_chunk
+        if orientation_interpolators is not None:
+            xy_lmn_all[rows, 2:] = np.column_stack(
+                evaluate_orientation_grid(
+                    orientation_interpolators, xcoords_chunk, ycoords_chunk
+                )
+            )
+        xy_lm_contacts_all[rows, 0] = xcoords_chunk
+        xy_lm_contacts_all[rows, 1] = ycoords_chunk
+        if contact_interpolators is not None:
+            xy_lm_contacts_all[rows, 2:] = np.column_stack(
+                evaluate_contacts_grid(
+                    contact_interpolators, xcoords_chunk, ycoords_chunk
+                )
+            )
 
-                if len(all_contacts) > 0:
-                    l, m, S = interpolate_contacts_grid(
-                        all_contacts, scheme, xcoords_group, ycoords_group
-                    )
-                    if type(l) is not int:
-                        xy_lm_contacts = np.vstack(
-                            (xcoords_group, ycoords_group, l, m, S)
-                        ).transpose()
-                        xy_lm_contacts = xy_lm_contacts.reshape(len(l), 5)
-                    else:
-                        xy_lm_contacts = np.zeros((3, len(xcoords_group)))
-                        xy_lm_contacts = np.vstack(
-                            (xcoords_group, ycoords_group, xy_lm_contacts)
-                        ).transpose()
-                        xy_lm_contacts = xy_lm_contacts.reshape(len(xcoords_group), 5)
-                else:
-                    if config.verbose_level != VerboseLevel.NONE:
-                        print(groups, "has no contacts")
-
-                    xy_lm_contacts = np.zeros((3, len(xcoords_group)))
-                    xy_lm_contacts = np.vstack(
-                        (xcoords_group, ycoords_group, xy_lm_contacts)
-                    ).transpose()
-                    xy_lm_contacts = xy_lm_contacts.reshape(len(xcoords_group), 5)
-
-                if first_supergroup:
-                    first_supergroup = False
-                    xy_lmn_all = np.copy(xy_lmn)
-                    xy_lm_contacts_all = np.copy(xy_lm_contacts)
-                else:
-                    xy_lmn_all = np.vstack((xy_lmn_all, xy_lmn))
-                    xy_lm_contacts_all = np.vstack((xy_lm_contacts_all, xy_lm_contacts))
+    if workers > 1 and len(chunks) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises any exception from a chunk
+            list(executor.map(evaluate_chunk, chunks))
+    else:
+        for chunk in chunks:
+            evaluate_chunk(chunk)
 
     # sort to get back to x,y grid ordering
     dt = [
@@ -2311,27 +2394,9 @@ def interpolation_grids(
     contact_interp = xy_lm_contacts_all.ravel().view(dt)
     contact_interp.sort(order=["X", "Y", "l", "m", "angle"])
 
-    scale = np.sqrt(1 - (orientation_interp["n"] ** 2))
-    lscaled = -scale * contact_interp["m"]
-    mscaled = scale * contact_interp["l"]
-    scale2 = np.sqrt(orientation_interp["l"] ** 2 + orientation_interp["m"] ** 2)
-    with np.errstate(divide="ignore", invalid="ignore"):
-        loscaled = np.where(scale2 > 0, contact_interp["l"] / scale2, 0)
-        moscaled = np.where(scale2 > 0, contact_interp["m"] / scale2, 0)
-    dotproduct = (-contact_interp["m"] * loscaled) + (contact_interp["l"] * moscaled)
-
-    # lscaled=np.where(dotproduct<0, -lscaled,lscaled)
-    # mscaled=np.where(dotproduct<0, -mscaled,mscaled)
-    dotproduct = np.where(dotproduct > 1, 1, dotproduct)
-    dotproduct = np.where(dotproduct < -1, -1, dotproduct)
-    # misorientation = np.degrees(np.arccos(dotproduct))
-
-    dip = 90.0 - np.degrees(np.arcsin(orientation_interp["n"]))
-    mscaled = np.where(mscaled == 0, 1e-5, mscaled)
-    # dip_direction=np.where(mscaled>0, (360+np.degrees(np.arctan2(lscaled,mscaled)))%360, 1)
-    dip_direction = (360 + np.degrees(np.arctan2(lscaled, mscaled))) % 360
-    # dip_direction=np.where(mscaled<0, (540+np.degrees(np.arctan2(lscaled,mscaled)))%360, dip_direction)
-    # dip_direction=np.where(mscaled==0, 90, dip_direction)
+    lscaled, mscaled, dip, dip_direction = combine_orientations_and_contacts(
+        orientation_interp["n"], contact_interp["l"], contact_interp["m"]
+    )
 
     combo_interp = np.vstack(
         (
@@ -2351,6 +2416,90 @@ def interpolation_grids(
     return (contact_interp, combo_interp)
 
 
+######################################
+# scatter the interpolated orientations and contacts into dense grids
+#
+# interpolation_to_grids(config, contact_interp, combo_interp)
+# Args:
+# config Config of the project, the grids are config.height x config.width cells of interpolation_spacing over config.bbox
+# contact_interp, combo_interp dataframes returned by interpolation_grids
+#
+# Returns dict of dip, dip_dir, polarity and contact grids, -999 where there is no interpolated value. Rows increase
+# with Y so the grids are indexed [r, c] with r = int((Y - bbox[1]) / spacing) and c = int((X - bbox[0]) / spacing)
+######################################
+
+
+@beartype.beartype
+def interpolation_to_grids(config: Config, contact_interp, combo_interp) -> dict:
+    spacing = config.run_flags["interpolation_spacing"]
+    bbox = config.bbox
+    grids = {}
+    for name in ["dip", "dip_dir", "polarity", "contact"]:
+        grids[name] = np.full((config.height, config.width), -999.0)
+
+    combo = combo_interp.to_numpy(dtype=float)
+    r = ((combo[:, 1] - bbox[1]) / spacing).astype(int)
+    c = ((combo[:, 0] - bbox[0]) / spacing).astype(int)
+    grids["dip"][r, c] = combo[:, 5]
+    grids["dip_dir"][r, c] = combo[:, 6]
+    grids["polarity"][r, c] = combo[:, 4]
+
+    contact = contact_interp.to_numpy(dtype=float)
+    r = ((contact[:, 1] - bbox[1]) / spacing).astype(int)
+    c = ((contact[:, 0] - bbox[0]) / spacing).astype(int)
+    grids["contact"][r, c] = contact[:, 4]
+    return grids
+
+
+######################################
+# save and load the interpolated grids as one multi band geotif
+#
+# save_interpolation_grids(config, grids, filename)
+# load_interpolation_grids(filename)
+# Args:
+# config Config of the project
+# grids dict of grids from interpolation_to_grids, one band per grid named by the band description
+# filename path of the geotif
+#
+# load_interpolation_grids returns the same dict of grids, in the same row order
+######################################
+
+
+@beartype.beartype
+def save_interpolation_grids(config: Config, grids: dict, filename: str):
+    spacing = config.run_flags["interpolation_spacing"]
+    height, width = config.height, config.width
+    transform = rasterio.transform.from_origin(
+        config.bbox[0], config.bbox[1] + height * spacing, spacing, spacing
+    )
+    with rasterio.open(
+        filename,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=len(grids),
+        dtype="float64",
+        crs=config.project_crs,
+        transform=transform,
+        nodata=-999,
+        tiled=True,
+        compress="deflate",
+    ) as dst:
+        for band, (name, grid) in enumerate(grids.items(), start=1):
+            # geotif rows run north to south
+            dst.write(np.flipud(grid), band)
+            dst.set_band_description(band, name)
+
+
+def load_interpolation_grids(filename: str) -> dict:
+    grids = {}
+    with rasterio.open(filename) as src:
+        for band, name in enumerate(src.descriptions, start=1):
+            grids[name] = np.flipud(src.read(band))
+    return grids
+
+
 @beartype.beartype
 def process_fault_throw_and_near_faults_from_grid(
     config: Config, map_data, workflow, dip_grid, dip_dir_grid
@@ -2358,15 +2507,10 @@ def process_fault_throw_and_near_faults_from_grid(
 
     local_faults = map_data.get_map_data(Datatype.FAULT)
     local_faults = local_faults.dropna(subset=["geometry"])
-    geology = map_data.get_map_data(Datatype.GEOLOGY)
-    dtm = map_data.get_map_data(Datatype.DTM).open()
+    dtm_sampler = map_data.get_dtm_sampler()
 
-    all_long_faults = np.genfromtxt(
-        os.path.join(config.output_path, "fault_dimensions.csv"),
-        delimiter=",",
-        dtype="U100",
-    )
-    fault_names = all_long_faults[1:, :1]
+    all_long_faults = map_data.artifacts.get("fault_dimensions")
+    fault_names = all_long_faults[["Fault"]].to_numpy(dtype=str)
     m_step = 5  # outstep from fault
     decimate_near = 50
     xi = []
@@ -2431,8 +2575,18 @@ def process_fault_throw_and_near_faults_from_grid(
         crs=map_data.working_projection,
         geometry=rgeomList,
     )
-    lcodeList = gpd.sjoin(lgdf, geology, how="left", predicate="within")
-    rcodeList = gpd.sjoin(rgdf, geology, how="left", predicate="within")
+    geology_grid = map_data.get_geology_grid()
+    lcodeList = geology_grid.sjoin(lgdf)
+    rcodeList = geology_grid.sjoin(rgdf)
+    # and look up the heights of all the offset points in one pass each
+    lcodeList["HEIGHT"] = dtm_sampler.values(
+        np.column_stack([lcodeList.geometry.x, lcodeList.geometry.y]),
+        workflow["cover_map"],
+    )
+    rcodeList["HEIGHT"] = dtm_sampler.values(
+        np.column_stack([rcodeList.geometry.x, rcodeList.geometry.y]),
+        workflow["cover_map"],
+    )
 
     for _, fault in local_faults.iterrows():
         lcode = lcodeList[lcodeList["FaultIds"] == fault["GEOMETRY_OBJECT_ID"]]
@@ -2446,14 +2600,7 @@ def process_fault_throw_and_near_faults_from_grid(
                     if (not config.c_l["sill"] in indl["DESCRIPTION"]) or (
                         not config.c_l["intrusive"] in indl["ROCKTYPE1"]
                     ):
-                        locations = [(indl.geometry.x, indl.geometry.y)]
-                        last_height_l = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
-                        )
+                        last_height_l = indl["HEIGHT"]
                         if not indl["GROUP"] in lgroups:
                             ostr = "{},{},{},{}\n".format(
                                 indl.geometry.x,
@@ -2475,14 +2622,7 @@ def process_fault_throw_and_near_faults_from_grid(
                     not config.c_l["intrusive"] in indr["ROCKTYPE1"]
                 ):
                     if ind % decimate_near == 0 or ind == len(rcode) - 1:
-                        locations = [(indr.geometry.x, indr.geometry.y)]
-                        last_height_r = m2l_utils.value_from_dtm_dtb(
-                            dtm,
-                            map_data.dtb,
-                            map_data.dtb_null,
-                            workflow["cover_map"],
-                            locations,
-                        )
+                        last_height_r = indr["HEIGHT"]
                         if not indr["GROUP"] in rgroups:
                             ostr = "{},{},{},{}\n".format(
                                 indr.geometry.x,
@@ -2525,6 +2665,7 @@ def process_fault_throw_and_near_faults_from_grid(
                             # )
                         lastlx = indl.geometry.x
                         lastly = indl.geometry.y
+                        lastl_height = indl["HEIGHT"]
                         # lastlc = (
                         #     indl["UNIT_NAME"]
                         #     .replace(" ", "_")
@@ -2558,18 +2699,10 @@ def process_fault_throw_and_near_faults_from_grid(
                                 ]
                             )
                             lastlcode = indl["UNIT_NAME"]
-                            locations = [(lastlx, lastly)]
-                            last_height_l = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
                             ostr = "{},{},{},{}\n".format(
                                 lastlx,
                                 lastly,
-                                last_height_l,
+                                lastl_height,
                                 indl["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
                             )
                             fftc.write(ostr)
@@ -2603,6 +2736,7 @@ def process_fault_throw_and_near_faults_from_grid(
                             # )
                         lastrx = indr.geometry.x
                         lastry = indr.geometry.y
+                        lastr_height = indr["HEIGHT"]
                         # lastrc = indr["UNIT_NAME"].replace(" ", "_").replace("-", "_")
 
                     if lastrcode == "" and (
@@ -2634,18 +2768,10 @@ def process_fault_throw_and_near_faults_from_grid(
                                 ]
                             )
                             lastrcode = indr["UNIT_NAME"]
-                            locations = [(lastrx, lastry)]
-                            last_height_r = m2l_utils.value_from_dtm_dtb(
-                                dtm,
-                                map_data.dtb,
-                                map_data.dtb_null,
-                                workflow["cover_map"],
-                                locations,
-                            )
                             ostr = "{},{},{},{}\n".format(
                                 lastrx,
                                 lastry,
-                                last_height_r,
+                                lastr_height,
                                 indr["UNIT_NAME"].replace(" ", "_").replace("-", "_"),
                             )
                             fftc.write(ostr)
@@ -3086,14 +3212,10 @@ def process_fault_throw_and_near_faults_from_grid(
             #     ##############################################################################################
 
     fftc.close()
-    fault_dim = pd.read_csv(
-        os.path.join(config.output_path, "fault_dimensions.csv"), sep=","
-    )
+    fault_dim = map_data.artifacts.get("fault_dimensions")
     fault_dim.set_index("Fault", inplace=True)
 
-    fault_orien = pd.read_csv(
-        os.path.join(config.output_path, "fault_orientations.csv"), sep=","
-    )
+    fault_orien = map_data.artifacts.get("fault_orientations")
     fault_orien = fault_orien.drop_duplicates(subset=["formation"])
     fault_orien.set_index("formation", inplace=True)
     f = open(os.path.join(config.output_path, "fault_displacements3.csv"), "w")
@@ -3179,9 +3301,7 @@ def process_fault_throw_and_near_faults_from_grid(
     # when no fault displacment data are available, set to 1m displacment so they still are calculated
 
     if local_faults is not None:
-        fault_ori = pd.read_csv(
-            os.path.join(config.output_path, "fault_orientations.csv")
-        )
+        fault_ori = map_data.artifacts.get("fault_orientations")
         fault_disp = pd.read_csv(
             os.path.join(config.output_path, "fault_displacements3.csv")
         )
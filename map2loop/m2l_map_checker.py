@@ -1,6 +1,6 @@
 import os
 import geopandas as gpd
-from shapely.geometry import LineString, Polygon, MultiLineString
+from shapely.geometry import LineString, Polygon
 import warnings
 import numpy as np
 import pandas as pd
@@ -14,31 +14,37 @@ from .config import Config
 
 # explodes polylines and modifies objectid for exploded parts
 def explode_polylines(indf, c_l, dst_crs):
-    outdf = gpd.GeoDataFrame(columns=indf.columns, crs=dst_crs)
-    for idx, row in indf.iterrows():
-        if type(row.geometry) == LineString:
-            rowdf = gpd.GeoDataFrame(data=dict(row), index=[0], crs=dst_crs)
-            outdf = pd.concat([outdf, rowdf], ignore_index=True)
-        if type(row.geometry) == MultiLineString:
-            multdf = gpd.GeoDataFrame(columns=indf.columns, crs=dst_crs)
-            recs = len(row.geometry.geoms)
-            row_dict = dict(row)
-            row_dict.pop("geometry")
-            rowdf = gpd.GeoDataFrame(data=row_dict, index=[0])
-            multdf = pd.concat([multdf, *[rowdf] * recs], ignore_index=True)
-            i = 0
-            for geom in range(recs):
-                multdf.loc[geom, "geometry"] = row.geometry.geoms[geom]
-                multdf.loc[geom, c_l["o"]] = (
-                    str(multdf.loc[geom, c_l["o"]]) + "_" + str(i)
-                )
-                print(
-                    "map2loop warning: Fault_" + multdf.loc[geom, c_l["o"]],
-                    "is one of a set of duplicates, so renumbering",
-                )
-                i = i + 1
-            multdf.set_crs(crs=dst_crs, inplace=True)
-            outdf = pd.concat([outdf, multdf], ignore_index=True)
+    geom_type = indf.geometry.geom_type.to_numpy()
+    is_multi = (geom_type == "MultiLineString") & ~indf.geometry.is_empty.to_numpy()
+    keep = (geom_type == "LineString") | is_multi
+    lines = indf[keep].reset_index(drop=True)
+    is_multi = is_multi[keep]
+
+    outdf = lines.explode(index_parts=True)
+    source_row = outdf.index.get_level_values(0).to_numpy()
+    part = outdf.index.get_level_values(1).to_numpy()
+    multi_part = is_multi[source_row]
+    outdf = outdf.reset_index(drop=True)
+
+    # parts of multi lines get their original id suffixed with the part number
+    if c_l["o"] in outdf.columns and multi_part.any():
+        ids = outdf[c_l["o"]].to_numpy(dtype=object)
+        suffixed = (
+            outdf[c_l["o"]].astype(str).to_numpy(dtype=object)
+            + "_"
+            + part.astype(str).astype(object)
+        )
+        outdf[c_l["o"]] = np.where(multi_part, suffixed, ids)
+    if multi_part.any():
+        print(
+            "map2loop warning:",
+            int(is_multi.sum()),
+            "multi-part polylines were split into",
+            int(multi_part.sum()),
+            "parts which are renumbered as <id>_<part>",
+        )
+    if dst_crs is not None:
+        outdf = outdf.set_crs(dst_crs, allow_override=True)
     return outdf
 
 
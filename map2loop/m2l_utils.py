@@ -3,12 +3,17 @@ import geopandas as gpd
 import pandas as pd
 from map2loop.m2l_enums import VerboseLevel
 from map2loop.m2l_enums import Datatype
+from .profiler import timer_decorator, count_items
+import shapely
 from shapely.geometry.polygon import Polygon
 from shapely.geometry.multipolygon import MultiPolygon
 import numpy as np
 import rasterio
 import rasterio.warp
 import rasterio.mask
+import rasterio.merge
+import rasterio.vrt
+import rasterio.windows
 import fiona
 import re
 import os
@@ -25,12 +30,13 @@ from math import (
     acos,
     fmod,
     fabs,
-    floor,
 )
 from owslib.wcs import WebCoverageService
 import netCDF4
 import time
-import functools
+import collections
+import concurrent.futures
+import threading
 import beartype
 
 ############################################
@@ -70,6 +76,23 @@ def bilinear_interpolation(x, y, z01, z11, z00, z10):
     )
 
 
+############################################
+# geopandas.sjoin recorded by the profiler
+#
+# sjoin(left,right,**kwargs)
+# Args:
+# left, right and keyword arguments as for geopandas.sjoin
+#
+# Used for the point in polygon joins inside the processing loops so their cost shows in Project.profile.
+############################################
+
+
+@timer_decorator
+def sjoin(left, right, **kwargs):
+    count_items("points", len(left))
+    return gpd.sjoin(left, right, **kwargs)
+
+
 #################################
 #  Maybe use https://portal.opentopography.org/otr/getdem?demtype=SRTMGL3&west=-120.168457&south=36.738884&east=-118.465576&north=38.091337&outputFormat=GTiff as univeral solution?
 # or SRTMGL1 for higher res probs not needed
@@ -87,127 +110,324 @@ def bilinear_interpolation(x, y, z01, z11, z00, z10):
 # locations list of x,y locations in same coordinate system for which values will be calculated Returns:
 # list of values for specified lcoations
 #
-# Given rasterio georeferenced grid of dtm and maybe dtb, return value at list of locations stored in x1,y1 using same projection. From...
+# Given rasterio georeferenced grid of dtm and maybe dtb, return value at list of locations stored in x1,y1 using same projection.
+# Kept for older callers, each call reads the full band so use DtmSampler when sampling more than a handful of points.
 ############################################
 
 
+@timer_decorator
 def value_from_dtm_dtb(dtm, dtb, dtb_null, cover_map, locations):
-    dtm_arr = dtm.read(1)
-    bounds = dtm.bounds
-    minlong = bounds.left
-    minlat = bounds.bottom
-    maxlong = bounds.right
-    maxlat = bounds.top
-    xscale = (maxlong - minlong) / dtm_arr.shape[1]
-    yscale = (maxlat - minlat) / dtm_arr.shape[0]
-    corners = np.zeros((4, 4))
-    zvals = np.zeros((4))
-    corners[0][0] = (
-        minlong
-        + (floor((locations[0][0] - minlong - (xscale / 2)) / xscale) * xscale)
-        + (xscale / 2)
-    )
-    corners[0][1] = (
-        minlat
-        + (floor((locations[0][1] - minlat - (yscale / 2)) / yscale) * yscale)
-        + (yscale / 2)
-    )
-    corners[1][0] = corners[0][0] + xscale
-    corners[1][1] = corners[0][1]
-    corners[2][0] = corners[0][0]
-    corners[2][1] = corners[0][1] + yscale
-    corners[3][0] = corners[0][0] + xscale
-    corners[3][1] = corners[0][1] + yscale
-    delx = (locations[0][0] - corners[0][0]) / xscale
-    dely = (locations[0][1] - corners[0][1]) / yscale
-
-    for i in range(4):
-        corner = [(corners[i][0], corners[i][1])]
-        # print(corner[0][0],dtm.bounds[0],dtm.bounds[2],corner[0][1],dtm.bounds[1],dtm.bounds[3])
-        if (
-            corner[0][0] > dtm.bounds[0]
-            and corner[0][0] < dtm.bounds[2]
-            and corner[0][1] > dtm.bounds[1]
-            and corner[0][1] < dtm.bounds[3]
-        ):
-            for val in dtm.sample(corner):
-                zvals[i] = float(str(val).replace("[", "").replace("]", ""))
-        else:
-            return -999
-    value_dtm = bilinear_interpolation(
-        delx, dely, zvals[2], zvals[3], zvals[0], zvals[1]
-    )
+    return DtmSampler(dtm, dtb, dtb_null).value(locations, cover_map)
+
 
-    if cover_map:
-        if (
-            locations[0][0] > dtm.bounds[0]
-            and locations[0][0] < dtm.bounds[2]
-            and locations[0][1] > dtm.bounds[1]
-            and locations[0][1] < dtm.bounds[3]
-            and locations[0][0] > dtb.bounds[0]
-            and locations[0][0] < dtb.bounds[2]
-            and locations[0][1] > dtb.bounds[1]
-            and locations[0][1] < dtb.bounds[3]
-        ):
-            dtb_arr = dtb.read(1)
-            bounds = dtb.bounds
-            minlong = bounds.left
-            minlat = bounds.bottom
-            maxlong = bounds.right
-            maxlat = bounds.top
-            xscale = (maxlong - minlong) / dtb_arr.shape[1]
-            yscale = (maxlat - minlat) / dtb_arr.shape[0]
-            corners = np.zeros((4, 4))
-            zvals = np.zeros((4))
-            corners[0][0] = (
-                minlong
-                + (floor((locations[0][0] - minlong - (xscale / 2)) / xscale) * xscale)
-                + (xscale / 2)
+############################################
+# batched bilinear height lookup on a dtm grid, optionally less depth to basement
+#
+# DtmSampler(dtm,dtb,dtb_null)
+# Args:
+# dtm rasterio format georeferenced dtm grid
+# dtb rasterio format georeferenced dtb grid (or anything without a read method if there is no dtb)
+# dtb_null value when zero cover thickness
+#
+# The dtm band is read once and kept in memory along with its transform, heights() then evaluates
+# the same corner/bilinear scheme as value_from_dtm_dtb for an Nx2 array of x,y locations in one pass.
+# Locations whose interpolation cell is not strictly inside the grid get -999. values() gives the
+# same per location results as value() (str height or -999) for callers that write them out as text,
+# values_per_geometry() the same for every vertex of a list of geometries, split back per geometry.
+############################################
+
+
+class DtmSampler:
+    nodata = -999
+
+    def __init__(self, dtm, dtb=None, dtb_null=0):
+        self.dtm_arr = dtm.read(1)
+        self.shape = self.dtm_arr.shape
+        self.bounds = tuple(dtm.bounds)
+        self.transform = dtm.transform
+        self.dtb = dtb
+        self.dtb_null = dtb_null
+        self._dtb_arr = None
+        self._dtb_bounds = None
+        self._lock = threading.Lock()
+
+    def _load_dtb(self):
+        with self._lock:
+            if self._dtb_arr is None:
+                if not hasattr(self.dtb, "read"):
+                    raise NameError(
+                        "map2loop error: cover_map requested but no depth to basement grid is loaded"
+                    )
+                self._dtb_arr = self.dtb.read(1)
+                self._dtb_bounds = tuple(self.dtb.bounds)
+            return self._dtb_arr, self._dtb_bounds
+
+    def _dtm_values(self, rows, cols):
+        return self.dtm_arr[rows, cols]
+
+    @staticmethod
+    def _inside(bounds, x, y):
+        return (x > bounds[0]) & (x < bounds[2]) & (y > bounds[1]) & (y < bounds[3])
+
+    @staticmethod
+    def _as_sampled(z):
+        # the per point lookup read each corner back with float(str(sample)) where sample was
+        # the one element array rasterio returned, so heights were built from the printed value
+        # (shortest repr, at most 8 decimals) rather than the raster value widened to float64
+        z = np.asarray(z)
+        values = z.astype(np.float64)
+        if z.dtype.kind != "f":
+            return values
+        # whole numbers, nan and inf print exactly
+        done = ~np.isfinite(z) | ((z == np.trunc(z)) & (np.abs(values) < 2**53))
+        if z.dtype.itemsize <= 4:
+            # float32 has at most 9 significant digits so from 1 up its shortest repr never
+            # needs more than 8 decimals, and astype(str) gives that repr for the whole array
+            short = ~done & (np.abs(z) >= 1)
+            values[short] = z[short].astype(str).astype(np.float64)
+            done |= short
+        if not done.all():
+            unique, inverse = np.unique(z[~done], return_inverse=True)
+            printed = np.array(
+                [float(str(unique[i : i + 1]).strip("[]")) for i in range(len(unique))]
             )
-            corners[0][1] = (
-                minlat
-                + (floor((locations[0][1] - minlat - (yscale / 2)) / yscale) * yscale)
-                + (yscale / 2)
+            values[~done] = printed[inverse.reshape(-1)]
+        return values
+
+    @staticmethod
+    def _bilinear(lookup, shape, bounds, x, y, null_below=None):
+        nrows, ncols = shape
+        minx, miny, maxx, maxy = bounds
+        xscale = (maxx - minx) / ncols
+        yscale = (maxy - miny) / nrows
+        col = np.floor((x - minx - (xscale / 2)) / xscale)
+        row = np.floor((y - miny - (yscale / 2)) / yscale)
+        corner_x = minx + (col * xscale) + (xscale / 2)
+        corner_y = miny + (row * yscale) + (yscale / 2)
+        # all four corners of the cell must be strictly inside the grid
+        valid = (
+            (corner_x > minx)
+            & (corner_x + xscale < maxx)
+            & (corner_y > miny)
+            & (corner_y + yscale < maxy)
+        )
+        col = np.where(valid, col, 0).astype(np.int64)
+        # cell rows count up from the bottom edge, raster rows count down from the top
+        top = np.where(valid, nrows - 1 - row, 1).astype(np.int64)
+        z00 = DtmSampler._as_sampled(lookup(top, col))
+        z10 = DtmSampler._as_sampled(lookup(top, col + 1))
+        z01 = DtmSampler._as_sampled(lookup(top - 1, col))
+        z11 = DtmSampler._as_sampled(lookup(top - 1, col + 1))
+        delx = (x - corner_x) / xscale
+        dely = (y - corner_y) / yscale
+        values = bilinear_interpolation(delx, dely, z01, z11, z00, z10)
+        if null_below is not None:
+            is_null = (
+                (z00 < null_below)
+                | (z10 < null_below)
+                | (z01 < null_below)
+                | (z11 < null_below)
             )
-            corners[1][0] = corners[0][0] + xscale
-            corners[1][1] = corners[0][1]
-            corners[2][0] = corners[0][0]
-            corners[2][1] = corners[0][1] + yscale
-            corners[3][0] = corners[0][0] + xscale
-            corners[3][1] = corners[0][1] + yscale
-            delx = (locations[0][0] - corners[0][0]) / xscale
-            dely = (locations[0][1] - corners[0][1]) / yscale
-
-            for i in range(4):
-                corner = [(corners[i][0], corners[i][1])]
-                # print(corner[0][0],dtm.bounds[0],dtm.bounds[2],corner[0][1],dtm.bounds[1],dtm.bounds[3])
-                if (
-                    corner[0][0] > dtb.bounds[0]
-                    and corner[0][0] < dtb.bounds[2]
-                    and corner[0][1] > dtb.bounds[1]
-                    and corner[0][1] < dtb.bounds[3]
-                ):
-                    for val in dtb.sample(corner):
-                        zvals[i] = float(str(val).replace("[", "").replace("]", ""))
-                else:
-                    return -999
-            if (
-                zvals[0] < -10000
-                or zvals[1] < -10000
-                or zvals[2] < -10000
-                or zvals[3] < -10000
-            ):
-                value_dtb = 0
-            else:
-                value_dtb = bilinear_interpolation(
-                    delx, dely, zvals[2], zvals[3], zvals[0], zvals[1]
-                )
-
-            return str(value_dtm - value_dtb)
+            values = np.where(is_null, 0.0, values)
+        return values, valid
+
+    @timer_decorator
+    def sample(self, xy, cover_map=False):
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        count_items("points", len(xy))
+        x = xy[:, 0]
+        y = xy[:, 1]
+        values, valid = self._bilinear(self._dtm_values, self.shape, self.bounds, x, y)
+        if cover_map:
+            dtb_arr, dtb_bounds = self._load_dtb()
+            dtb_values, dtb_valid = self._bilinear(
+                lambda rows, cols: dtb_arr[rows, cols],
+                dtb_arr.shape,
+                dtb_bounds,
+                x,
+                y,
+                null_below=-10000,
+            )
+            valid = (
+                valid
+                & dtb_valid
+                & self._inside(self.bounds, x, y)
+                & self._inside(dtb_bounds, x, y)
+            )
+            values = values - dtb_values
+        return values, valid
+
+    def heights(self, xy, cover_map=False):
+        values, valid = self.sample(xy, cover_map)
+        return np.where(valid, values, float(self.nodata))
+
+    def values(self, xy, cover_map=False):
+        values, valid = self.sample(xy, cover_map)
+        return [str(v) if ok else self.nodata for v, ok in zip(values, valid)]
+
+    def values_per_geometry(self, geometries, cover_map=False):
+        coords = [shapely.get_coordinates(geometry) for geometry in geometries]
+        if len(coords) == 0:
+            return []
+        values = self.values(np.concatenate(coords), cover_map)
+        ends = np.cumsum([len(c) for c in coords])
+        return [values[end - len(c) : end] for c, end in zip(coords, ends)]
+
+    def value(self, locations, cover_map=False):
+        values, valid = self.sample(locations[:1], cover_map)
+        if valid[0]:
+            return str(values[0])
         else:
-            return -999
-    else:
-        return str(value_dtm)
+            return self.nodata
+
+
+############################################
+# windowed, tile cached version of DtmSampler for dtms too large to hold in memory
+#
+# TiledDtmSampler(dtm,dtb,dtb_null,tile_size,cache_mb)
+# Args:
+# dtm open rasterio dataset, ideally an uncompressed tiled geotiff on disk (see DtmFile), kept open by the sampler
+# dtb rasterio format georeferenced dtb grid (or anything without a read method if there is no dtb)
+# dtb_null value when zero cover thickness
+# tile_size edge length in pixels of the square windows read from the dtm
+# cache_mb memory budget in MB for cached tiles, least recently used tiles are dropped first
+#
+# Only the tiles containing queried cells are read so sampling cost scales with the number and spread of
+# the points rather than the raster size. Heights are identical to DtmSampler. Tile reads and the tile
+# cache are serialised by a lock so one sampler can be shared between threads.
+############################################
+
+
+class TiledDtmSampler(DtmSampler):
+    def __init__(self, dtm, dtb=None, dtb_null=0, tile_size=512, cache_mb=256):
+        self.dataset = dtm
+        self.shape = (dtm.height, dtm.width)
+        self.bounds = tuple(dtm.bounds)
+        self.transform = dtm.transform
+        self.dtb = dtb
+        self.dtb_null = dtb_null
+        self._dtb_arr = None
+        self._dtb_bounds = None
+        self.tile_size = max(16, int(tile_size))
+        tile_bytes = self.tile_size * self.tile_size * np.dtype(dtm.dtypes[0]).itemsize
+        self.max_tiles = max(1, int(cache_mb * 1024 * 1024 / tile_bytes))
+        self.ntile_cols = -(-self.shape[1] // self.tile_size)
+        self._tiles = collections.OrderedDict()
+        self.tile_reads = 0
+        self._lock = threading.Lock()
+
+    @property
+    def dtm_arr(self):
+        # full band on request only, for code that genuinely needs the whole grid
+        with self._lock:
+            return self.dataset.read(1)
+
+    def _tile(self, key):
+        # stages sample from several threads, the one dataset handle and the
+        # LRU bookkeeping are only touched under the lock
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+            row_off = (key // self.ntile_cols) * self.tile_size
+            col_off = (key % self.ntile_cols) * self.tile_size
+            window = rasterio.windows.Window(
+                col_off,
+                row_off,
+                min(self.tile_size, self.shape[1] - col_off),
+                min(self.tile_size, self.shape[0] - row_off),
+            )
+            tile = self.dataset.read(1, window=window)
+            self.tile_reads += 1
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+            return tile
+
+    def _dtm_values(self, rows, cols):
+        # keep the raster dtype, _bilinear converts the corners the same way as DtmSampler
+        values = np.empty(len(rows), dtype=self.dataset.dtypes[0])
+        keys = (rows // self.tile_size) * self.ntile_cols + (cols // self.tile_size)
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for key, start, end in zip(unique_keys, starts, ends):
+            sel = order[start:end]
+            tile = self._tile(int(key))
+            values[sel] = tile[
+                rows[sel] % self.tile_size, cols[sel] % self.tile_size
+            ]
+        return values
+
+    def close(self):
+        with self._lock:
+            self._tiles.clear()
+            self.dataset.close()
+
+
+############################################
+# on disk stand in for rasterio.io.MemoryFile so a dtm written to a geotiff can be passed around the same way
+#
+# DtmFile(path)
+# Args:
+# path path to the geotiff
+############################################
+
+
+class DtmFile:
+    def __init__(self, path):
+        self.name = path
+
+    def open(self):
+        return rasterio.open(self.name)
+
+    def close(self):
+        pass
+
+
+############################################
+# copy a rasterio dataset (or window of one) into an uncompressed, internally tiled geotiff
+#
+# write_tiled_dtm(dataset,path_out,tile_size,window)
+# Args:
+# dataset open rasterio dataset, including rasterio.vrt.WarpedVRT
+# path_out path of geotiff to write
+# tile_size block size in pixels, rounded to a multiple of 16 as required by GTiff
+# window optional rasterio window of dataset to copy, whole dataset if None
+#
+# Copies block by block so the full raster is never held in memory. Returns a DtmFile.
+############################################
+
+
+def write_tiled_dtm(dataset, path_out, tile_size=512, window=None):
+    tile_size = max(16, (int(tile_size) // 16) * 16)
+    if window is None:
+        window = rasterio.windows.Window(0, 0, dataset.width, dataset.height)
+    params = dataset.meta.copy()
+    params.update(
+        {
+            "driver": "GTiff",
+            "count": 1,
+            "width": int(window.width),
+            "height": int(window.height),
+            "transform": dataset.window_transform(window),
+            "tiled": True,
+            "blockxsize": tile_size,
+            "blockysize": tile_size,
+        }
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path_out)), exist_ok=True)
+    with rasterio.open(path_out, "w", **params) as dst:
+        for _, block in dst.block_windows(1):
+            src_window = rasterio.windows.Window(
+                window.col_off + block.col_off,
+                window.row_off + block.row_off,
+                block.width,
+                block.height,
+            )
+            dst.write(dataset.read(1, window=src_window), 1, window=block)
+    return DtmFile(path_out)
 
 
 ############################################
@@ -472,8 +692,121 @@ def reproject_dtm(path_in, path_out, src_crs, dst_crs):
     print("reprojected dtm geotif saved as", path_out)
 
 
+############################################
+# fetch a dtm from a WCS server as a mosaic of concurrently downloaded tiles
+#
+# fetch_wcs_dtm(url,bbox,width,height,tile_px,max_workers,retries,backoff,verbose)
+# Args:
+# url WCS server url
+# bbox (minlong,minlat,maxlong,maxlat) of region of interest in EPSG:4326
+# width,height total size in pixels of the requested coverage
+# tile_px max width and height in pixels of each tile request
+# max_workers number of tiles downloaded at the same time
+# retries number of attempts per tile before giving up
+# backoff seconds to wait after the first failed attempt of a tile, doubled after each further failure
+#
+# Splits the bbox into a grid of tiles with a common pixel size, downloads them with a thread pool, each tile
+# retrying on its own so one failure only costs that tile, then mosaics them with rasterio.merge.
+# Returns a rasterio MemoryFile of the mosaic.
+############################################
+
+
+def fetch_wcs_dtm(
+    url,
+    bbox,
+    width,
+    height,
+    tile_px=512,
+    max_workers=4,
+    retries=4,
+    backoff=1.0,
+    verbose=False,
+):
+    def with_retries(request, label):
+        for attempt in range(retries):
+            try:
+                return request()
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                if verbose:
+                    print("retrying", label, "after", e)
+                time.sleep(backoff * (2**attempt))
+
+    wcs = with_retries(
+        lambda: WebCoverageService(url, version="1.0.0"), "WCS capabilities"
+    )
+    tile_px = max(1, int(tile_px))
+    ntiles_x = max(1, -(-int(width) // tile_px))
+    ntiles_y = max(1, -(-int(height) // tile_px))
+    tile_width = -(-int(width) // ntiles_x)
+    tile_height = -(-int(height) // ntiles_y)
+    xstep = (bbox[2] - bbox[0]) / ntiles_x
+    ystep = (bbox[3] - bbox[1]) / ntiles_y
+
+    def fetch_tile(i, j):
+        tile_bbox = (
+            bbox[0] + (i * xstep),
+            bbox[1] + (j * ystep),
+            bbox[0] + ((i + 1) * xstep),
+            bbox[1] + ((j + 1) * ystep),
+        )
+        cvg = with_retries(
+            lambda: wcs.getCoverage(
+                identifier="1",
+                bbox=tile_bbox,
+                format="GeoTIFF",
+                crs=4326,
+                width=tile_width,
+                height=tile_height,
+            ).read(),
+            "dtm tile {},{}".format(i, j),
+        )
+        return rasterio.io.MemoryFile(cvg)
+
+    if verbose:
+        print("fetching dtm as", ntiles_x * ntiles_y, "tiles")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(fetch_tile, i, j)
+            for j in range(ntiles_y)
+            for i in range(ntiles_x)
+        ]
+        tiles = [future.result() for future in futures]
+
+    datasets = [tile.open() for tile in tiles]
+    try:
+        mosaic, mosaic_transform = rasterio.merge.merge(datasets)
+        params = datasets[0].meta.copy()
+        params.update(
+            {
+                "driver": "GTiff",
+                "height": mosaic.shape[1],
+                "width": mosaic.shape[2],
+                "transform": mosaic_transform,
+            }
+        )
+    finally:
+        for dataset in datasets:
+            dataset.close()
+        for tile in tiles:
+            tile.close()
+    memfile = rasterio.io.MemoryFile()
+    with memfile.open(**params) as dst:
+        dst.write(mosaic)
+    return memfile
+
+
 def load_and_reproject_dtm(
-    polygon, dst_crs, dtm_crs="EPSG:4326", url="AU", verbose=False
+    polygon,
+    dst_crs,
+    dtm_crs="EPSG:4326",
+    url="AU",
+    verbose=False,
+    dst_path=None,
+    tile_size=512,
+    wcs_tile_px=512,
+    wcs_workers=4,
 ):
     local_file = False
     if url == "AU":
@@ -489,16 +822,15 @@ def load_and_reproject_dtm(
         spacing = 30
         width = min(int((tb_en[2] - tb_en[0]) / spacing), 2048)
         height = min(int((tb_en[3] - tb_en[1]) / spacing), 2048)
-        wcs = WebCoverageService(url, version="1.0.0")
-        cvg = wcs.getCoverage(
-            identifier="1",
-            bbox=tb_ll,
-            format="GeoTIFF",
-            crs=4326,
-            width=width,
-            height=height,
+        memfile = fetch_wcs_dtm(
+            url,
+            tb_ll,
+            width,
+            height,
+            tile_px=wcs_tile_px,
+            max_workers=wcs_workers,
+            verbose=verbose,
         )
-        memfile = rasterio.io.MemoryFile(cvg.read())
         dataset = memfile.open()
     elif url.startswith("http") and "hawaii" in url.lower():
         # Load global hawaii dataset
@@ -560,6 +892,28 @@ def load_and_reproject_dtm(
     new_transform, new_width, new_height = rasterio.warp.calculate_default_transform(
         dataset.crs, dst_crs, dataset.width, dataset.height, *dataset.bounds
     )
+    if dst_path is not None:
+        # Warp block by block straight into a tiled geotiff on disk
+        with rasterio.vrt.WarpedVRT(
+            dataset,
+            crs=dst_crs,
+            transform=new_transform,
+            width=new_width,
+            height=new_height,
+            nodata=0,
+        ) as vrt:
+            window = None
+            if local_file:
+                window = (
+                    vrt.window(*polygon.geometry.total_bounds)
+                    .intersection(rasterio.windows.Window(0, 0, vrt.width, vrt.height))
+                    .round_offsets()
+                    .round_lengths()
+                )
+            tiled_dtm = write_tiled_dtm(vrt, dst_path, tile_size, window)
+        dataset.close()
+        return tiled_dtm
+
     params = dataset.meta.copy()
     params.update(
         {
@@ -986,6 +1340,49 @@ def pts2dircos(p1x, p1y, p2x, p2y):
     return (l, m)
 
 
+####################################################
+# array versions of ddd2dircos, dircos2ddd and pts2dircos
+#
+# ddd2dircos_arr(dip,dipdir)
+# dircos2ddd_arr(l,m,n)
+# pts2dircos_arr(p1x,p1y,p2x,p2y)
+# Args:
+# as for the scalar versions but arrays (or anything numpy can broadcast)
+# Returns:
+# the same values as the scalar versions element by element, as arrays
+#
+# Built from numpy ufuncs so thousands of orientations are converted in one call instead of a python loop
+####################################################
+
+
+def ddd2dircos_arr(dip, dipdir):
+    dip = np.radians(90 - np.asarray(dip, dtype=float))
+    dipdir = np.radians(np.asarray(dipdir, dtype=float))
+    l = np.sin(dipdir) * np.cos(dip)
+    m = np.cos(dipdir) * np.cos(dip)
+    n = np.sin(dip)
+    return (l, m, n)
+
+
+def dircos2ddd_arr(l, m, n):
+    dipdir = np.degrees(np.arctan2(l, m)) % 360
+    dip = 90 - np.degrees(np.arcsin(n))
+    overturned = dip > 90
+    dip = np.where(overturned, 180 - dip, dip)
+    dipdir = np.where(overturned, dipdir + 180, dipdir) % 360
+    return (dip, dipdir)
+
+
+def pts2dircos_arr(p1x, p1y, p2x, p2y):
+    dlsx = np.asarray(p1x, dtype=float) - p2x
+    dlsy = np.asarray(p1y, dtype=float) - p2y
+    length = np.sqrt((dlsx * dlsx) + (dlsy * dlsy))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        l = np.where(length > 0, dlsx / length, 0)
+        m = np.where(length > 0, dlsy / length, 0)
+    return (l, m)
+
+
 ####################################################
 # calculate distance between two points
 # duplicated in m2l_geometry, don't know why!
@@ -1382,24 +1779,3 @@ def save_parameters(
     f.write("fault_params: " + str(fault_params) + "\n")
     f.write("foliation_params: " + str(foliation_params) + "\n")
     f.close()
-
-
-timer_decorator_enabled = False
-
-
-def timer_decorator(func):
-    @functools.wraps(func)
-    def decorator(*args, **kwargs):
-        print(f"Entering function {func.__name__}")
-        starttime = time.time()
-        func(*args, **kwargs)
-        runtime = time.time() - starttime
-        print(f"Function {func.__name__} took {runtime:.4f} seconds")
-
-    def clean(*args, **kwargs):
-        return func(*args, **kwargs)
-
-    if timer_decorator_enabled:
-        return decorator
-    else:
-        return clean
@@ -1,15 +1,21 @@
 from scipy.interpolate import RegularGridInterpolator
 import numpy as np
-import geopandas
-from shapely.geometry import Point
+from .geology_grid import GeologyGrid
 
 
 class MapUtil:
-    def __init__(self, bounding_box, geology=None, dtm=None):
-        """Wrapper for evaluating map data on xy points"""
+    def __init__(
+        self, bounding_box, geology=None, dtm=None, geology_grid=None, resolution=50
+    ):
+        """Wrapper for evaluating map data on xy points, geology lookups go
+        through geology_grid (e.g. MapData.get_geology_grid()) or a GeologyGrid
+        built at resolution on first use
+        """
         self.bounding_box = bounding_box
         self.geology = geology
         self.dtm = dtm
+        self.geology_grid = geology_grid
+        self.resolution = resolution
 
     def evaluate_dtm_at_points(self, xy, nodataval=np.nan):
         """interpolate the dtm on new locations"""
@@ -33,13 +39,18 @@ class MapUtil:
         """Extract a numerical column from a shape file, default
         is colour index
         """
-        nodes = geopandas.GeoDataFrame(
-            xy[:, :1], geometry=[Point(xy) for xy in zip(xy[:, 0], xy[:, 1])]
-        )
-        points_geology = geopandas.sjoin(
-            nodes, self.geology, how="left", predicate="within"
-        )
-        return points_geology[column].to_numpy()
+        if self.geology_grid is None:
+            self.geology_grid = GeologyGrid(
+                self.geology,
+                (
+                    self.bounding_box["minx"],
+                    self.bounding_box["miny"],
+                    self.bounding_box["maxx"],
+                    self.bounding_box["maxy"],
+                ),
+                self.resolution,
+            )
+        return self.geology_grid.values(xy[:, :2], column)
 
     def _is_inside(self, xy):
         """Check whether inside bounding box, not used"""
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import warnings
+
+import geopandas
+
+
+class MapDataCache:
+    """
+    An on disk GeoParquet cache of loaded, reprojected, clipped and checked map data
+
+    Each COMPLETE GeoDataFrame is stored under a hash of the source file (path,
+    size and modification time), the bounding polygon, the working projection,
+    config.c_l and the ignore_codes run flag, i.e. everything the load state
+    machine in MapData.load_map_data depends on. The c_l entries as left by the
+    map checkers are stored alongside so a warm start leaves config.c_l in the
+    same state as a cold one.
+
+    Attributes
+    ----------
+    cache_dir: str
+        The directory holding the parquet files and their json sidecars
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        filename: str, datatype, polygon, working_projection, c_l, ignore_codes
+    ):
+        """
+        Build the cache key of a datatype
+
+        Args:
+            filename (str): The source file of the datatype
+            datatype (Datatype): The datatype
+            polygon (geopandas.GeoDataFrame): The bounding polygon the data is clipped to
+            working_projection (str): The crs the data is reprojected into
+            c_l (dict): The codes and labels dictionary used by the map checkers
+            ignore_codes (list): The ignore_codes run flag
+
+        Returns:
+            str or None: hex digest of the inputs or None if the source can't be cached
+        """
+        if filename is None or not os.path.isfile(filename):
+            return None
+        stat = os.stat(filename)
+        params = {
+            "filename": os.path.abspath(filename),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "datatype": datatype.name,
+            "polygon": None if polygon is None else polygon.unary_union.wkt,
+            "working_projection": str(working_projection),
+            "c_l": c_l,
+            "ignore_codes": ignore_codes,
+        }
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _parquet(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".parquet")
+
+    def _sidecar(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def load(self, key: str):
+        """
+        Load a cached datatype
+
+        Args:
+            key (str): The key from make_key
+
+        Returns:
+            tuple: (geopandas.GeoDataFrame, dict of c_l entries) or (None, None) on a miss
+        """
+        if key is None or not os.path.isfile(self._parquet(key)):
+            return None, None
+        try:
+            data = geopandas.read_parquet(self._parquet(key))
+            c_l = {}
+            if os.path.isfile(self._sidecar(key)):
+                with open(self._sidecar(key), "r") as f:
+                    c_l = json.load(f)["c_l"]
+            return data, c_l
+        except Exception as e:
+            warnings.warn(f"Could not read cached map data {key}: {e}\n")
+            return None, None
+
+    def save(self, key: str, data: geopandas.GeoDataFrame, c_l: dict):
+        """
+        Store a COMPLETE datatype
+
+        Args:
+            key (str): The key from make_key
+            data (geopandas.GeoDataFrame): The checked map data
+            c_l (dict): The codes and labels dictionary after checking
+        """
+        if key is None:
+            return
+        try:
+            tmp_filename = self._parquet(key) + ".{}.part".format(os.getpid())
+            data.to_parquet(tmp_filename)
+            os.replace(tmp_filename, self._parquet(key))
+            with open(self._sidecar(key), "w") as f:
+                json.dump({"c_l": c_l}, f, default=str)
+        except Exception as e:
+            warnings.warn(f"Could not cache map data {key}: {e}\n")
+
+    def clear(self):
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".parquet") or filename.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, filename))
@@ -1,5 +1,6 @@
 import geopandas
 import rasterio
+import rasterio.warp
 import fiona
 from .config import Config
 import beartype
@@ -8,7 +9,13 @@ from . import m2l_map_checker
 from .m2l_enums import Datatype, Datastate, VerboseLevel
 import warnings
 from . import m2l_utils, m2l_geometry, m2l_interpolation
+from .dtm_cache import DtmCache
+from .map_cache import MapDataCache
+from .geology_grid import GeologyGrid
+from .artifacts import ArtifactStore
 import time
+import concurrent.futures
+import threading
 import matplotlib.pyplot as plt
 import numpy
 import sys
@@ -32,6 +39,8 @@ class MapData:
         A string containing the projection e.g. "EPSG:28350"
     config: Config
         A link to the config structure which is defined in config.py
+    artifacts: ArtifactStore
+        The in memory store of intermediate results passed between processing steps
     """
 
     def __init__(self):
@@ -52,6 +61,10 @@ class MapData:
         self.dip_grid = None
         self.dip_dir_grid = None
         self.polarity_grid = None
+        self.dtm_sampler = None
+        self.dtm_sampler_lock = threading.RLock()
+        self.geology_grid = None
+        self.artifacts = ArtifactStore()
 
     def set_working_projection(self, projection):
         """
@@ -78,6 +91,7 @@ class MapData:
             config (Config) : The configuration structure for the map data
         """
         self.config = config
+        self.artifacts.config = config
 
     @beartype.beartype
     def set_filename(self, datatype: Datatype, filename: str):
@@ -128,6 +142,15 @@ class MapData:
         """
         Function to load all the map data for each datatype.  Cycles through each type and loads it
 
+        With the "load_workers" run flag above 1 the vector datatypes, the DTB grid and the
+        DTM fetch are loaded concurrently on a thread pool. Each job only touches the
+        data, data_states and dirtyflags entries of its own datatype so the state
+        machine in load_map_data behaves exactly as in the sequential case. Each
+        vector job gets its own copy of config.c_l, as the map checkers rename
+        entries in it, and the renames are merged back in datatype order once all
+        the jobs have finished so the read filters and cache keys don't depend on
+        thread timing
+
         Args:
             config (Config, optional): The config structure to use for map data if not already specified. Defaults to None.
         """
@@ -135,28 +158,51 @@ class MapData:
             config = self.config
         else:
             self.config = config
-        print("Loading data frames  here in line 138")
-        for i in [
+            self.artifacts.config = config
+        vector_datatypes = [
             Datatype.GEOLOGY,
             Datatype.STRUCTURE,
             Datatype.FAULT,
             Datatype.FOLD,
             Datatype.MINERAL_DEPOSIT,
-        ]:
-            self.load_map_data(i)
-            print('line 147 in mapdata.py and self.load_map_data(i): ',self.load_map_data(i))
-        for i in [Datatype.DTB_GRID]:
-            self.load_rasterio_map_data(i)
-        self.load_dtm()
-        print("End Loading data frames here in line 151")
+        ]
+        workers = self.config.run_flags["load_workers"]
+        if workers <= 1:
+            for i in vector_datatypes:
+                self.load_map_data(i)
+            self.load_rasterio_map_data(Datatype.DTB_GRID)
+            self.load_dtm()
+            return
+
+        original_c_l = dict(self.config.c_l)
+        c_ls = {i: dict(original_c_l) for i in vector_datatypes}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            # start the dtm first as it is usually the slowest (network) job
+            futures = [pool.submit(self.load_dtm)]
+            futures += [
+                pool.submit(self.load_map_data, i, c_ls[i]) for i in vector_datatypes
+            ]
+            futures.append(pool.submit(self.load_rasterio_map_data, Datatype.DTB_GRID))
+            # re-raise the first failure (in submission order) once everything has finished
+            concurrent.futures.wait(futures)
+            for i in vector_datatypes:
+                for key, value in c_ls[i].items():
+                    if key not in original_c_l or original_c_l[key] != value:
+                        self.config.c_l[key] = value
+            for future in futures:
+                future.result()
+
     @beartype.beartype
-    def load_map_data(self, datatype: Datatype):
+    def load_map_data(self, datatype: Datatype, c_l=None):
         """
         Function to load map data from file, reproject and clip it and then check data is valid
 
         Args:
             datatype (Datatype): The datatype to load
+            c_l (dict, optional): The codes and labels dictionary to read, check and cache with. Defaults to config.c_l.
         """
+        if c_l is None:
+            c_l = self.config.c_l
         if (
             self.filenames[datatype] is None
             or self.data_states[datatype] == Datastate.UNNAMED
@@ -165,10 +211,20 @@ class MapData:
                 f"Datatype {datatype.name} is not set and so cannot be loaded\n"
             )
         elif self.dirtyflags[datatype] is True:
+            cache, cache_key = self.get_map_cache(datatype, c_l)
+            if self.data_states[datatype] == Datastate.UNLOADED and cache is not None:
+                # Warm start from a previously checked copy of this data
+                data, cached_c_l = cache.load(cache_key)
+                if data is not None:
+                    self.data[datatype] = data
+                    c_l.update(cached_c_l)
+                    self.data_states[datatype] = Datastate.COMPLETE
+                    self.dirtyflags[datatype] = False
+                    return
             if self.data_states[datatype] == Datastate.UNLOADED:
                 # Load data from file
                 try:
-                    self.data[datatype] = geopandas.read_file(self.filenames[datatype])
+                    self.data[datatype] = self.read_map_file(datatype, c_l)
                     self.data_states[datatype] = Datastate.LOADED
                 except Exception:
                     sys.stdout.flush()
@@ -194,12 +250,109 @@ class MapData:
                 self.data_states[datatype] = Datastate.CLIPPED
             if self.data_states[datatype] == Datastate.CLIPPED:
                 # Convert column names using codes_and_labels dictionary
-                self.check_map(datatype)
+                self.check_map(datatype, c_l)
                 self.data_states[datatype] = Datastate.CONVERTED
             if self.data_states[datatype] == Datastate.CONVERTED:
                 self.data_states[datatype] = Datastate.COMPLETE
+                if cache is not None:
+                    cache.save(cache_key, self.data[datatype], c_l)
             self.dirtyflags[datatype] = False
 
+    def get_map_cache(self, datatype: Datatype, c_l=None):
+        """
+        Getter for the GeoParquet map data cache set by the "map_cache_dir" run flag
+
+        Args:
+            datatype (Datatype): The datatype to look up
+            c_l (dict, optional): The codes and labels dictionary in the key. Defaults to config.c_l.
+
+        Returns:
+            tuple: (MapDataCache or None if caching is off, cache key for the datatype)
+        """
+        if self.config is None or self.config.run_flags["map_cache_dir"] == "":
+            return None, None
+        cache = MapDataCache(self.config.run_flags["map_cache_dir"])
+        cache_key = MapDataCache.make_key(
+            self.filenames[datatype],
+            datatype,
+            self.config.polygon,
+            self.working_projection,
+            self.config.c_l if c_l is None else c_l,
+            self.config.run_flags["ignore_codes"],
+        )
+        if cache_key is None:
+            return None, None
+        return cache, cache_key
+
+    def read_filters(self, datatype: Datatype, c_l=None):
+        """
+        Work out the read time filters for a local vector file so that only features
+        inside the bounding polygon and only the columns named in config.c_l are read
+
+        Args:
+            datatype (Datatype): The datatype to read
+            c_l (dict, optional): The codes and labels dictionary naming the columns. Defaults to config.c_l.
+
+        Returns:
+            tuple: (bbox in the crs of the file or None, list of columns to keep or None,
+                list of all columns in the file)
+        """
+        filename = self.filenames[datatype]
+        if filename.startswith("http") or self.config.polygon is None:
+            return None, None, []
+        try:
+            with fiona.open(filename) as src:
+                src_crs = src.crs_wkt or self.working_projection
+                fields = list(src.schema["properties"].keys())
+            bbox = rasterio.warp.transform_bounds(
+                self.config.polygon.crs,
+                src_crs,
+                *self.config.polygon.total_bounds,
+                densify_pts=21,
+            )
+        except Exception:
+            return None, None, []
+        if c_l is None:
+            c_l = self.config.c_l
+        wanted = set(v for v in c_l.values() if isinstance(v, str))
+        columns = [field for field in fields if field in wanted]
+        if len(columns) == 0:
+            columns = None
+        return bbox, columns, fields
+
+    def read_map_file(self, datatype: Datatype, c_l=None):
+        """
+        Read a vector datatype from file, pushing the bounding polygon (as a bbox in the
+        file's crs) and the config.c_l column selection down into the reader where the
+        engine supports it. geopandas.clip is still applied afterwards
+
+        Args:
+            datatype (Datatype): The datatype to read
+            c_l (dict, optional): The codes and labels dictionary naming the columns. Defaults to config.c_l.
+
+        Returns:
+            geopandas.GeoDataFrame: The features of the file intersecting the bbox
+        """
+        filename = self.filenames[datatype]
+        bbox, columns, fields = self.read_filters(datatype, c_l)
+        attempts = []
+        if bbox is not None:
+            if columns is not None:
+                ignore_fields = [field for field in fields if field not in columns]
+                # fiona engine, then pyogrio engine keyword for the column selection
+                attempts.append({"bbox": bbox, "ignore_fields": ignore_fields})
+                attempts.append({"bbox": bbox, "columns": columns})
+            attempts.append({"bbox": bbox})
+        for kwargs in attempts:
+            try:
+                return geopandas.read_file(filename, **kwargs)
+            except (TypeError, ValueError) as e:
+                # the installed engine does not take one of these keywords
+                warnings.warn(
+                    f"Reading {filename} without {', '.join(kwargs.keys())} pushdown: {e}"
+                )
+        return geopandas.read_file(filename)
+
     @beartype.beartype
     def load_rasterio_map_data(self, datatype: Datatype):
         """
@@ -244,19 +397,22 @@ class MapData:
             self.dirtyflags[datatype] = False
 
     @beartype.beartype
-    def check_map(self, datatype: Datatype):
+    def check_map(self, datatype: Datatype, c_l=None):
         """
         Function to check the validity of a map data from file
 
         Args:
             datatype (Datatype): The rasterio datatype to check
+            c_l (dict, optional): The codes and labels dictionary the checkers use and update. Defaults to config.c_l.
         """
+        if c_l is None:
+            c_l = self.config.c_l
         _warnings = []
         _errors = []
         if datatype == Datatype.GEOLOGY:
             self.data[Datatype.GEOLOGY] = m2l_map_checker.check_geology_map(
                 self.data[Datatype.GEOLOGY],
-                self.config.c_l,
+                c_l,
                 self.config.run_flags["ignore_codes"],
                 _warnings,
                 _errors,
@@ -266,7 +422,7 @@ class MapData:
         if datatype == Datatype.STRUCTURE:
             self.data[Datatype.STRUCTURE] = m2l_map_checker.check_structure_map(
                 self.data[Datatype.STRUCTURE],
-                self.config.c_l,
+                c_l,
                 _warnings,
                 _errors,
                 self.config.verbose_level,
@@ -274,7 +430,7 @@ class MapData:
         if datatype == Datatype.FAULT:
             self.data[Datatype.FAULT] = m2l_map_checker.check_fault_map(
                 self.data[Datatype.FAULT],
-                self.config.c_l,
+                c_l,
                 _warnings,
                 _errors,
                 self.config.verbose_level,
@@ -282,7 +438,7 @@ class MapData:
         if datatype == Datatype.FOLD:
             self.data[Datatype.FOLD] = m2l_map_checker.check_fold_map(
                 self.data[Datatype.FOLD],
-                self.config.c_l,
+                c_l,
                 _warnings,
                 _errors,
                 self.config.verbose_level,
@@ -290,7 +446,7 @@ class MapData:
         if datatype == Datatype.MINERAL_DEPOSIT:
             self.data[Datatype.MINERAL_DEPOSIT] = m2l_map_checker.check_mindep_map(
                 self.data[Datatype.MINERAL_DEPOSIT],
-                self.config.c_l,
+                c_l,
                 _warnings,
                 _errors,
                 self.config.verbose_level,
@@ -353,7 +509,9 @@ class MapData:
             try:
                 filename = os.path.join(output_dir, str(datatype.name + extension))
                 if extension == ".csv":
-                    self.data[datatype].write_csv(filename)
+                    self.data[datatype].to_csv(filename)
+                elif extension == ".parquet":
+                    self.data[datatype].to_parquet(filename)
                 else:
                     self.data[datatype].to_file(filename)
             except Exception:
@@ -565,37 +723,94 @@ class MapData:
         if source in ("WA", "NSW", "VIC", "SA", "QLD", "ACT", "TAS"):
             source = "AU"
 
-        success = False
-        num_attempts = 10
-        if source.startswith("http") or source == "AU":
-            i, done = 0, False
-            while not done:
-                if i >= num_attempts:
-                    break
+        # "tiled" keeps the reprojected dtm in a tiled geotiff and samples it window by window
+        dst_path = None
+        if self.config.run_flags["dtm_backend"] == "tiled":
+            dst_path = os.path.join(self.config.tmp_path, "dtm_rp.tif")
+
+        cache = None
+        dtm = None
+        if self.config.run_flags["dtm_cache_dir"] != "":
+            cache = DtmCache(
+                self.config.run_flags["dtm_cache_dir"],
+                max_size_mb=self.config.run_flags["dtm_cache_max_mb"],
+                max_age_days=self.config.run_flags["dtm_cache_max_age_days"],
+            )
+            cache_params = {
+                "source": source,
+                "bbox": (minlong, minlat, maxlong, maxlat),
+                "dtm_crs": self.config.dtm_crs,
+                "working_projection": self.working_projection,
+                "dtm_backend": self.config.run_flags["dtm_backend"],
+                "dtm_tile_size": self.config.run_flags["dtm_tile_size"],
+            }
+            cache_key = DtmCache.make_key(**cache_params)
+            dtm = cache.load(cache_key, dst_path=dst_path)
+            if dtm is not None and self.config.verbose_level != VerboseLevel.NONE:
+                print("DTM loaded from cache", cache.cache_dir)
+
+        if dtm is None:
+            success = False
+            num_attempts = 10
+            if source == "AU" or (
+                source.startswith("http") and "wcs" in source.lower()
+            ):
+                # fetch_wcs_dtm retries each tile on its own, so a tile that still
+                # fails is not worth downloading every other tile again for
+                dtm = m2l_utils.load_and_reproject_dtm(
+                    self.config.polygon,
+                    self.working_projection,
+                    url=source,
+                    dst_path=dst_path,
+                    tile_size=self.config.run_flags["dtm_tile_size"],
+                    wcs_tile_px=self.config.run_flags["dtm_wcs_tile_px"],
+                    wcs_workers=self.config.run_flags["dtm_wcs_workers"],
+                )
+                success = True
+            elif source.startswith("http"):
+                i, done = 0, False
+                while not done:
+                    if i >= num_attempts:
+                        break
+                    try:
+                        dtm = m2l_utils.load_and_reproject_dtm(
+                            self.config.polygon,
+                            self.working_projection,
+                            url=source,
+                            dst_path=dst_path,
+                            tile_size=self.config.run_flags["dtm_tile_size"],
+                        )
+                        done = True
+                        success = True
+                    except Exception as e:
+                        warnings.warn(str(e))
+                        time.sleep(1)
+                        i += 1
+            else:
                 try:
                     dtm = m2l_utils.load_and_reproject_dtm(
-                        self.config.polygon, self.working_projection, url=source
+                        self.config.polygon,
+                        self.working_projection,
+                        url=source,
+                        dst_path=dst_path,
+                        tile_size=self.config.run_flags["dtm_tile_size"],
                     )
-                    done = True
                     success = True
                 except Exception as e:
                     warnings.warn(str(e))
-                    time.sleep(1)
-                    i += 1
-        else:
-            try:
-                dtm = m2l_utils.load_and_reproject_dtm(
-                    self.config.polygon, self.working_projection, url=source
+            if success is False:
+                raise NameError(
+                    f"map2loop error: Could not access DTM server after {num_attempts} attempts"
                 )
-                success = True
-            except Exception as e:
-                warnings.warn(str(e))
-        if success is False:
-            raise NameError(
-                f"map2loop error: Could not access DTM server after {num_attempts} attempts"
-            )
+
+            if cache is not None:
+                try:
+                    cache.put(cache_key, dtm, params=cache_params)
+                except Exception as e:
+                    warnings.warn(f"Could not add DTM to cache: {e}")
 
         self.data[Datatype.DTM] = dtm
+        self.clear_dtm_sampler()
         self.dirtyflags[Datatype.DTM] = False
         self.data_states[Datatype.DTM] = Datastate.COMPLETE
         if self.config.verbose_level == VerboseLevel.ALL:
@@ -609,9 +824,67 @@ class MapData:
                 plt.title("DTM Reprojected")
                 plt.show()
 
+    def clear_dtm_sampler(self):
+        """
+        Drop the cached dtm sampler (closing its dataset if it holds one open)
+        """
+        with self.dtm_sampler_lock:
+            if isinstance(self.dtm_sampler, m2l_utils.TiledDtmSampler):
+                self.dtm_sampler.close()
+            self.dtm_sampler = None
+
+    def get_dtm_sampler(self):
+        """
+        Getter for a DtmSampler over the loaded dtm (and depth to basement grid if
+        calc_depth_grid has been run). The dtm band is only read once and the sampler
+        is reused until the dtm or dtb changes. With the "tiled" dtm_backend run flag
+        a TiledDtmSampler is returned instead which reads dtm windows on demand
+
+        Returns:
+            m2l_utils.DtmSampler: The sampler for batched height lookups
+        """
+        # stages running in parallel must all get the same sampler, reentrant as
+        # loading the dtm here clears the (not yet created) sampler
+        with self.dtm_sampler_lock:
+            if self.dtm_sampler is None:
+                dtm = self.get_map_data(Datatype.DTM)
+                if self.config.run_flags["dtm_backend"] == "tiled":
+                    self.dtm_sampler = m2l_utils.TiledDtmSampler(
+                        dtm.open(),
+                        self.dtb,
+                        self.dtb_null,
+                        tile_size=self.config.run_flags["dtm_tile_size"],
+                        cache_mb=self.config.run_flags["dtm_cache_mb"],
+                    )
+                else:
+                    with dtm.open() as dtm_dataset:
+                        self.dtm_sampler = m2l_utils.DtmSampler(
+                            dtm_dataset, self.dtb, self.dtb_null
+                        )
+            return self.dtm_sampler
+
+    def get_geology_grid(self):
+        """
+        Getter for a GeologyGrid of the loaded geology over the bounding box,
+        rasterised at the geology_grid_resolution run flag. The grid is built
+        once and shared by all point in unit lookups until the geology changes
+
+        Returns:
+            GeologyGrid: The lookup grid
+        """
+        geology = self.get_map_data(Datatype.GEOLOGY)
+        if self.geology_grid is None or self.geology_grid.geology is not geology:
+            self.geology_grid = GeologyGrid(
+                geology,
+                self.config.bbox,
+                self.config.run_flags["geology_grid_resolution"],
+            )
+        return self.geology_grid
+
     @beartype.beartype
     def calc_depth_grid(self, workflow: dict):
         # dtm = self.get_map_data(Datatype.DTM).open()
+        self.clear_dtm_sampler()
         if self.get_map_data(Datatype.DTB_GRID) is None:
             self.dtb = 0
             self.dtb_null = 0
@@ -692,6 +965,8 @@ class MapData:
         )
 
         if self.config.verbose_level == VerboseLevel.ALL:
+            # plot_points reads the saved file
+            self.artifacts.flush()
             m2l_utils.plot_points(
                 os.path.join(self.config.output_path, "contacts4.csv"),
                 self.get_map_data(Datatype.GEOLOGY),
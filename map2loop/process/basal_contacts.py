@@ -1,11 +1,15 @@
 import geopandas as gpd
 import numpy as np
 import pandas as pd
+import shapely
 
 
 def extract_basal_contacts(geology_polygons,column_names):
     """Create a geodataframe with all of the contact lines
     between features in the geology_polygons dataset
+
+    Each contact carries the column_names attributes of the two features it separates,
+    suffixed _1 and _2, and both orderings of every pair of touching lines are returned
     """
     # break multipart features into separate features
     all_geom = geology_polygons.explode(ignore_index=True).reset_index()
@@ -26,28 +30,23 @@ def extract_basal_contacts(geology_polygons,column_names):
     lines = gpd.GeoDataFrame(geometry=all_geom.exterior)
     lines['indexes'] = all_geom.index
     # merge the interior lines into the exterior lines
-    lines = pd.concat([lines,interior]).reset_index()
-    # now we want to join the lines feature to the columns of the original shapefile we
-    # are interested in
-    lines.set_index('indexes').join(all_geom[column_names])
-    # now change the index back to the original index
-    lines = lines.set_index('index')
-    # calculate the intersection of the lines to determine
-    # which lines are in contact with each other
-    intersection_matrix = np.zeros((len(lines),len(lines)),dtype=bool)
-    for i in range(intersection_matrix.shape[0]):
-        intersection_matrix[i,:] = lines.intersects(lines.loc[i,'geometry'])
-    # now we want to create a dataframe with the lines that are in contact
-    linestrings = []
-    data = []
-    for i in range(intersection_matrix.shape[0]):
-        intersection_matrix[i,i] = False
-        for j in lines.loc[intersection_matrix[i,:]].index:
-            # if lines[i,['age']]
-            l = lines.loc[j,'geometry']
-            linestrings.append(lines.loc[i,:].geometry.intersection(
-                                            l))
-            data.append([])
-
-    basal_contacts = gpd.gpd.GeoSeries(linestrings)
+    lines = pd.concat([lines,interior]).reset_index(drop=True)
+    # find the pairs of lines in contact with each other from the spatial index,
+    # this gives sparse arrays of candidate pairs rather than a dense len(lines)^2 matrix
+    first, second = lines.sindex.query(lines.geometry, predicate="intersects")
+    not_self = first != second
+    first, second = first[not_self], second[not_self]
+    order = np.lexsort((second, first))
+    first, second = first[order], second[order]
+    # calculate the contact lines for all pairs at once
+    geometry = np.asarray(lines.geometry)
+    linestrings = shapely.intersection(geometry[first], geometry[second])
+    # now join each contact to the columns of the original shapefile we are interested in
+    source = lines['indexes'].to_numpy()
+    attributes = all_geom[column_names]
+    data = pd.concat([
+        attributes.loc[source[first]].reset_index(drop=True).add_suffix('_1'),
+        attributes.loc[source[second]].reset_index(drop=True).add_suffix('_2'),
+    ], axis=1)
+    basal_contacts = gpd.GeoDataFrame(data, geometry=linestrings, crs=geology_polygons.crs)
     return basal_contacts
@@ -0,0 +1,207 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak rss is then not recorded
+    resource = None
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of the process in bytes, 0 if unknown
+    """
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Profiler:
+    """
+    Records the wall time, cpu time, peak rss growth and item counts of the
+    pipeline stages and hot helpers
+
+    Each measurement is stored as a record with its name, category, thread,
+    start, wall and cpu seconds, the growth of the process's peak rss in bytes
+    and a dictionary of item counts (e.g. points, contacts, faults) added with
+    count while it was open. Counts are also added to the measurements it is
+    nested in on the same thread. cpu time and peak rss are process wide so
+    they include any other threads running at the same time.
+
+    Attributes
+    ----------
+    enabled: bool
+        Whether measurements are recorded, when False measure does nothing
+    print_timings: bool
+        Print the wall time of every measurement as it finishes
+    records: list of dict
+        The finished measurements
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.print_timings = False
+        self.records = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    def reset(self):
+        with self.lock:
+            self.records = []
+            self.origin = time.perf_counter()
+
+    def _stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def measure(self, name: str, category: str = "function"):
+        """
+        Context manager measuring the code it wraps
+
+        Args:
+            name (str): The name the measurement is recorded under
+            category (str, optional): e.g. "run", "stage" or "function". Defaults to "function".
+        """
+        if not self.enabled:
+            yield
+            return
+        record = {
+            "name": name,
+            "category": category,
+            "thread": threading.get_ident(),
+            "counts": {},
+        }
+        stack = self._stack()
+        stack.append(record)
+        rss = peak_rss()
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["start"] = start - self.origin
+            record["wall"] = time.perf_counter() - start
+            record["cpu"] = time.process_time() - cpu
+            record["peak_rss_delta"] = peak_rss() - rss
+            stack.pop()
+            with self.lock:
+                self.records.append(record)
+            if self.print_timings:
+                print(f"Function {name} took {record['wall']:.4f} seconds")
+
+    def count(self, name: str, n: int):
+        """
+        Add to an item count of the open measurements of this thread
+
+        Args:
+            name (str): The kind of item, e.g. "points"
+            n (int): How many were processed
+        """
+        if not self.enabled:
+            return
+        for record in self._stack():
+            record["counts"][name] = record["counts"].get(name, 0) + int(n)
+
+    def summary(self) -> dict:
+        """
+        Totals of the measurements by name
+
+        Returns:
+            dict: calls, wall, cpu, peak_rss_delta and counts of each name
+        """
+        totals = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(
+                record["name"],
+                {
+                    "category": record["category"],
+                    "calls": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "peak_rss_delta": 0,
+                    "counts": {},
+                },
+            )
+            total["calls"] += 1
+            total["wall"] += record["wall"]
+            total["cpu"] += record["cpu"]
+            total["peak_rss_delta"] += record["peak_rss_delta"]
+            for key, value in record["counts"].items():
+                total["counts"][key] = total["counts"].get(key, 0) + value
+        return totals
+
+    def write_json(self, filename: str):
+        """
+        Save the records and their summary as json
+        """
+        with self.lock:
+            records = list(self.records)
+        with open(filename, "w") as f:
+            json.dump({"records": records, "summary": self.summary()}, f, indent=1)
+
+    def write_chrome_trace(self, filename: str):
+        """
+        Save the records in the Chrome trace event format (chrome://tracing, Perfetto)
+        """
+        with self.lock:
+            records = list(self.records)
+        events = []
+        for record in records:
+            args = {
+                "cpu_s": record["cpu"],
+                "peak_rss_delta_bytes": record["peak_rss_delta"],
+            }
+            args.update(record["counts"])
+            events.append(
+                {
+                    "name": record["name"],
+                    "cat": record["category"],
+                    "ph": "X",
+                    "ts": record["start"] * 1e6,
+                    "dur": record["wall"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": record["thread"],
+                    "args": args,
+                }
+            )
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# shared by all the decorated functions, Project.profile refers to it
+profiler = Profiler()
+
+
+def timer_decorator(func):
+    """
+    Record every call of func with the profiler while it is enabled
+    """
+
+    @functools.wraps(func)
+    def decorator(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        with profiler.measure(func.__qualname__):
+            return func(*args, **kwargs)
+
+    return decorator
+
+
+def count_items(name: str, n: int):
+    """
+    Add to an item count of the profiler measurements open on this thread
+    """
+    profiler.count(name, n)
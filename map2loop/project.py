@@ -1,11 +1,12 @@
 import shutil
 import os
+import hashlib
+import json
 import warnings
 from tqdm import tqdm
 
 import geopandas as gpd
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import networkx as nx
 from shapely.geometry import Polygon
@@ -23,6 +24,10 @@ from . import (
     clut_paths,
 )
 from .mapdata import MapData
+from .lazy_grid import LazyInterpolationGrids
+from .stages import Stage, StageScheduler
+from .checkpoint import StageCheckpoints, EXECUTION_RUN_FLAGS
+from .profiler import profiler
 from .stratigraphic_column import StratigraphicColumn
 from .deformation_history import DeformationHistory
 from .config import Config
@@ -146,6 +151,12 @@ class Project(object):
 
         self.config = Config(self.map_data, verbose_level)
         self.map_data.set_config(self.config)
+        # intermediate tables passed between the processing steps of run
+        self.artifacts = self.map_data.artifacts
+        # wall time of each stage of the last run
+        self.stage_timings = {}
+        # timings, cpu, memory and item counts of the stages and helpers, see the profile run flag
+        self.profile = profiler
 
         self.state = loopdata_state
         if self.state in ["WA", "NSW", "VIC", "SA", "QLD", "ACT", "TAS"]:
@@ -497,7 +508,6 @@ class Project(object):
     def _extract_basal_contacts(self):
         pass
 
-    @m2l_utils.timer_decorator
     def run(self):
         """The main map2loop process for reading, converting, reprojecting and interpolating map data into event, observation
         and relationship data suitable for further processing
@@ -524,158 +534,496 @@ class Project(object):
         # if the process is re-run (ie. run() is called again without __init__ or update_config)
         # TODO: Fix so that both version of orientations are possible without reloading the file
         self.map_data.data_states[Datatype.STRUCTURE] = Datastate.UNLOADED
+        self.artifacts.clear()
         self.map_data.dirtyflags[Datatype.STRUCTURE] = True
-        with tqdm(total=100, position=0) as pbar:
-            pbar.update(0)
-
-            # Populate Stratigraphic Column with Strat Layers from Geology files
-            self.stratigraphicColumn.populate(
-                self.map_data.get_map_data(Datatype.GEOLOGY)
+        stages = self.build_stages()
+        self.stage_scheduler = StageScheduler(stages)
+        checkpoints = None
+        sources = ""
+        if self.config.run_flags["checkpoint_dir"] != "":
+            # stages whose inputs and flags are unchanged are restored instead of run
+            checkpoints = StageCheckpoints(
+                self.config.run_flags["checkpoint_dir"], self.project_path, self
             )
-
-            # Use map2model to create list of relationships between layers
-            # self.stratigraphicColumn.sort_from_relationship_list(self.relationshipList)
-
-            # Optionally use ASUD to add further relationships or clarify some
-            # Use relationships to put layers in groups/supergroups
-
-            if self.config.verbose_level != VerboseLevel.NONE:
-                print("Generating topology analyser input...")
-            self.map_data.export_wkt_format_files()
-            # Get relationships between Strata layers``
-            self.__run_map2model()
-
-            # Create topology graph from map2model output
-            self.topology = Topology(self.config)
-            if self.config.run_flags["aus"]:
-                self.topology.use_asud(self.config)
-            self.topology.save_units(self.config, self.stratigraphicColumn)
-            self.__display_topology_graph()
-            # Map2Graph.map2graph('./test_m2g',self.config.geology_file,self.config.fault_file,self.config.mindep_file,self.config.c_l,self.config.run_flags['deposits'])
-            pbar.update(10)  # 10%
-
-            # self.map_data.load_dtm(self.config.dtm_filename if self.local else self.state)
-            pbar.update(10)  # 20%
-
-            # self.config.join_features(self.map_data.get_map_data(Datatype.GEOLOGY))
-            self.topology.save_group(
-                self.config, self.map_data, self.stratigraphicColumn
+            sources = self.__checkpoint_sources(stages)
+        self.profile.enabled = self.config.run_flags["profile"]
+        self.profile.print_timings = (
+            self.profile.enabled and self.config.run_flags["profile_print"]
+        )
+        if self.profile.enabled:
+            self.profile.reset()
+        with tqdm(total=100, position=0) as pbar, self.profile.measure("run", "run"):
+            pbar.update(0)
+            self.stage_timings = self.stage_scheduler.run(
+                self.config.run_flags["stage_workers"],
+                pbar,
+                self.config.verbose_level,
+                checkpoints,
+                sources,
             )
-            pbar.update(5)  # 25%
-
-            self.map_data.calc_depth_grid(self.workflow)
-            pbar.update(5)  # 30%
-
-            self.map_data.merge_structure_with_geology(self.config.c_l)
-            self.map_data.export_orientations(self.workflow)
-            pbar.update(10)  # 40%
-
-            self.map_data.export_contacts(self.workflow)
-            pbar.update(10)  # 50%
-
-            self.__test_interpolation()
-            pbar.update(10)  # 60%
-
-            self.map_data.export_faults(
-                self.workflow, self.map_data.dip_grid, self.map_data.dip_dir_grid
+            print('I am here in project.run() line 677 end of project' )
+        if self.profile.enabled:
+            self.profile.write_json(os.path.join(self.config.tmp_path, "profile.json"))
+            self.profile.write_chrome_trace(
+                os.path.join(self.config.tmp_path, "profile_trace.json")
             )
-            pbar.update(10)  # 70%
 
-            self.__process_plutons()
-            pbar.update(10)  # 80%
+    def build_stages(self):
+        """
+        Describe the steps of run as stages with the resources they read and write.
+        The workflow flags enable or disable the optional stages
 
+        Returns:
+            list of Stage: The stages in the order they run with one stage worker
+        """
+        return [
+            # every other stage reads the map data, so it is loaded (and the shared
+            # c_l updated) once here before any of them start
+            Stage(
+                "map_data",
+                self.__load_map_data,
+                outputs=["map_data"],
+                checkpoint=False,
+            ),
+            # Populate Stratigraphic Column with Strat Layers from Geology files
+            Stage(
+                "strat_column",
+                lambda: self.stratigraphicColumn.populate(
+                    self.map_data.get_map_data(Datatype.GEOLOGY)
+                ),
+                inputs=["map_data"],
+                outputs=["strat_column"],
+                checkpoint=False,
+            ),
+            Stage(
+                "wkt_files",
+                self.__export_wkt_files,
+                inputs=["map_data"],
+                outputs=["wkt_files"],
+                checkpoint=False,
+            ),
+            # Get relationships between Strata layers
+            Stage(
+                "map2model",
+                self.__run_map2model,
+                inputs=["map_data", "wkt_files"],
+                outputs=["map2model_graphs"],
+                flags=self.__flags("deposits"),
+            ),
+            Stage(
+                "topology",
+                self.__create_topology,
+                inputs=["map_data", "map2model_graphs", "strat_column"],
+                outputs=["topology", "strat_column"],
+                progress=20,
+                flags=self.__flags("aus"),
+                state=["topology", "stratigraphicColumn"],
+            ),
+            Stage(
+                "groups",
+                lambda: self.topology.save_group(
+                    self.config, self.map_data, self.stratigraphicColumn
+                ),
+                inputs=["map_data", "topology", "strat_column"],
+                outputs=["all_sorts", "groups"],
+                progress=5,
+            ),
+            Stage(
+                "depth_grid",
+                lambda: self.map_data.calc_depth_grid(self.workflow),
+                inputs=["map_data"],
+                outputs=["dtb"],
+                progress=5,
+                flags=self.__flags("cover_dip", "cover_spacing", "dtb_null"),
+                checkpoint=False,
+            ),
+            Stage(
+                "orientations",
+                self.__export_orientations,
+                inputs=["map_data", "dtb", "groups"],
+                outputs=["orientations"],
+                progress=10,
+                flags=self.__flags("orientation_decimate"),
+                checkpoint=False,
+            ),
+            Stage(
+                "contacts",
+                lambda: self.map_data.export_contacts(self.workflow),
+                inputs=["map_data", "dtb", "all_sorts"],
+                outputs=["basal_contacts", "contacts4"],
+                progress=10,
+                flags=self.__flags("contact_decimate", "dist_buffer"),
+                state=["map_data.basal_contacts", "map_data.basal_contacts_no_faults"],
+            ),
+            Stage(
+                "interpolation",
+                self.__test_interpolation,
+                inputs=[
+                    "map_data",
+                    "orientations",
+                    "basal_contacts",
+                    "groups",
+                    "strat_column",
+                ],
+                outputs=["interpolation_grids", "super_groups"],
+                progress=10,
+                flags=self.__flags(
+                    "interpolation_scheme",
+                    "interpolation_neighbours",
+                    "interpolation_spacing",
+                    "interpolation_mode",
+                    "misorientation",
+                ),
+                state=[
+                    "map_data.dip_grid",
+                    "map_data.dip_dir_grid",
+                    "map_data.polarity_grid",
+                    "use_gcode3",
+                ],
+                # lazy grids evaluate from the live map data so can't be saved
+                checkpoint=self.config.run_flags["interpolation_mode"] != "lazy",
+            ),
+            Stage(
+                "faults",
+                lambda: self.map_data.export_faults(
+                    self.workflow, self.map_data.dip_grid, self.map_data.dip_dir_grid
+                ),
+                inputs=["map_data", "dtb", "interpolation_grids"],
+                outputs=[
+                    "faults",
+                    "fault_orientations",
+                    "fault_dimensions",
+                    "near_fault_orientations",
+                ],
+                progress=10,
+                flags=self.__flags(
+                    "fault_decimate", "fault_dip", "min_fault_length", "interpolation_spacing"
+                ),
+            ),
+            Stage(
+                "plutons",
+                self.__process_plutons,
+                inputs=["map_data", "dtb", "all_sorts", "groups"],
+                outputs=["plutons", "all_sorts2"],
+                progress=10,
+                flags=self.__flags(
+                    "contact_decimate", "min_pluton_area", "pluton_dip", "pluton_form"
+                ),
+            ),
             # Seismic section (defaults false)
-            if self.workflow["seismic_section"]:
-                self.__extract_section_features()
-
+            Stage(
+                "seismic_section",
+                self.__extract_section_features,
+                inputs=["map_data", "dtb", "all_sorts2", "faults", "contacts4"],
+                outputs=["faults", "contacts4"],
+                enabled=self.workflow["seismic_section"],
+                flags=self.__flags("seismic_section"),
+            ),
             # defaults true
-            if self.workflow["contact_dips"]:
-                self.__propagate_contact_dips()
-
+            Stage(
+                "contact_dips",
+                self.__propagate_contact_dips,
+                inputs=["map_data", "dtb", "basal_contacts", "interpolation_grids"],
+                outputs=["contact_orientations"],
+                enabled=self.workflow["contact_dips"],
+                flags=self.__flags(
+                    "contact_dips",
+                    "contact_dip",
+                    "contact_decimate",
+                    "interpolation_spacing",
+                ),
+            ),
             # defaults true
-            if self.workflow["formation_thickness"]:
-                self.__calc_thickness()
-
+            Stage(
+                "thickness",
+                self.__calc_thickness,
+                inputs=[
+                    "map_data",
+                    "dtb",
+                    "basal_contacts",
+                    "interpolation_grids",
+                    "all_sorts",
+                ],
+                outputs=["thickness"],
+                enabled=self.workflow["formation_thickness"],
+                flags=self.__flags(
+                    "formation_thickness",
+                    "thickness_buffer",
+                    "max_thickness_allowed",
+                    "contact_decimate",
+                    "interpolation_spacing",
+                ),
+            ),
             # defaults false
-            if self.workflow["fold_axial_traces"]:
-                self.__create_fold_axial_trace_points()
-
+            Stage(
+                "fold_axial_traces",
+                self.__create_fold_axial_trace_points,
+                inputs=["map_data", "dtb", "interpolation_grids"],
+                outputs=["fat_orientations"],
+                enabled=self.workflow["fold_axial_traces"],
+                flags=self.__flags(
+                    "fold_axial_traces",
+                    "fold_decimate",
+                    "fat_step",
+                    "close_dip",
+                    "interpolation_spacing",
+                ),
+            ),
             # defaults false
-            if self.workflow["drillholes"]:
-                self.__extract_drillholes()
-
-            self.__postprocess()
-
-            cmap = pd.DataFrame.from_dict(
-                data=self.config.colour_dict, orient="index", columns=["colour"]
-            )
-            cmap.index.name = "name"
-            self.stratigraphicColumn.stratigraphicUnits[
-                "colour"
-            ] = self.stratigraphicColumn.stratigraphicUnits.merge(cmap, on="name")[
-                "colour_y"
-            ]
-            self.config.save_cmap(self.workflow)
-
-            point_data = m2l_geometry.combine_point_data(
-                self.config.output_path, self.config.tmp_path
-            )
-            print('I am here in project.run() line 623' )
-            
-            Gloop = Topology.make_Loop_graph(self.config, self.map_data, point_data)
-            nx.write_gml(Gloop, os.path.join(self.config.output_path, "loop.gml"))
-            Topology.colour_Loop_graph(self.config.output_path, "loop")
-
-            # TODO: Fix map2graph and make it a proper object
-            if self.config.run_flags["map2graph"]:
-                try:
-                    Map2Graph.map2graph(
-                        self.config.output_path,
-                        self.config.geology_filename,
-                        self.config.fault_filename,
-                        self.config.mindep_filename,
-                        self.config.c_l,
-                        self.config.run_flags["deposits"],
-                        self.config.run_flags["fault_orientation_clusters"],
-                        self.config.run_flags["fault_length_clusters"],
-                        self.config.run_flags["fault_fault_weight"],
-                        self.config.run_flags["fault_weight"],
-                        self.config.run_flags["formation_weight"],
-                        self.config.run_flags["formation_formation_weight"],
-                        self.config.run_flags["fault_formation_weight"],
-                    )
-                except Exception:
-                    print("Topology.map2graph failed")
-
-            # TODO: Fix map2graph and make it a proper object
-            if self.config.run_flags["granular_map2graph"]:
-                try:
-                    Map2Graph.granular_map2graph(
-                        self.config.output_path,
-                        self.config.geology_file,
-                        self.config.fault_file,
-                        self.config.mindep_file,
-                        self.config.c_l,
-                        self.config.run_flags["deposits"],
-                        self.config.run_flags["fault_fault_weight"],
-                        self.config.run_flags["fault_weight"],
-                        self.config.run_flags["formation_weight"],
-                        self.config.run_flags["formation_formation_weight"],
-                        self.config.run_flags["fault_formation_weight"],
-                    )
-                except Exception:
-                    print("Topology.granular_map2graph failed")
+            Stage(
+                "drillholes",
+                self.__extract_drillholes,
+                inputs=["map_data", "contacts4"],
+                outputs=["contacts4"],
+                enabled=self.workflow["drillholes"],
+                flags=self.__flags("drillholes"),
+            ),
+            # closes the dtb for cover maps so it also waits for the stages reading it
+            Stage(
+                "postprocess",
+                self.__postprocess,
+                inputs=[
+                    "map_data",
+                    "all_sorts",
+                    "all_sorts2",
+                    "basal_contacts",
+                    "contact_orientations",
+                    "contacts4",
+                    "fat_orientations",
+                    "faults",
+                    "interpolation_grids",
+                    "near_fault_orientations",
+                    "orientations",
+                    "plutons",
+                    "super_groups",
+                    "thickness",
+                ],
+                outputs=["dtb", "clean_data", "fault_relationships"],
+                progress=5,
+                flags=self.__flags("pluton_form", "polarity", "strat_offset"),
+            ),
+            Stage(
+                "colours",
+                self.__save_colours,
+                inputs=["map_data", "strat_column", "clean_data"],
+                outputs=["colours", "clean_data"],
+                state=["stratigraphicColumn", "config.colour_dict", "config.cmap"],
+            ),
+            Stage(
+                "loop_graph",
+                self.__make_loop_graph,
+                inputs=[
+                    "map_data",
+                    "clean_data",
+                    "fault_relationships",
+                    "faults",
+                    "thickness",
+                ],
+                outputs=["loop_graph"],
+                progress=5,
+                flags=self.__flags(
+                    "fault_orientation_clusters", "fault_length_clusters"
+                ),
+            ),
+            Stage(
+                "map2graph",
+                self.__run_map2graph,
+                inputs=["map_data", "clean_data"],
+                outputs=["map2graph"],
+                enabled=self.config.run_flags["map2graph"]
+                or self.config.run_flags["granular_map2graph"],
+                flags=self.__flags(
+                    "map2graph",
+                    "granular_map2graph",
+                    "deposits",
+                    "fault_orientation_clusters",
+                    "fault_length_clusters",
+                    "fault_fault_weight",
+                    "fault_weight",
+                    "formation_weight",
+                    "formation_formation_weight",
+                    "fault_formation_weight",
+                ),
+            ),
+            Stage(
+                "fault_layer",
+                lambda: m2l_geometry.update_fault_layer(self.config, self.map_data),
+                inputs=["map_data", "loop_graph"],
+                outputs=["fault_layer"],
+            ),
+            Stage(
+                "project_file",
+                self.update_loop_project_file,
+                inputs=[
+                    "map_data",
+                    "clean_data",
+                    "colours",
+                    "fault_layer",
+                    "fault_relationships",
+                    "loop_graph",
+                ],
+                outputs=["project_file"],
+                progress=5,
+                # the loop project file can be outside the project directory
+                checkpoint=False,
+            ),
+            Stage(
+                "dtm_export",
+                lambda: self.map_data.export_dtm(
+                    os.path.join(self.project_path, "dtm", "dtm_rp.tif")
+                ),
+                inputs=["map_data"],
+                outputs=["dtm_file"],
+            ),
+            Stage(
+                "png",
+                self.__export_png,
+                inputs=["map_data", "colours"],
+                outputs=["png"],
+                progress=5,
+                checkpoint=False,
+            ),
+        ]
+
+    def __flags(self, *names):
+        # the values of run_flags and workflow keys a stage depends on
+        flags = {}
+        for name in names:
+            if name in self.config.run_flags:
+                flags[name] = self.config.run_flags[name]
+            else:
+                flags[name] = self.workflow[name]
+        return flags
 
-            m2l_geometry.update_fault_layer(self.config, self.map_data)
+    def __checkpoint_sources(self, stages):
+        """
+        Digest of what every stage depends on: the map data sources, the area,
+        projection and codes and labels, and any run_flags or workflow keys not
+        declared by a stage
+        """
+        declared = set(EXECUTION_RUN_FLAGS)
+        for stage in stages:
+            declared.update(stage.flags)
+        sources = []
+        for datatype in Datatype:
+            filename = self.map_data.filenames[datatype]
+            if isinstance(filename, str) and os.path.isfile(filename):
+                stat = os.stat(filename)
+                sources.append(
+                    [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
+                )
+            else:
+                sources.append(filename)
+        params = {
+            "sources": sources,
+            "bbox_3d": self.config.bbox_3d,
+            "polygon": None
+            if self.config.polygon is None
+            else self.config.polygon.unary_union.wkt,
+            "project_crs": self.config.project_crs,
+            "c_l": self.config.c_l,
+            "run_flags": {
+                k: v for k, v in self.config.run_flags.items() if k not in declared
+            },
+            "workflow": {k: v for k, v in self.workflow.items() if k not in declared},
+        }
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __load_map_data(self):
+        # run() marks the structure data unloaded and update_config loads the
+        # rest, this only loads what isn't already complete
+        for datatype in [
+            Datatype.GEOLOGY,
+            Datatype.STRUCTURE,
+            Datatype.FAULT,
+            Datatype.FOLD,
+            Datatype.MINERAL_DEPOSIT,
+        ]:
+            if self.map_data.data_states[datatype] != Datastate.COMPLETE:
+                self.map_data.load_map_data(datatype)
+        if self.map_data.data_states[Datatype.DTM] != Datastate.COMPLETE:
+            self.map_data.load_dtm()
+
+    def __export_wkt_files(self):
+        if self.config.verbose_level != VerboseLevel.NONE:
+            print("Generating topology analyser input...")
+        self.map_data.export_wkt_format_files()
+
+    def __create_topology(self):
+        # Create topology graph from map2model output
+        self.topology = Topology(self.config)
+        if self.config.run_flags["aus"]:
+            self.topology.use_asud(self.config)
+        self.topology.save_units(self.config, self.stratigraphicColumn)
+        self.__display_topology_graph()
+
+    def __export_orientations(self):
+        self.map_data.merge_structure_with_geology(self.config.c_l)
+        self.map_data.export_orientations(self.workflow)
+
+    def __save_colours(self):
+        cmap = pd.DataFrame.from_dict(
+            data=self.config.colour_dict, orient="index", columns=["colour"]
+        )
+        cmap.index.name = "name"
+        self.stratigraphicColumn.stratigraphicUnits[
+            "colour"
+        ] = self.stratigraphicColumn.stratigraphicUnits.merge(cmap, on="name")[
+            "colour_y"
+        ]
+        self.config.save_cmap(self.workflow)
+
+    def __make_loop_graph(self):
+        # the steps below read the saved artifacts from disk
+        self.map_data.artifacts.flush()
+        point_data = m2l_geometry.combine_point_data(
+            self.config.output_path, self.config.tmp_path
+        )
+        Gloop = Topology.make_Loop_graph(self.config, self.map_data, point_data)
+        nx.write_gml(Gloop, os.path.join(self.config.output_path, "loop.gml"))
+        Topology.colour_Loop_graph(self.config.output_path, "loop")
 
-            self.update_loop_project_file()
-            self.map_data.export_dtm(
-                os.path.join(self.project_path, "dtm", "dtm_rp.tif")
-            )
+    def __run_map2graph(self):
+        # TODO: Fix map2graph and make it a proper object
+        if self.config.run_flags["map2graph"]:
+            try:
+                Map2Graph.map2graph(
+                    self.config.output_path,
+                    self.config.geology_filename,
+                    self.config.fault_filename,
+                    self.config.mindep_filename,
+                    self.config.c_l,
+                    self.config.run_flags["deposits"],
+                    self.config.run_flags["fault_orientation_clusters"],
+                    self.config.run_flags["fault_length_clusters"],
+                    self.config.run_flags["fault_fault_weight"],
+                    self.config.run_flags["fault_weight"],
+                    self.config.run_flags["formation_weight"],
+                    self.config.run_flags["formation_formation_weight"],
+                    self.config.run_flags["fault_formation_weight"],
+                )
+            except Exception:
+                print("Topology.map2graph failed")
 
-            self.__export_png()
-            print('I am here in project.run() line 677 end of project' )
-            pbar.update(20)  # 100%
+        # TODO: Fix map2graph and make it a proper object
+        if self.config.run_flags["granular_map2graph"]:
+            try:
+                Map2Graph.granular_map2graph(
+                    self.config.output_path,
+                    self.config.geology_file,
+                    self.config.fault_file,
+                    self.config.mindep_file,
+                    self.config.c_l,
+                    self.config.run_flags["deposits"],
+                    self.config.run_flags["fault_fault_weight"],
+                    self.config.run_flags["fault_weight"],
+                    self.config.run_flags["formation_weight"],
+                    self.config.run_flags["formation_formation_weight"],
+                    self.config.run_flags["fault_formation_weight"],
+                )
+            except Exception:
+                print("Topology.granular_map2graph failed")
 
     def update_loop_project_file(self):
         """A function to convert multiple csv and map2loop output files into a single loop project file"""
@@ -770,34 +1118,29 @@ class Project(object):
             self.workflow,
         )
 
-        contact_interp, combo_interp = m2l_interpolation.interpolation_grids(
-            self.config, self.map_data, basal_contacts_filename, super_groups
-        )
+        if self.config.run_flags["interpolation_mode"] == "lazy":
+            # only the tiles later stages read are interpolated
+            lazy_grids = LazyInterpolationGrids(
+                self.config, self.map_data, basal_contacts_filename, super_groups
+            )
+            grids = {name: lazy_grids.grid(name) for name in lazy_grids.names}
+        else:
+            contact_interp, combo_interp = m2l_interpolation.interpolation_grids(
+                self.config, self.map_data, basal_contacts_filename, super_groups
+            )
 
-        spacing = self.config.run_flags[
-            "interpolation_spacing"
-        ]  # grid spacing in meters
-        x = self.config.width
-        y = self.config.height
-        bbox = self.config.bbox
-        dip_grid = np.ones((y, x))
-        dip_grid = dip_grid * -999
-        dip_dir_grid = np.ones((y, x))
-        dip_dir_grid = dip_dir_grid * -999
-        contact_grid = np.ones((y, x))
-        contact_grid = contact_grid * -999
-        polarity_grid = np.ones((y, x))
-        polarity_grid = polarity_grid * -999
-        for i, row in combo_interp.iterrows():
-            r = int((row[1] - bbox[1]) / spacing)
-            c = int((row[0] - bbox[0]) / spacing)
-            dip_grid[r, c] = float(row[5])
-            dip_dir_grid[r, c] = float(row[6])
-            polarity_grid[r, c] = float(row[4])
-        for i, row in contact_interp.iterrows():
-            r = int((row[1] - bbox[1]) / spacing)
-            c = int((row[0] - bbox[0]) / spacing)
-            contact_grid[r, c] = float(row[4])
+            grids = m2l_interpolation.interpolation_to_grids(
+                self.config, contact_interp, combo_interp
+            )
+            m2l_interpolation.save_interpolation_grids(
+                self.config,
+                grids,
+                os.path.join(self.config.tmp_path, "interpolation_grids.tif"),
+            )
+        dip_grid = grids["dip"]
+        dip_dir_grid = grids["dip_dir"]
+        polarity_grid = grids["polarity"]
+        contact_grid = grids["contact"]
 
         self.map_data.dip_grid = dip_grid
         self.map_data.dip_dir_grid = dip_dir_grid
@@ -865,31 +1208,19 @@ class Project(object):
                 surface_cut=2000,
             )
 
-            contacts = pd.read_csv(
-                os.path.join(self.config.output_path, "contacts4.csv"), sep=","
-            )
+            contacts = self.map_data.artifacts.get("contacts4")
             seismic_contacts = pd.read_csv(
                 os.path.join(self.config.output_path, "seismic_base.csv"), sep=","
             )
             all_contacts = pd.concat([contacts, seismic_contacts], sort=False)
-            all_contacts.to_csv(
-                os.path.join(self.config.output_path, "contacts4.csv"),
-                index=None,
-                header=True,
-            )
+            self.map_data.artifacts.publish("contacts4", all_contacts)
 
-            faults = pd.read_csv(
-                os.path.join(self.config.output_path, "faults.csv"), sep=","
-            )
+            faults = self.map_data.artifacts.get("faults")
             seismic_faults = pd.read_csv(
                 os.path.join(self.config.output_path, "seismic_faults.csv"), sep=","
             )
             all_faults = pd.concat([faults, seismic_faults], sort=False)
-            all_faults.to_csv(
-                os.path.join(self.config.output_path, "faults.csv"),
-                index=None,
-                header=True,
-            )
+            self.map_data.artifacts.publish("faults", all_faults)
 
     def __propagate_contact_dips(self):
         if self.config.verbose_level != VerboseLevel.NONE:
@@ -905,9 +1236,7 @@ class Project(object):
             self.config, self.map_data, self.workflow
         )
 
-        # TODO: multi thread / numba jit
-        m2l_geometry.calc_thickness_with_grid(self.config, self.map_data)
-        m2l_geometry.calc_min_thickness_with_grid(self.config, self.map_data)
+        m2l_geometry.calc_all_thickness_with_grid(self.config, self.map_data)
 
         m2l_geometry.normalise_thickness(self.config.output_path)
 
@@ -972,9 +1301,7 @@ class Project(object):
         if self.workflow["strat_offset"]:
             if self.config.verbose_level != VerboseLevel.NONE:
                 print("Processing strat offsets")
-            fault_test = pd.read_csv(
-                os.path.join(self.config.output_path, "fault_dimensions.csv"), sep=","
-            )
+            fault_test = self.map_data.artifacts.get("fault_dimensions")
             if len(fault_test) > 0:
                 m2l_geometry.fault_strat_offset(self.config, self.map_data)
 
@@ -1010,6 +1337,7 @@ class Project(object):
         self.topology.parse_fault_relationships(
             self.config, self.map_data, self.stratigraphicColumn
         )
+        self.map_data.artifacts.flush()
         m2l_geometry.save_interpolation_parameters(self.config)
 
     def __export_png(self):
@@ -1058,15 +1386,11 @@ class Project(object):
         dh = gpd.read_file(dhdb_filename, bbox=self.bbox)
         if len(dh) > 0:
             dh = dh[["X", "Y", "Z", "formation"]]
-            contacts = pd.read_csv(os.path.join(self.config.tmp_path, "contacts4.csv"))
+            contacts = self.map_data.artifacts.get("contacts4")
             all_contacts = pd.concat([contacts, dh], sort=False)
             all_contacts.reset_index(inplace=True)
             all_contacts.drop(labels="index", axis=1, inplace=True)
-            all_contacts.to_csv(
-                os.path.join(self.config.tmp_path, "contacts4.csv"),
-                index=None,
-                header=True,
-            )
+            self.map_data.artifacts.publish("contacts4", all_contacts)
             if self.config.verbose_level != VerboseLevel.NONE:
                 print(len(dh), "drillhole contacts added")
         else:
@@ -0,0 +1,266 @@
+import concurrent.futures
+import hashlib
+import json
+import time
+import warnings
+
+from .m2l_enums import VerboseLevel
+from .profiler import profiler
+
+
+class Stage:
+    """
+    A named step of Project.run with the resources it reads and writes
+
+    Resources are just names (e.g. "all_sorts", "interpolation_grids") for the
+    files, artifacts and MapData members a step produces or consumes, they are
+    only used to work out which stages have to wait for which.
+
+    Attributes
+    ----------
+    name: str
+        The name the stage is reported and timed under
+    func: callable
+        The function run for the stage, takes no arguments
+    inputs: list of str
+        The resources the stage reads
+    outputs: list of str
+        The resources the stage writes
+    enabled: bool
+        Whether the stage runs, disabled stages are skipped but keep their place
+    progress: int
+        The amount the progress bar is moved when the stage finishes
+    flags: dict
+        The run_flags and workflow values the results of the stage depend on
+    state: list of str
+        Dotted attribute paths (from the Project) of the in memory results of
+        the stage, saved with its checkpoints
+    checkpoint: bool
+        Whether the stage can be restored from a checkpoint instead of being run
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        inputs=(),
+        outputs=(),
+        enabled: bool = True,
+        progress: int = 0,
+        flags: dict = None,
+        state=(),
+        checkpoint: bool = True,
+    ):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.enabled = enabled
+        self.progress = progress
+        self.flags = {} if flags is None else flags
+        self.state = list(state)
+        self.checkpoint = checkpoint
+
+
+class StageScheduler:
+    """
+    Runs a list of stages as a dependency graph
+
+    The list order is the order the stages would run in sequentially. A stage
+    depends on an earlier stage if it reads what that stage writes, writes what
+    that stage reads or writes the same resource, so with any number of workers
+    every resource goes through the same sequence of writes and reads as it
+    does with one worker. Independent stages run concurrently on a thread pool.
+    Threads rather than processes are used as the stages share the Project and
+    MapData objects, the expensive stages have their own process pools.
+
+    With checkpoints each stage gets a key hashing its name, its flags, the
+    sources (the map data and anything not declared by a stage) and the keys
+    of the stages that last wrote its inputs. Stages with a saved checkpoint
+    under their key are restored instead of run.
+
+    Attributes
+    ----------
+    stages: list of Stage
+        The stages in sequential order
+    dependencies: dict
+        The names of the stages each stage waits for
+    timings: dict
+        Wall time in seconds of each stage that has run
+    restored: list of str
+        The names of the stages restored from checkpoints in the last run
+    """
+
+    def __init__(self, stages: list):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise NameError("map2loop error: Stage names must be unique")
+        self.stages = stages
+        self.dependencies = {}
+        for i, stage in enumerate(stages):
+            depends = set()
+            for earlier in stages[:i]:
+                if (
+                    set(stage.inputs) & set(earlier.outputs)
+                    or set(stage.outputs) & set(earlier.inputs)
+                    or set(stage.outputs) & set(earlier.outputs)
+                ):
+                    depends.add(earlier.name)
+            self.dependencies[stage.name] = depends
+        self.timings = {}
+        self.restored = []
+
+    def keys(self, sources: str) -> dict:
+        """
+        Work out the checkpoint key of every stage
+
+        Args:
+            sources (str): Digest of everything all the stages depend on
+
+        Returns:
+            dict: The key of each stage by name
+        """
+        keys = {}
+        resource_keys = {}
+        for stage in self.stages:
+            params = {
+                "stage": stage.name,
+                "enabled": stage.enabled,
+                "flags": stage.flags,
+                "sources": sources,
+                "inputs": {r: resource_keys.get(r) for r in sorted(stage.inputs)},
+            }
+            payload = json.dumps(params, sort_keys=True, default=str)
+            keys[stage.name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            for resource in stage.outputs:
+                resource_keys[resource] = keys[stage.name]
+        return keys
+
+    def stale(self, keys: dict, checkpoints) -> set:
+        """
+        Find the enabled stages that have to be run rather than restored
+
+        A stage that modifies a resource in place (it both reads and writes it)
+        needs the original written again before it runs, so the last stage to
+        write that resource before it is run as well.
+        """
+        stale = set()
+        for stage in self.stages:
+            if stage.enabled and not (
+                stage.checkpoint and checkpoints.has(stage, keys[stage.name])
+            ):
+                stale.add(stage.name)
+        changed = True
+        while changed:
+            changed = False
+            for i, stage in enumerate(self.stages):
+                if stage.name not in stale:
+                    continue
+                for resource in set(stage.inputs) & set(stage.outputs):
+                    for earlier in reversed(self.stages[:i]):
+                        if earlier.enabled and resource in earlier.outputs:
+                            if earlier.name not in stale:
+                                stale.add(earlier.name)
+                                changed = True
+                            break
+        return stale
+
+    def run_stage(self, stage: Stage):
+        start = time.perf_counter()
+        with profiler.measure(stage.name, "stage"):
+            stage.func()
+        return time.perf_counter() - start
+
+    def run(
+        self,
+        workers: int = 1,
+        pbar=None,
+        verbose_level=VerboseLevel.NONE,
+        checkpoints=None,
+        sources: str = "",
+    ):
+        """
+        Run the enabled stages
+
+        Args:
+            workers (int, optional): The number of stages run at once. Defaults to 1.
+            pbar (tqdm, optional): A progress bar to advance as stages finish. Defaults to None.
+            verbose_level (VerboseLevel, optional): Print the stage timings if not NONE. Defaults to VerboseLevel.NONE.
+            checkpoints (StageCheckpoints, optional): Where to save and restore stage checkpoints. Defaults to None.
+            sources (str, optional): Digest of everything all the stages depend on. Defaults to "".
+
+        Returns:
+            dict: Wall time in seconds of each stage run or restored
+        """
+        self.timings = {}
+        self.restored = []
+        done = set()
+        for stage in self.stages:
+            if not stage.enabled:
+                done.add(stage.name)
+                if pbar is not None:
+                    pbar.update(stage.progress)
+
+        if checkpoints is not None:
+            if workers > 1:
+                # the files a stage writes are found by comparing the project before and after it
+                warnings.warn(
+                    "Stages are run one at a time when checkpointing so their files can be told apart"
+                )
+            keys = self.keys(sources)
+            stale = self.stale(keys, checkpoints)
+            for stage in self.stages:
+                if stage.name in done:
+                    continue
+                start = time.perf_counter()
+                if stage.name not in stale and checkpoints.restore(
+                    stage, keys[stage.name]
+                ):
+                    self.restored.append(stage.name)
+                    self.timings[stage.name] = time.perf_counter() - start
+                else:
+                    before = checkpoints.snapshot()
+                    self.timings[stage.name] = self.run_stage(stage)
+                    if stage.checkpoint:
+                        checkpoints.save(stage, keys[stage.name], before)
+                done.add(stage.name)
+                if pbar is not None:
+                    pbar.update(stage.progress)
+        elif workers <= 1:
+            for stage in self.stages:
+                if stage.name not in done:
+                    self.timings[stage.name] = self.run_stage(stage)
+                    done.add(stage.name)
+                    if pbar is not None:
+                        pbar.update(stage.progress)
+        else:
+            waiting = [stage for stage in self.stages if stage.name not in done]
+            running = {}
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                while waiting or running:
+                    for stage in list(waiting):
+                        if self.dependencies[stage.name] <= done:
+                            waiting.remove(stage)
+                            running[executor.submit(self.run_stage, stage)] = stage
+                    finished, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        stage = running.pop(future)
+                        # re-raise a failed stage, the with block waits for the rest
+                        self.timings[stage.name] = future.result()
+                        done.add(stage.name)
+                        if pbar is not None:
+                            pbar.update(stage.progress)
+
+        if verbose_level != VerboseLevel.NONE:
+            for stage in self.stages:
+                if stage.name in self.restored:
+                    print("Stage {} restored from checkpoint".format(stage.name))
+                elif stage.name in self.timings:
+                    print(
+                        "Stage {} took {:.2f} seconds".format(
+                            stage.name, self.timings[stage.name]
+                        )
+                    )
+        return self.timings
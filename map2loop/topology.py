@@ -441,7 +441,7 @@ class Topology(object):
         )
         df.reset_index(drop=True, inplace=True)
         df.index.name = "index"
-        df.to_csv(os.path.join(config.tmp_path, "all_sorts.csv"))
+        map_data.artifacts.publish("all_sorts", df.reset_index())
 
     ####################################
     # save out fault fault relationship information as array
@@ -458,9 +458,7 @@ class Topology(object):
         self, config: Config, mapData, stratColumn: StratigraphicColumn
     ):
         # Get list of fault ids in fault dimensions as not all faults needed
-        df = pd.read_csv(
-            os.path.join(config.output_path, "fault_dimensions.csv"), delimiter=","
-        )
+        df = mapData.artifacts.get("fault_dimensions")
         faultInfo = df[["Fault"]].copy()
         faultInfo["FaultId"] = faultInfo["Fault"].str.replace("Fault_", "")
         faultInfo = faultInfo.reset_index()
@@ -858,14 +856,12 @@ class Topology(object):
             i = i + 1
 
         # add faults to graph as nodes
-        Af_d = pd.read_csv(
-            os.path.join(config.output_path, "fault_dimensions.csv"), sep=","
-        )
+        Af_d = map_data.artifacts.get("fault_dimensions")
         for ind, f in Af_d.iterrows():
             Gloop.add_node(f["Fault"], ntype="fault")
 
         # add fault centroid to node
-        Afgeom = pd.read_csv(os.path.join(config.output_path, "faults.csv"), sep=",")
+        Afgeom = map_data.artifacts.get("faults")
 
         pd.to_numeric(Afgeom["X"], downcast="float")
         pd.to_numeric(Afgeom["Y"], downcast="float")
@@ -886,9 +882,7 @@ class Topology(object):
                 Gloop[e[0]][e[1]]["etype"] = "fault_fault"
 
         # add fault dimension info to fault nodes
-        Af_d = pd.read_csv(
-            os.path.join(config.output_path, "fault_dimensions.csv"), sep=","
-        )
+        Af_d = map_data.artifacts.get("fault_dimensions")
         fault_l = pd.DataFrame(Af_d["Fault"])
         Af_d = Af_d.set_index("Fault")
         fault_l = fault_l.set_index("Fault")
@@ -906,9 +900,7 @@ class Topology(object):
                     Gloop.nodes[n]["f_colour"] = Af_d.loc[n]["colour"]
 
         # add fault orientation info and clustering on orientation and length to fault nodes
-        Af_o = pd.read_csv(
-            os.path.join(config.output_path, "fault_orientations.csv"), sep=","
-        )
+        Af_o = map_data.artifacts.get("fault_orientations")
         Af_o = Af_o.drop_duplicates(subset="formation")
         Af_o = Af_o.set_index("formation")
 
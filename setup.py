@@ -56,7 +56,7 @@ setuptools.setup(
     #     "map2model-loop3d"
     # ],
     url="https://github.com/ShebMichel/map2loop-2",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Science/Research",